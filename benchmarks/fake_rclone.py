@@ -0,0 +1,113 @@
+"""
+Fake `rclone` executable for benchmarks.
+
+Supports the subset RcloneWrapper uses:
+    copy SRC REMOTE:DIR [--bwlimit RATE] [--ignore-existing] ...
+    lsjson REMOTE:DIR [--recursive] ...
+    moveto REMOTE:PATH REMOTE:PATH
+
+The "remote" is the directory in $FAKE_RCLONE_ROOT. Copies read the whole
+source file (so local disk cost is real) but only create a sparse file of the
+same size at the destination, sleeping to honour --bwlimit.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+CHUNK = 1024 * 1024
+
+def parse_rate(value):
+    """'5M' -> bytes/sec. 'off', '0' or a timetable mean unlimited."""
+    if not value or value.lower() == 'off' or ' ' in value or ',' in value:
+        return 0
+    units = {'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    suffix = value[-1].upper()
+    if suffix in units:
+        return float(value[:-1]) * units[suffix]
+    return float(value) * 1024 # rclone default unit is KiB/s
+
+def remote_dir(spec):
+    _, _, path = spec.partition(':')
+    return os.path.join(os.environ['FAKE_RCLONE_ROOT'], path.lstrip('/\\'))
+
+def option(args, name, default=None):
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return default
+
+def copy(args):
+    src, dest = args[0], remote_dir(args[1])
+    rate = parse_rate(os.environ.get('FAKE_RCLONE_BWLIMIT') or option(args, '--bwlimit'))
+    size = os.path.getsize(src)
+    target = os.path.join(dest, os.path.basename(src))
+
+    if '--ignore-existing' in args and os.path.exists(target):
+        return 0
+
+    start = time.monotonic()
+    sent = 0
+    with open(src, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK)
+            if not chunk:
+                break
+            sent += len(chunk)
+            if rate:
+                ahead = sent / rate - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    os.makedirs(dest, exist_ok=True)
+    with open(target, 'wb') as f:
+        f.truncate(size)
+    return 0
+
+def lsjson(args):
+    root = remote_dir(args[0])
+    entries = []
+    if os.path.isdir(root):
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                full = os.path.join(dirpath, name)
+                st = os.stat(full)
+                entries.append({
+                    'Path': os.path.relpath(full, root).replace('\\', '/'),
+                    'Name': name,
+                    'Size': st.st_size,
+                    'ModTime': datetime.fromtimestamp(st.st_mtime, timezone.utc).isoformat(),
+                    'IsDir': False,
+                })
+            if '--recursive' not in args:
+                break
+    json.dump(entries, sys.stdout)
+    return 0
+
+def moveto(args):
+    src, dest = remote_dir(args[0]), remote_dir(args[1])
+    if not os.path.isfile(src):
+        print(f"fake_rclone: {args[0]}: object not found", file=sys.stderr)
+        return 3
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(src, dest)
+    return 0
+
+def main(argv):
+    if not argv:
+        print("usage: fake_rclone (copy|lsjson|moveto) ...", file=sys.stderr)
+        return 2
+    command, args = argv[0], argv[1:]
+    if command == 'copy':
+        return copy(args)
+    if command == 'lsjson':
+        return lsjson(args)
+    if command == 'moveto':
+        return moveto(args)
+    print(f"fake_rclone: unsupported command {command}", file=sys.stderr)
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,86 @@
+"""
+Synthetic library generator: fansub-style episode files (sparse) with
+sibling subtitles, plus optional legacy library folders for migration.
+"""
+import os
+import sys
+import random
+from pathlib import Path
+
+GROUPS = ['SubsPlease', 'Erai-raws', 'LoliHouse', 'Nekomoe kissaten', 'ANi', 'VCB-Studio']
+WORDS = ['Kimi', 'Sora', 'Hoshi', 'Yume', 'Tsuki', 'Kaze', 'Hikari', 'Mirai', 'Kokoro', 'Sekai', 'Tenshi', 'Ryuu']
+RESOLUTIONS = ['1080p', '720p', '2160p']
+SUB_EXTS = ['.ass', '.srt']
+
+def series_title(index: int) -> str:
+    rng = random.Random(index)
+    return f"{' '.join(rng.sample(WORDS, 3))} {index}"
+
+def episode_name(group: str, title: str, season: int, episode: int, resolution: str, crc: str, ext: str) -> str:
+    if season > 1:
+        return f"[{group}] {title} S{season} - {episode:02d} ({resolution}) [{crc}]{ext}"
+    return f"[{group}] {title} - {episode:02d} ({resolution}) [{crc}]{ext}"
+
+def _sparse(path: Path, size: int):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+def generate_library(root: Path, files: int, episodes_per_series: int = 12, file_size: int = 8 * 1024 * 1024,
+                     subtitle_ratio: float = 0.5, seed: int = 0):
+    """
+    Creates `files` video files under root, grouped into series folders.
+    Returns the list of generated video paths.
+    """
+    rng = random.Random(seed)
+    videos = []
+    series_index = 0
+
+    while len(videos) < files:
+        title = series_title(series_index)
+        group = rng.choice(GROUPS)
+        season = 1 + (series_index % 3 == 2)
+        resolution = rng.choice(RESOLUTIONS)
+        series_dir = root / f"[{group}] {title}"
+        series_dir.mkdir(parents=True, exist_ok=True)
+
+        for episode in range(1, episodes_per_series + 1):
+            if len(videos) >= files:
+                break
+            crc = f"{rng.getrandbits(32):08X}"
+            video = series_dir / episode_name(group, title, season, episode, resolution, crc, '.mkv')
+            _sparse(video, file_size)
+            videos.append(video)
+
+            if rng.random() < subtitle_ratio:
+                sub = video.with_suffix(rng.choice(SUB_EXTS))
+                sub.write_text("[Script Info]\nTitle: synthetic\n", encoding='utf-8')
+
+        series_index += 1
+
+    return videos
+
+def generate_legacy_library(library_path: Path, folders: int, files_per_folder: int = 6):
+    """Creates pre-"Anime/" series folders that migrate_legacy_library will move."""
+    for i in range(folders):
+        folder = library_path / series_title(10_000 + i)
+        season = folder / "Season 01"
+        season.mkdir(parents=True, exist_ok=True)
+        for ep in range(1, files_per_folder + 1):
+            (season / f"{folder.name} - S01E{ep:02d}.strm").write_text("http://example/f/x/?dl=1", encoding='utf-8')
+
+def make_fake_rclone(bin_dir: Path) -> str:
+    """
+    Writes an `rclone` shim that runs fake_rclone.py with this interpreter.
+    Returns the executable path to pass to RcloneWrapper.
+    """
+    script = Path(__file__).resolve().parent / "fake_rclone.py"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+
+    if sys.platform == 'win32':
+        shim = bin_dir / "rclone.cmd"
+        shim.write_text(f'@"{sys.executable}" "{script}" %*\r\n', encoding='utf-8')
+    else:
+        shim = bin_dir / "rclone"
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding='utf-8')
+        os.chmod(shim, 0o755)
+    return str(shim)
@@ -0,0 +1,324 @@
+"""
+End-to-end benchmarks for process_path_arg, prune_mappings and
+migrate_legacy_library against local stand-ins (Seafile, AniList, rclone).
+
+Usage (from the repository root):
+    python -m benchmarks.run --files 200
+    python -m benchmarks.run --files 200 --baseline benchmarks/results/<previous>.json
+
+Each scenario runs in its own subprocess so peak RSS is per scenario.
+Results are written to benchmarks/results/ as JSON.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "src"))
+
+import main as main_module
+from database import VideoMappingDB
+from seafile_client import SeafileClient
+from rclone_wrapper import RcloneWrapper
+from anilist_client import AniListClient
+from migration import migrate_legacy_library
+from metrics import METRICS
+
+from benchmarks.stubs import seafile_stub, anilist_stub
+from benchmarks.library_gen import generate_library, generate_legacy_library, make_fake_rclone
+
+SCENARIOS = ('process', 'prune', 'migrate')
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+VIDEO_EXTS = ('.mp4', '.mkv', '.avi', '.mov')
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, in bytes."""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+class StageTimer:
+    """Wraps callables and records per-call latency per stage name."""
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.patched = []
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self.lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+        return timed
+
+    def patch(self, obj, attr, stage=None):
+        original = getattr(obj, attr)
+        self.patched.append((obj, attr, original))
+        setattr(obj, attr, self.wrap(stage or attr, original))
+        return original
+
+    def restore(self):
+        while self.patched:
+            obj, attr, original = self.patched.pop()
+            setattr(obj, attr, original)
+
+    def summary(self):
+        return {
+            stage: {
+                'count': len(values),
+                'total': sum(values),
+                'mean': sum(values) / len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+            }
+            for stage, values in self.samples.items()
+        }
+
+def make_workspace(tmp: Path):
+    ws = {
+        'root': tmp / "archive",
+        'library': tmp / "library",
+        'remote': tmp / "remote",
+        'db': tmp / "video_map.db",
+    }
+    for key in ('root', 'library', 'remote'):
+        ws[key].mkdir(parents=True, exist_ok=True)
+    return ws
+
+def make_config(ws, opts):
+    return {
+        'local': {
+            'root_path': str(ws['root']),
+            'library_path': str(ws['library']),
+            'delete_after_upload': False,
+        },
+        'rclone': {
+            'remote_name': 'Bench',
+            'remote_root': '/Bangumi',
+            'bwlimit': opts.bwlimit,
+        },
+        'seafile': {'repo_id': 'bench-repo'},
+    }
+
+def bench_process(ws, opts):
+    generate_library(ws['root'], opts.files, file_size=opts.file_size)
+    os.environ['FAKE_RCLONE_ROOT'] = str(ws['remote'])
+    rclone_bin = make_fake_rclone(ws['root'].parent / "bin")
+
+    with seafile_stub(opts.latency, opts.rate_limit) as seafile_srv, anilist_stub(opts.latency, opts.rate_limit) as anilist_srv:
+        seafile = SeafileClient(seafile_srv.url, "token", "bench-repo")
+        rclone = RcloneWrapper('Bench', opts.bwlimit, executable=rclone_bin)
+        anilist = AniListClient(url=anilist_srv.url, request_delay=opts.anilist_delay)
+        db = VideoMappingDB(str(ws['db']))
+        config = make_config(ws, opts)
+
+        timer = StageTimer()
+        for name in ('parse_filename', 'probe_media', 'generate_thumbnail', 'generate_tvshow_nfo', 'generate_episode_nfo', 'download_image'):
+            timer.patch(main_module, name)
+        timer.patch(anilist, 'search_anime', 'anilist')
+        timer.patch(rclone, 'upload', 'upload')
+        timer.patch(seafile, 'get_share_link', 'share_link')
+        timer.patch(main_module, 'process_file')
+
+        start = time.perf_counter()
+        try:
+            main_module.process_path_arg(ws['root'], config, seafile, rclone, anilist, VIDEO_EXTS, db)
+        finally:
+            elapsed = time.perf_counter() - start
+            timer.restore()
+
+        return {
+            'items': opts.files,
+            'elapsed': elapsed,
+            'items_per_sec': opts.files / elapsed if elapsed else 0.0,
+            'stages': timer.summary(),
+            'http_requests': {'seafile': seafile_srv.requests, 'anilist': anilist_srv.requests},
+            'http_throttled': {'seafile': seafile_srv.throttled, 'anilist': anilist_srv.throttled},
+            'metrics': METRICS.summary(),
+        }
+
+def bench_prune(ws, opts):
+    db = VideoMappingDB(str(ws['db']))
+    videos = generate_library(ws['root'], opts.files, file_size=0, subtitle_ratio=0)
+    for i, video in enumerate(videos):
+        strm = ws['library'] / f"{i}.strm"
+        strm.write_text("http://example/f/x/?dl=1", encoding='utf-8')
+        db.upsert_mapping(video, strm, "http://example/f/x/")
+        if i % 2:
+            video.unlink() # Half of the mappings become orphans
+
+    timer = StageTimer()
+    timer.patch(db, 'delete_mapping')
+
+    start = time.perf_counter()
+    main_module.prune_mappings(db)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'items': opts.files,
+        'elapsed': elapsed,
+        'items_per_sec': opts.files / elapsed if elapsed else 0.0,
+        'stages': timer.summary(),
+    }
+
+def bench_migrate(ws, opts):
+    folders = max(1, opts.files // 6)
+    generate_legacy_library(ws['library'], folders)
+
+    with anilist_stub(opts.latency, opts.rate_limit) as anilist_srv:
+        anilist = AniListClient(url=anilist_srv.url, request_delay=opts.anilist_delay)
+        timer = StageTimer()
+        timer.patch(anilist, 'search_anime', 'anilist')
+
+        start = time.perf_counter()
+        migrate_legacy_library(ws['library'], anilist)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'items': folders,
+            'elapsed': elapsed,
+            'items_per_sec': folders / elapsed if elapsed else 0.0,
+            'stages': timer.summary(),
+            'http_requests': {'anilist': anilist_srv.requests},
+        }
+
+def run_scenario(name, opts):
+    """Runs one scenario in a fresh temporary workspace (in this process)."""
+    runner = {'process': bench_process, 'prune': bench_prune, 'migrate': bench_migrate}[name]
+    with tempfile.TemporaryDirectory(prefix=f"njubox_bench_{name}_") as tmp:
+        result = runner(make_workspace(Path(tmp)), opts)
+    result['peak_rss'] = peak_rss_bytes()
+    return result
+
+def run_in_subprocess(name, opts):
+    cmd = [sys.executable, '-m', 'benchmarks.run', '--child', name] + opts.forward
+    proc = subprocess.run(cmd, cwd=str(ROOT_DIR), stdout=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Scenario {name} failed with code {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def compare(current, baseline, threshold):
+    """
+    Prints per-scenario deltas against a baseline result file.
+    Returns the list of regressions (throughput drop or p95 growth beyond threshold).
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        cur_tp, base_tp = result['items_per_sec'], base['items_per_sec']
+        delta = (cur_tp - base_tp) / base_tp if base_tp else 0.0
+        print(f"{name:8s} items/sec {base_tp:10.2f} -> {cur_tp:10.2f} ({delta:+.1%})")
+        if delta < -threshold:
+            regressions.append(f"{name}: throughput {delta:+.1%}")
+
+        for stage, stats in result['stages'].items():
+            base_stats = base['stages'].get(stage)
+            if not base_stats or not base_stats['p95']:
+                continue
+            growth = (stats['p95'] - base_stats['p95']) / base_stats['p95']
+            if growth > threshold:
+                regressions.append(f"{name}.{stage}: p95 {base_stats['p95'] * 1000:.1f}ms -> {stats['p95'] * 1000:.1f}ms")
+    return regressions
+
+def print_report(results):
+    for name, result in results['scenarios'].items():
+        print(f"\n== {name}: {result['items']} items in {result['elapsed']:.2f}s "
+              f"({result['items_per_sec']:.2f}/s), peak RSS {result['peak_rss'] / 1024 / 1024:.1f} MiB")
+        for stage, stats in sorted(result['stages'].items()):
+            print(f"   {stage:22s} n={stats['count']:6d} p50={stats['p50'] * 1000:8.2f}ms p95={stats['p95'] * 1000:8.2f}ms")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="NJUbox_sync end-to-end benchmarks")
+    parser.add_argument("--scenarios", nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--files", type=int, default=100, help="Synthetic episodes to generate")
+    parser.add_argument("--file-size", type=int, default=8 * 1024 * 1024, help="Bytes per (sparse) episode")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub HTTP latency in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Stub requests/sec (0 = unlimited)")
+    parser.add_argument("--bwlimit", default="off", help="Bandwidth passed to the fake rclone")
+    parser.add_argument("--anilist-delay", type=float, default=0.5, help="AniListClient request_delay")
+    parser.add_argument("--baseline", help="Previous result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression ratio")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    opts = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    if opts.child:
+        print(json.dumps(run_scenario(opts.child, opts)))
+        return 0
+
+    # Forward every option except orchestration-only ones to the children
+    opts.forward = [
+        f"--files={opts.files}", f"--file-size={opts.file_size}", f"--latency={opts.latency}",
+        f"--rate-limit={opts.rate_limit}", f"--bwlimit={opts.bwlimit}", f"--anilist-delay={opts.anilist_delay}",
+    ]
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {k: v for k, v in vars(opts).items() if k not in ('forward', 'child', 'baseline', 'output')},
+        'scenarios': {name: run_in_subprocess(name, opts) for name in opts.scenarios},
+    }
+    print_report(results)
+
+    output = Path(opts.output) if opts.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if opts.baseline:
+        with open(opts.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print()
+        regressions = compare(results, baseline, opts.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
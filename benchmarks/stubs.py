@@ -0,0 +1,332 @@
+"""
+Local HTTP stand-ins for the Seafile share-link and upload APIs, AniList GraphQL,
+the Jellyfin library update endpoint and a file origin with Range support.
+
+All servers run in a background thread, add a configurable per-request
+latency and enforce a simple requests-per-second limit (HTTP 429 when exceeded).
+"""
+import json
+import threading
+import time
+import hashlib
+from email import message_from_bytes
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Smallest valid JPEG-ish payload; content is never decoded
+COVER_BYTES = b"\xff\xd8\xff\xe0" + b"\x00" * 1024 + b"\xff\xd9"
+
+class RateLimiter:
+    """Token bucket shared by all handler threads of one server."""
+    def __init__(self, rate_per_sec):
+        self.rate = rate_per_sec
+        self.tokens = rate_per_sec
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if not self.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+class StubServer:
+    """Runs a handler class on 127.0.0.1 with an ephemeral port."""
+    def __init__(self, handler_cls, latency=0.0, rate_limit=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler_cls)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.latency = latency
+        self.limiter = RateLimiter(rate_limit)
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.state = {}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass # Keep benchmark output clean
+
+    @property
+    def stub(self):
+        return self.server.stub
+
+    def admit(self):
+        """Applies latency and rate limiting. Returns False if the request was rejected."""
+        with self.stub.lock:
+            self.stub.requests += 1
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+        if not self.stub.limiter.allow():
+            with self.stub.lock:
+                self.stub.throttled += 1
+            self.send_json(429, {'error': 'Too Many Requests'})
+            return False
+        return True
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class SeafileHandler(StubHandler):
+    """
+    /api/v2.1/share-links/
+      POST repo_id, path -> 200 {"link"}; 400 if a link already exists
+      GET  ?repo_id&path -> [{"link"}]
+    /f/<token>/
+      GET  -> 206 one byte while the link exists, 404 once revoked
+              (revoke by deleting the path from state['links'])
+    /api2/repos/<repo>/upload-link/        GET -> "<url>/seafhttp/upload-api/<token>"
+    /api2/repos/<repo>/file/detail/?p      GET -> {"size"} of an uploaded file, 404 if none
+    /api/v2.1/repos/<repo>/file-uploaded-bytes/?parent_dir&file_name
+                                           GET -> {"uploadedBytes"} of a partial upload
+    /seafhttp/upload-api/<token>
+      POST multipart parent_dir, relative_path, file; chunks carry
+           Content-Range. Completed files land in state['uploads'][path],
+           partial ones in state['partial'][path]. Statuses queued in
+           state['fail_uploads'] answer the next POSTs without storing
+           anything (None lets a POST through).
+    """
+    def _link_for(self, path):
+        # A link re-created after revocation gets a new token, as on Seafile
+        serial = self.stub.state.get('serial', 0)
+        self.stub.state['serial'] = serial + 1
+        token = hashlib.sha1(f"{path}#{serial}".encode('utf-8')).hexdigest()[:20]
+        return f"{self.stub.url}/f/{token}/"
+
+    def do_POST(self):
+        if not self.admit():
+            return
+        if self.path.startswith('/seafhttp/upload-api/'):
+            return self.receive_upload()
+        if not self.path.startswith('/api/v2.1/share-links/'):
+            return self.send_json(404, {'error': 'Not Found'})
+
+        form = parse_qs(self.read_body().decode('utf-8'))
+        path = form.get('path', [''])[0]
+        links = self.stub.state.setdefault('links', {})
+        with self.stub.lock:
+            if path in links:
+                return self.send_json(400, {'error_msg': 'Share link already exists.'})
+            links[path] = self._link_for(path)
+        self.send_json(200, {'link': links[path], 'path': path})
+
+    def do_GET(self):
+        if not self.admit():
+            return
+        parsed = urlparse(self.path)
+        if parsed.path.startswith('/f/'):
+            return self.serve_link(f"{self.stub.url}{parsed.path}")
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if parsed.path.endswith('/upload-link/'):
+            token = hashlib.sha1(str(time.monotonic()).encode('ascii')).hexdigest()[:16]
+            return self.send_json(200, f"{self.stub.url}/seafhttp/upload-api/{token}")
+        if parsed.path.endswith('/file/detail/'):
+            data = self.stub.state.get('uploads', {}).get(query.get('p'))
+            return self.send_json(200, {'size': len(data)}) if data is not None else self.send_json(404, {'error_msg': 'File not found'})
+        if parsed.path.endswith('/file-uploaded-bytes/'):
+            path = f"{query.get('parent_dir', '').rstrip('/')}/{query.get('file_name', '')}"
+            return self.send_json(200, {'uploadedBytes': len(self.stub.state.get('partial', {}).get(path, b''))})
+        if parsed.path != '/api/v2.1/share-links/':
+            return self.send_json(404, {'error': 'Not Found'})
+        path = parse_qs(parsed.query).get('path', [''])[0]
+        link = self.stub.state.get('links', {}).get(path)
+        self.send_json(200, [{'link': link, 'path': path}] if link else [])
+
+    def receive_upload(self):
+        body = self.read_body()
+        message = message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('ascii') + body, policy=HTTP)
+        form, data, name = {}, b'', ''
+        for part in message.iter_parts():
+            field = part.get_param('name', header='content-disposition')
+            if field == 'file':
+                data, name = part.get_payload(decode=True), part.get_filename()
+            else:
+                form[field] = part.get_content().strip()
+
+        state = self.stub.state
+        with self.stub.lock:
+            state['inflight'] = state.get('inflight', 0) + 1
+            state['peak_inflight'] = max(state.get('peak_inflight', 0), state['inflight'])
+            failures = state.get('fail_uploads') or []
+            status = failures.pop(0) if failures else None
+        try:
+            time.sleep(state.get('upload_delay', 0))
+            if status:
+                return self.send_json(status, {'error': 'Injected failure'})
+
+            directory = '/'.join(p.strip('/') for p in (form.get('parent_dir', ''), form.get('relative_path', '')) if p.strip('/'))
+            path = f"/{directory}/{name}".replace('//', '/')
+            content_range = self.headers.get('Content-Range')
+            with self.stub.lock:
+                state.setdefault('chunks', []).append((path, content_range))
+                if not content_range:
+                    state.setdefault('uploads', {})[path] = data
+                    state.get('partial', {}).pop(path, None)
+                    done = True
+                else:
+                    span, _, total = content_range[6:].partition('/')
+                    start = int(span.partition('-')[0])
+                    partial = state.setdefault('partial', {}).setdefault(path, bytearray())
+                    if start > len(partial):
+                        return self.send_json(400, {'error': 'Chunk out of order'})
+                    partial[start:start + len(data)] = data
+                    done = len(partial) >= int(total)
+                    if done:
+                        state.setdefault('uploads', {})[path] = bytes(state['partial'].pop(path))
+            if done:
+                self.send_json(200, [{'name': name, 'size': len(state['uploads'][path])}])
+            else:
+                self.send_json(200, {'success': True})
+        finally:
+            with self.stub.lock:
+                state['inflight'] -= 1
+
+    def serve_link(self, link):
+        if link not in self.stub.state.get('links', {}).values():
+            return self.send_json(404, {'error': 'Share link not found'})
+        self.send_response(206)
+        self.send_header('Content-Range', 'bytes 0-0/1')
+        self.send_header('Content-Length', '1')
+        self.end_headers()
+        self.wfile.write(b"x")
+
+class AniListHandler(StubHandler):
+    """
+    POST /             GraphQL Media(search) -> deterministic synthetic media
+    GET  /covers/N.jpg cover image bytes
+    """
+    def do_POST(self):
+        if not self.admit():
+            return
+        try:
+            query = json.loads(self.read_body() or b'{}')
+        except ValueError:
+            return self.send_json(400, {'errors': [{'message': 'Invalid JSON'}]})
+        title = (query.get('variables') or {}).get('search', '')
+        media_id = int(hashlib.sha1(title.encode('utf-8')).hexdigest()[:6], 16)
+        self.send_json(200, {'data': {'Media': {
+            'id': media_id,
+            'title': {'romaji': title, 'english': title, 'native': None},
+            'description': f"Synthetic series {title}.",
+            'coverImage': {'large': f"{self.stub.url}/covers/{media_id}.jpg"},
+            'season': 'SPRING',
+            'seasonYear': 2024,
+            'episodes': 12,
+            'status': 'FINISHED',
+            'genres': ['Action'],
+            'averageScore': 75,
+            'studios': {'nodes': [{'name': 'Bench Studio'}]},
+            'startDate': {'year': 2024, 'month': 4, 'day': 1},
+        }}})
+
+    def do_GET(self):
+        if not self.admit():
+            return
+        if not self.path.startswith('/covers/'):
+            return self.send_json(404, {'error': 'Not Found'})
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(COVER_BYTES)))
+        self.end_headers()
+        self.wfile.write(COVER_BYTES)
+
+class JellyfinHandler(StubHandler):
+    """
+    POST /Library/Media/Updated {"Updates": [{"Path", "UpdateType"}]} -> 204
+    Requests without an X-Emby-Token header get 401. Each accepted body's
+    Updates list is appended to state['updates'].
+    """
+    def do_POST(self):
+        if not self.admit():
+            return
+        if self.path != '/Library/Media/Updated':
+            return self.send_json(404, {'error': 'Not Found'})
+        if not self.headers.get('X-Emby-Token'):
+            return self.send_json(401, {'error': 'Unauthorized'})
+        payload = json.loads(self.read_body() or b'{}')
+        with self.stub.lock:
+            self.stub.state.setdefault('updates', []).append(payload.get('Updates', []))
+        self.send_response(204)
+        self.end_headers()
+
+class OriginHandler(StubHandler):
+    """
+    GET/HEAD <path> -> bytes of state['files'][path] (query ignored), honouring
+    a single `Range: bytes=a-b` header with 206 like the Seafile file server.
+    With state['ignore_range'] set it always answers 200 with the whole file.
+    """
+    def _serve(self, head):
+        if not self.admit():
+            return
+        data = self.stub.state.get('files', {}).get(urlparse(self.path).path)
+        if data is None:
+            return self.send_json(404, {'error': 'Not Found'})
+        start, end, status = 0, len(data) - 1, 200
+        range_header = self.headers.get('Range')
+        if range_header and range_header.startswith('bytes=') and not self.stub.state.get('ignore_range'):
+            first, _, last = range_header[6:].partition('-')
+            start = int(first)
+            end = min(int(last), len(data) - 1) if last else len(data) - 1
+            status = 206
+        self.send_response(status)
+        self.send_header('Content-Type', 'video/x-matroska')
+        self.send_header('Content-Length', str(end - start + 1))
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        if not head:
+            self.wfile.write(data[start:end + 1])
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+def seafile_stub(latency=0.0, rate_limit=0):
+    return StubServer(SeafileHandler, latency, rate_limit)
+
+def anilist_stub(latency=0.0, rate_limit=0):
+    return StubServer(AniListHandler, latency, rate_limit)
+
+def jellyfin_stub(latency=0.0, rate_limit=0):
+    return StubServer(JellyfinHandler, latency, rate_limit)
+
+def origin_stub(latency=0.0, rate_limit=0):
+    return StubServer(OriginHandler, latency, rate_limit)
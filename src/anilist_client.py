@@ -1,10 +1,17 @@
 import requests
 import logging
 import time
+import threading
 
 class AniListClient:
-    def __init__(self):
-        self.url = 'https://graphql.anilist.co'
+    def __init__(self, url='https://graphql.anilist.co', request_delay=0.5):
+        self.url = url
+        self.request_delay = request_delay
+        # Results by search title (found or definitively not found), shared by
+        # the synchronous call sites and batch prefetching
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._next_request = 0.0
         self.query = '''
         query ($search: String) {
           Media (search: $search, type: ANIME, sort: SEARCH_MATCH) {
@@ -38,32 +45,48 @@ class AniListClient:
         }
         '''
 
+    def _throttle(self):
+        """Spaces request starts at least request_delay apart, across threads."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.request_delay
+        if wait > 0:
+            time.sleep(wait)
+
     def search_anime(self, title: str):
         """
         Searches for an anime by title on AniList.
+        Answers are cached per title; connection and server errors are not.
         """
+        if title in self._cache:
+            return self._cache[title]
+
         variables = {'search': title}
 
         try:
-            # Respect rate limits (simple approach)
-            time.sleep(0.5)
+            # Respect rate limits
+            self._throttle()
 
             response = requests.post(self.url, json={'query': self.query, 'variables': variables}, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
                 if 'data' in data and 'Media' in data['data']:
+                    self._cache[title] = data['data']['Media']
                     return data['data']['Media']
                 else:
-                    logging.warning(f"AniList: No results found for '{title}'")
+                    logging.warning("AniList: No results found for '%s'", title)
+                    self._cache[title] = None
                     return None
             elif response.status_code == 404:
-                logging.warning(f"AniList: 404 Not Found for '{title}'")
+                logging.warning("AniList: 404 Not Found for '%s'", title)
+                self._cache[title] = None
                 return None
             else:
-                logging.error(f"AniList API Error {response.status_code}: {response.text}")
+                logging.error("AniList API Error %s: %s", response.status_code, response.text)
                 return None
 
         except Exception as e:
-            logging.error(f"AniList connection failed: {e}")
+            logging.error("AniList connection failed: %s", e)
             return None
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import requests
+from functools import partial
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+class AsyncNetEngine:
+    """
+    Event-loop driver for batch network I/O.
+
+    The project only depends on `requests`, so each blocking call runs in a
+    bounded thread pool while asyncio schedules them; a semaphore per host
+    caps concurrent connections to AniList, Seafile and image CDNs alike.
+    Results land in the clients' caches, so the synchronous call sites in
+    process_file reuse them without extra requests.
+    """
+    def __init__(self, per_host_limit=4, max_workers=16, timeout=10):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="net")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=per_host_limit)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._semaphores = {}
+
+    def _semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._semaphores[host]
+
+    async def _call(self, url, fn, *args):
+        async with self._semaphore(url):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(fn, *args))
+
+    async def search_anime(self, client, title):
+        return await self._call(client.url, client.search_anime, title)
+
+    async def get_share_link(self, client, remote_path):
+        return await self._call(client.host, client.get_share_link, remote_path)
+
+    async def fetch_image(self, url):
+        """Downloads an image over the pooled session. Returns bytes or None."""
+        def fetch():
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.content
+                logging.error("Failed to download image %s: Status %s", url, response.status_code)
+            except requests.exceptions.RequestException as e:
+                logging.error("Error downloading image %s: %s", url, e)
+            return None
+        return await self._call(url, fetch)
+
+    async def check_url(self, url):
+        """
+        Probes a download URL with a one-byte range request (servers that ignore
+        Range still only send headers before the body is dropped).
+        Returns the final HTTP status code, or None if the request failed.
+        """
+        def probe():
+            try:
+                response = self.session.get(url, headers={"Range": "bytes=0-0"}, stream=True, allow_redirects=True, timeout=self.timeout)
+                response.close()
+                return response.status_code
+            except requests.exceptions.RequestException as e:
+                logging.debug("Link probe failed for %s: %s", url, e)
+                return None
+        return await self._call(url, probe)
+
+    async def gather_bounded(self, coros, limit):
+        """Runs coroutines with at most `limit` in flight; results keep input order."""
+        gate = asyncio.Semaphore(limit)
+
+        async def bounded(coro):
+            async with gate:
+                return await coro
+
+        return await asyncio.gather(*(bounded(c) for c in coros))
+
+    def run(self, coro):
+        """Runs a coroutine to completion on a fresh event loop."""
+        self._semaphores = {} # Semaphores are bound to the loop that created them
+        return asyncio.run(coro)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+def resolve_metadata(engine, anilist_client, titles, concurrency=4):
+    """Looks up every distinct title concurrently. Returns {title: media or None}."""
+    titles = list(dict.fromkeys(titles))
+    results = engine.run(engine.gather_bounded(
+        [engine.search_anime(anilist_client, t) for t in titles], concurrency
+    ))
+    return dict(zip(titles, results))
+
+def resolve_share_links(engine, seafile_client, remote_paths, concurrency=4):
+    """Creates/fetches share links concurrently. Returns {remote_path: link or None}."""
+    remote_paths = list(dict.fromkeys(remote_paths))
+    results = engine.run(engine.gather_bounded(
+        [engine.get_share_link(seafile_client, p) for p in remote_paths], concurrency
+    ))
+    return dict(zip(remote_paths, results))
+
+def fetch_images(engine, urls, concurrency=4):
+    """Downloads images concurrently. Returns {url: bytes or None}."""
+    urls = list(dict.fromkeys(urls))
+    results = engine.run(engine.gather_bounded([engine.fetch_image(u) for u in urls], concurrency))
+    return dict(zip(urls, results))
@@ -0,0 +1,206 @@
+import re
+import logging
+import requests
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from metrics import METRICS
+from link_checker import download_url
+from range_cache import RangeCache
+from resolver import LinkResolver
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Largest read while skipping the head of a 200 answer to an ignored Range
+SKIP_CHUNK = 1024 * 1024
+
+def parse_range(header: str, size: int):
+    """
+    Parses a single-range `Range` header against the object size.
+    Returns (start, end) inclusive, None for no/unsupported range (serve
+    the whole object) or False if the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+class OriginError(Exception):
+    pass
+
+class CachingProxy:
+    """
+    Serves `/m/<mapping id>` with Range support from a RangeCache, fetching
+    missing blocks from the mapping's share link (created lazily through the
+    LinkResolver). Misses are fetched in runs of up to `fetch_blocks` blocks.
+    """
+    def __init__(self, resolver: LinkResolver, cache: RangeCache, fetch_blocks=8, timeout=30):
+        self.resolver = resolver
+        self.cache = cache
+        self.fetch_blocks = fetch_blocks
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _fetch(self, mapping_id, key, start, end):
+        """Fetches start-end from the origin. Returns (data, total size, content type)."""
+        link = self.resolver.resolve(mapping_id)
+        if not link:
+            raise OriginError(f"no link for mapping {mapping_id}")
+        try:
+            resp = self.session.get(download_url(link), headers={"Range": f"bytes={start}-{end}"}, stream=True, timeout=self.timeout)
+            with resp:
+                if resp.status_code == 206:
+                    try:
+                        total = int(resp.headers.get('Content-Range', '').rsplit('/', 1)[1])
+                    except (IndexError, ValueError):
+                        raise OriginError(f"origin sent no usable Content-Range: {resp.headers.get('Content-Range')}")
+                    data = resp.raw.read(end - start + 1, decode_content=True)
+                elif resp.status_code == 200:
+                    # Origin ignored the Range header: skip to the wanted bytes
+                    total = int(resp.headers.get('Content-Length') or 0)
+                    skipped = 0
+                    while skipped < start:
+                        chunk = resp.raw.read(min(SKIP_CHUNK, start - skipped), decode_content=True)
+                        if not chunk:
+                            raise OriginError(f"origin body ended at {skipped} bytes, before offset {start}")
+                        skipped += len(chunk)
+                    data = resp.raw.read(end - start + 1, decode_content=True)
+                else:
+                    raise OriginError(f"origin answered HTTP {resp.status_code}")
+                content_type = resp.headers.get('Content-Type')
+        except requests.exceptions.RequestException as e:
+            raise OriginError(str(e))
+        METRICS.inc('proxy_bytes_total', len(data), source='origin')
+        return data, total, content_type
+
+    def object_info(self, mapping_id):
+        """Size and content type of a mapping's file; the first request also caches block 0."""
+        key = f"m{mapping_id}"
+        obj = self.cache.get_object(key)
+        if obj:
+            return key, obj
+        data, total, content_type = self._fetch(mapping_id, key, 0, self.cache.block_size - 1)
+        self.cache.put_object(key, total, content_type)
+        self.cache.write_blocks(key, 0, data)
+        return key, self.cache.get_object(key)
+
+    def iter_range(self, mapping_id, key, start, end):
+        """Yields the bytes of start-end, block by block, filling cache misses from the origin."""
+        self.cache.touch(key)
+        size = self.cache.get_object(key)['size']
+        first, last = self.cache.block_range(start, end)
+        block = first
+        while block <= last:
+            missing = self.cache.missing_blocks(key, block, min(last, block + self.fetch_blocks - 1))
+            if missing and missing[0] == block:
+                # Fetch the contiguous run of missing blocks starting here
+                run_end = block
+                while run_end + 1 in missing:
+                    run_end += 1
+                fetch_end = min((run_end + 1) * self.cache.block_size, size) - 1
+                data, _, _ = self._fetch(mapping_id, key, block * self.cache.block_size, fetch_end)
+                self.cache.write_blocks(key, block, data)
+                blocks = range(block, run_end + 1)
+            else:
+                run_end = missing[0] - 1 if missing else min(last, block + self.fetch_blocks - 1)
+                blocks = range(block, run_end + 1)
+                data = None
+            lo = max(start, block * self.cache.block_size)
+            hi = min(end, (run_end + 1) * self.cache.block_size - 1)
+            if data is not None:
+                chunk = data[lo - block * self.cache.block_size:hi - block * self.cache.block_size + 1]
+            else:
+                chunk = self.cache.read(key, lo, hi)
+                METRICS.inc('proxy_bytes_total', len(chunk), source='cache')
+            yield chunk
+            block = blocks[-1] + 1
+
+    def close(self):
+        self.session.close()
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """GET/HEAD /m/<mapping id> with single-range support."""
+    def log_message(self, format, *args):
+        logging.debug("Proxy: %s - %s", self.address_string(), format % args)
+
+    def _serve(self, head):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'm' or not parts[1].isdigit():
+            self.send_error(404)
+            return
+        proxy = self.server.proxy
+        mapping_id = int(parts[1])
+        try:
+            key, obj = proxy.object_info(mapping_id)
+        except OriginError as e:
+            logging.error("Proxy: mapping %s unavailable: %s", mapping_id, e)
+            self.send_error(502)
+            return
+
+        size = obj['size']
+        byte_range = parse_range(self.headers.get('Range'), size)
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{size}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', obj['content_type'] or 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        if byte_range:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if head or size == 0:
+            return
+        try:
+            for chunk in proxy.iter_range(mapping_id, key, start, end):
+                self.wfile.write(chunk)
+        except OriginError as e:
+            # Headers are out already; dropping the connection tells the player to retry
+            logging.error("Proxy: origin failed mid-stream for mapping %s: %s", mapping_id, e)
+            self.close_connection = True
+        except (ConnectionError, OSError):
+            pass # Player closed the connection (seeking)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+def make_server(proxy: CachingProxy, host='127.0.0.1', port=8766) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ProxyHandler)
+    server.daemon_threads = True
+    server.proxy = proxy
+    return server
+
+def serve(config, db, router, default_cache_dir: Path):
+    """Runs the caching proxy (`proxy` config section) until interrupted."""
+    conf = config.get('proxy') or {}
+    resolver = LinkResolver(db, router, Path(config['local']['root_path']), (config.get('resolver') or {}).get('cache_ttl', 300))
+    cache = RangeCache(conf.get('cache_dir') or default_cache_dir, int(conf.get('max_size_gb', 20) * 2**30), int(conf.get('block_size_kb', 1024)) * 1024)
+    proxy = CachingProxy(resolver, cache, conf.get('fetch_blocks', 8))
+    server = make_server(proxy, conf.get('host', '127.0.0.1'), conf.get('port', 8766))
+    logging.info("Caching proxy listening on %s:%s (cache %s)", *server.server_address[:2], cache.cache_dir)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Caching proxy stopped.")
+    finally:
+        server.server_close()
+        proxy.close()
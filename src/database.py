@@ -1,7 +1,11 @@
+import json
 import sqlite3
 import logging
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Pipeline steps recorded in the job journal, in execution order
+JOB_STEPS = ('parsed', 'uploaded', 'linked', 'strm', 'artifacts')
 
 class VideoMappingDB:
     def __init__(self, db_path: str):
@@ -41,54 +45,404 @@ class VideoMappingDB:
                 cursor.execute("""
                     CREATE INDEX IF NOT EXISTS idx_strm_path ON mappings(strm_path)
                 """)
+
+                # Upload target (see targets.py) and size, for placement by tracked bytes
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN target TEXT")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN size INTEGER")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+
+                # Share link health (see link_checker.py): ok | broken | error | relinked
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN link_status TEXT")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN link_checked_at TEXT")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_link_checked ON mappings(link_checked_at)
+                """)
+
+                # Local copy deleted by tiering (see tiering.py); the remote copy still streams
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN evicted_at TEXT")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+
+                # Content fingerprint (size + sampled hash, see moves.py) to recognise moved files
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN fingerprint TEXT")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_fingerprint ON mappings(fingerprint)
+                """)
+
+                # Torrent identity (infohash + libtorrent file index) of files ingested from a .torrent
+                for column in ("infohash TEXT", "file_index INTEGER"):
+                    try:
+                        cursor.execute(f"ALTER TABLE mappings ADD COLUMN {column}")
+                    except sqlite3.OperationalError:
+                        pass # Column likely exists
+
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_torrent ON mappings(infohash, file_index)
+                """)
+
+                # Mapping id of resolver/proxy URLs in .strm files. The implicit rowid
+                # is not stable (no INTEGER PRIMARY KEY, VACUUM may renumber it);
+                # existing rows keep the rowid their .strm files were written with
+                try:
+                    cursor.execute("ALTER TABLE mappings ADD COLUMN link_id INTEGER")
+                except sqlite3.OperationalError:
+                    pass # Column likely exists
+                cursor.execute("UPDATE mappings SET link_id = rowid WHERE link_id IS NULL")
+                cursor.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_link_id ON mappings(link_id)
+                """)
+
+                # The remote cache is rebuilt from rclone, so a pre-sharding
+                # table (keyed by path only) is simply dropped
+                cursor.execute("PRAGMA table_info(remote_files)")
+                columns = [row[1] for row in cursor.fetchall()]
+                if columns and 'target' not in columns:
+                    cursor.execute("DROP TABLE remote_files")
+
+                # Cached remote listing (rclone lsjson), keyed by target and full remote path
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS remote_files (
+                        target TEXT NOT NULL DEFAULT '',
+                        remote_path TEXT NOT NULL,
+                        size INTEGER,
+                        mod_time TEXT,
+                        checked_at TIMESTAMP,
+                        PRIMARY KEY (target, remote_path)
+                    )
+                """)
+
+                # ffprobe summaries (utils.probe_media) keyed by content fingerprint
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS media_info (
+                        fingerprint TEXT PRIMARY KEY,
+                        info TEXT,
+                        probed_at TEXT
+                    )
+                """)
+
+                # Offline copies of AniList media and cover art, for --rebuild-library
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS anilist_meta (
+                        anilist_id INTEGER PRIMARY KEY,
+                        data TEXT,
+                        updated_at TEXT
+                    )
+                """)
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS images (
+                        url TEXT PRIMARY KEY,
+                        data BLOB,
+                        fetched_at TEXT
+                    )
+                """)
+
+                # Generated sidecars of a source: subtitles (copied or extracted) and cached fonts
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS sidecars (
+                        source_path TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        kind TEXT,
+                        stream_index INTEGER,
+                        PRIMARY KEY (source_path, path)
+                    )
+                """)
+
+                # Finished transfers, the throughput history behind --plan estimates
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS transfers (
+                        target TEXT,
+                        bytes INTEGER,
+                        seconds REAL,
+                        finished_at TEXT
+                    )
+                """)
+
+                # Job journal: last completed step per file, failures and retry schedule
+                # status: running | done | retry | failed
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        source_path TEXT PRIMARY KEY,
+                        step TEXT,
+                        status TEXT,
+                        link TEXT,
+                        attempts INTEGER DEFAULT 0,
+                        last_error TEXT,
+                        next_retry_at TEXT,
+                        updated_at TEXT
+                    )
+                """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, next_retry_at)
+                """)
                 conn.commit()
         except sqlite3.Error as e:
-            logging.error(f"Database initialization failed: {e}")
+            logging.error("Database initialization failed: %s", e)
 
-    def upsert_mapping(self, source_path: Path, strm_path: Path, seafile_url: str = None, metadata_status: str = None, metadata_info: str = None):
+    def upsert_mapping(self, source_path: Path, strm_path: Path, seafile_url: str = None, metadata_status: str = None, metadata_info: str = None, target: str = None, size: int = None, fingerprint: str = None):
         """Insert or Update a file mapping."""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
-                    INSERT INTO mappings (source_path, strm_path, seafile_url, last_updated, metadata_status, metadata_info)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO mappings (source_path, strm_path, seafile_url, last_updated, metadata_status, metadata_info, target, size, fingerprint, link_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, (SELECT coalesce(max(link_id), 0) + 1 FROM mappings))
                     ON CONFLICT(source_path) DO UPDATE SET
                         strm_path=excluded.strm_path,
                         seafile_url=coalesce(excluded.seafile_url, mappings.seafile_url),
                         last_updated=excluded.last_updated,
                         metadata_status=coalesce(excluded.metadata_status, mappings.metadata_status),
-                        metadata_info=coalesce(excluded.metadata_info, mappings.metadata_info)
+                        metadata_info=coalesce(excluded.metadata_info, mappings.metadata_info),
+                        target=coalesce(excluded.target, mappings.target),
+                        size=coalesce(excluded.size, mappings.size),
+                        fingerprint=coalesce(excluded.fingerprint, mappings.fingerprint),
+                        evicted_at=NULL
                 """, (
                     str(source_path.resolve()),
                     str(strm_path.resolve()),
                     seafile_url,
                     datetime.now(),
                     metadata_status,
-                    metadata_info
+                    metadata_info,
+                    target,
+                    size,
+                    fingerprint
                 ))
                 conn.commit()
-                logging.debug(f"DB: Mapped {source_path} -> {strm_path} ({metadata_status})")
+                logging.debug("DB: Mapped %s -> %s (%s)", source_path, strm_path, metadata_status)
         except sqlite3.Error as e:
-            logging.error(f"Failed to save mapping for {source_path}: {e}")
+            logging.error("Failed to save mapping for %s: %s", source_path, e)
 
     def get_mapping(self, source_path: Path):
         """Retrieve mapping for a source path."""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT strm_path, seafile_url, metadata_status, metadata_info FROM mappings WHERE source_path = ?", (str(source_path.resolve()),))
+                cursor.execute("SELECT strm_path, seafile_url, metadata_status, metadata_info, target, link_id, fingerprint FROM mappings WHERE source_path = ?", (str(source_path.resolve()),))
                 row = cursor.fetchone()
                 if row:
                     return {
                         'strm_path': Path(row[0]),
                         'seafile_url': row[1],
                         'metadata_status': row[2],
-                        'metadata_info': row[3]
+                        'metadata_info': row[3],
+                        'target': row[4],
+                        'id': row[5],
+                        'fingerprint': row[6]
                     }
                 return None
         except sqlite3.Error as e:
-            logging.error(f"Failed to get mapping: {e}")
+            logging.error("Failed to get mapping: %s", e)
+            return None
+
+    def find_by_fingerprint(self, fingerprint: str):
+        """Returns the mappings (dicts) whose source had the given content fingerprint."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT source_path, strm_path, seafile_url, target, evicted_at FROM mappings
+                    WHERE fingerprint = ?
+                """, (fingerprint,))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("Failed to look up fingerprint: %s", e)
+            return []
+
+    def rekey_mapping(self, old_source_path: str, new_source_path: Path, clear_link: bool = False):
+        """
+        Moves a mapping to a new source path in place, keeping its id and
+        target (and its link unless clear_link). The old journal entry is dropped.
+        """
+        new_key = str(new_source_path.resolve())
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                # A stale row for the new path (e.g. an earlier failed run) gives way
+                cursor.execute("DELETE FROM mappings WHERE source_path = ?", (new_key,))
+                cursor.execute("DELETE FROM jobs WHERE source_path = ?", (old_source_path,))
+                cursor.execute("DELETE FROM sidecars WHERE source_path = ?", (new_key,))
+                cursor.execute("UPDATE sidecars SET source_path=? WHERE source_path=?", (new_key, old_source_path))
+                cursor.execute("""
+                    UPDATE mappings SET
+                        source_path=?,
+                        last_updated=?,
+                        seafile_url=CASE WHEN ? THEN NULL ELSE seafile_url END,
+                        link_status=CASE WHEN ? THEN NULL ELSE link_status END
+                    WHERE source_path=?
+                """, (new_key, datetime.now(), clear_link, clear_link, old_source_path))
+                conn.commit()
+                logging.debug("DB: Re-keyed %s -> %s", old_source_path, new_key)
+        except sqlite3.Error as e:
+            logging.error("Failed to re-key mapping %s: %s", old_source_path, e)
+
+    def move_remote_file(self, old_remote_path: str, new_remote_path: str, target: str = ''):
+        """Follows a server-side move in the cached remote listing."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM remote_files WHERE target = ? AND remote_path = ?", (target, new_remote_path))
+                cursor.execute(
+                    "UPDATE remote_files SET remote_path=?, checked_at=? WHERE target = ? AND remote_path = ?",
+                    (new_remote_path, datetime.now().isoformat(), target, old_remote_path)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to move remote cache entry %s: %s", old_remote_path, e)
+
+    def put_anilist_meta(self, media: dict):
+        """Stores an AniList media dict (as returned by AniListClient.search_anime)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT OR REPLACE INTO anilist_meta (anilist_id, data, updated_at) VALUES (?, ?, ?)",
+                    (media['id'], json.dumps(media), datetime.now().isoformat())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to store AniList metadata: %s", e)
+
+    def get_anilist_meta(self, anilist_id: int):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT data FROM anilist_meta WHERE anilist_id = ?", (anilist_id,))
+                row = cursor.fetchone()
+                return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            logging.error("Failed to get AniList metadata: %s", e)
+            return None
+
+    def put_image(self, url: str, data: bytes):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT OR REPLACE INTO images (url, data, fetched_at) VALUES (?, ?, ?)",
+                    (url, sqlite3.Binary(data), datetime.now().isoformat())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to cache image %s: %s", url, e)
+
+    def get_image(self, url: str):
+        """Cached image bytes for a URL, or None."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT data FROM images WHERE url = ?", (url,))
+                row = cursor.fetchone()
+                return bytes(row[0]) if row else None
+        except sqlite3.Error as e:
+            logging.error("Failed to get cached image %s: %s", url, e)
+            return None
+
+    def update_strm_paths(self, updates):
+        """Sets new strm paths from (source_path str, strm_path) pairs."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "UPDATE mappings SET strm_path=? WHERE source_path=?",
+                    ((str(Path(strm).resolve()), source) for source, strm in updates)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to update strm paths: %s", e)
+
+    def get_media_info(self, fingerprint: str):
+        """Cached probe summary (dict) for a content fingerprint, or None."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT info FROM media_info WHERE fingerprint = ?", (fingerprint,))
+                row = cursor.fetchone()
+                return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError) as e:
+            logging.error("Failed to get media info: %s", e)
+            return None
+
+    def put_media_info(self, fingerprint: str, info: dict):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT OR REPLACE INTO media_info (fingerprint, info, probed_at) VALUES (?, ?, ?)",
+                    (fingerprint, json.dumps(info), datetime.now().isoformat())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to store media info: %s", e)
+
+    def set_torrent_identity(self, source_path: Path, infohash: str, file_index: int):
+        """Records which torrent file a mapped source is."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE mappings SET infohash=?, file_index=? WHERE source_path=?",
+                    (infohash, file_index, str(source_path.resolve()))
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record torrent identity of %s: %s", source_path, e)
+
+    def find_by_torrent(self, infohash: str, file_index: int):
+        """Returns the mappings (dicts) recorded for a torrent file."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT link_id AS id, source_path, strm_path, seafile_url, target, size, evicted_at FROM mappings
+                    WHERE infohash = ? AND file_index = ?
+                """, (infohash, file_index))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("Failed to look up torrent %s#%s: %s", infohash, file_index, e)
+            return []
+
+    def mark_evicted(self, source_path: str):
+        """Records that the local copy was evicted on purpose (prune keeps the mapping)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE mappings SET evicted_at=? WHERE source_path=?", (datetime.now().isoformat(), source_path))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to mark %s evicted: %s", source_path, e)
+
+    def get_mapping_by_id(self, mapping_id: int):
+        """Retrieve a mapping by its id (link_id: kept across upserts, moves and VACUUM)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("SELECT source_path, strm_path, seafile_url, target FROM mappings WHERE link_id = ?", (mapping_id,))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except sqlite3.Error as e:
+            logging.error("Failed to get mapping %s: %s", mapping_id, e)
             return None
 
     def delete_mapping(self, source_path: str):
@@ -97,9 +451,36 @@ class VideoMappingDB:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM mappings WHERE source_path = ?", (source_path,))
+                cursor.execute("DELETE FROM sidecars WHERE source_path = ?", (source_path,))
                 conn.commit()
         except sqlite3.Error as e:
-            logging.error(f"Failed to delete mapping: {e}")
+            logging.error("Failed to delete mapping: %s", e)
+
+    def record_sidecars(self, source_path: Path, entries):
+        """Records generated sidecars as (kind, path, stream index) tuples."""
+        key = str(source_path.resolve())
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO sidecars (source_path, path, kind, stream_index) VALUES (?, ?, ?, ?)",
+                    ((key, str(path), kind, index) for kind, path, index in entries)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record sidecars of %s: %s", source_path, e)
+
+    def get_sidecars(self, source_path: Path):
+        """Returns the recorded sidecars of a source as dicts (path, kind, stream_index)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("SELECT path, kind, stream_index FROM sidecars WHERE source_path = ?", (str(Path(source_path).resolve()),))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("Failed to get sidecars of %s: %s", source_path, e)
+            return []
 
     def get_all_mappings(self):
         """Yields all mappings as (source_path_str, strm_path_str)."""
@@ -114,7 +495,302 @@ class VideoMappingDB:
                     for row in rows:
                         yield row
         except sqlite3.Error as e:
-            logging.error(f"Failed to fetch mappings: {e}")
+            logging.error("Failed to fetch mappings: %s", e)
+
+    def iter_mappings(self, page_size: int = 100):
+        """
+        Yields all mappings as dicts with every stored column plus the mapping id.
+        Pages by id and holds no cursor between pages, so callers may write
+        to the database while iterating.
+        """
+        last_id = 0
+        while True:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.row_factory = sqlite3.Row
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT link_id AS id, * FROM mappings WHERE link_id > ? ORDER BY link_id LIMIT ?", (last_id, page_size))
+                    rows = [dict(row) for row in cursor.fetchall()]
+            except sqlite3.Error as e:
+                logging.error("Failed to fetch mappings: %s", e)
+                return
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            yield from rows
+
+    def count_mappings(self) -> int:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT count(*) FROM mappings")
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error("Failed to count mappings: %s", e)
+            return 0
+
+    def get_links_to_check(self, checked_before: str, limit: int):
+        """
+        Returns up to `limit` mappings with a link that was not checked since
+        checked_before (ISO timestamp), least recently checked first.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT source_path, strm_path, seafile_url, target FROM mappings
+                    WHERE seafile_url IS NOT NULL AND coalesce(link_checked_at, '') < ?
+                    ORDER BY link_checked_at, source_path
+                    LIMIT ?
+                """, (checked_before, limit))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("Failed to fetch links to check: %s", e)
+            return []
+
+    def record_link_status(self, source_path: str, status: str, seafile_url: str = None):
+        """Stores a link check result (and the replacement link after re-linking)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE mappings SET
+                        link_status=?,
+                        link_checked_at=?,
+                        seafile_url=coalesce(?, seafile_url)
+                    WHERE source_path=?
+                """, (status, datetime.now().isoformat(), seafile_url, source_path))
+                if seafile_url:
+                    # A re-run must not resume with the journaled (broken) link
+                    cursor.execute("UPDATE jobs SET link=? WHERE source_path=?", (seafile_url, source_path))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record link status for %s: %s", source_path, e)
+
+    def get_target_usage(self):
+        """Returns {target: tracked bytes} summed over the mappings (None: legacy rows)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT target, coalesce(sum(size), 0) FROM mappings GROUP BY target")
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logging.error("Failed to compute target usage: %s", e)
+            return {}
+
+    def replace_remote_files(self, entries, target: str = ''):
+        """
+        Replaces the cached remote listing of one target.
+        entries: iterable of (remote_path, size, mod_time).
+        """
+        now = datetime.now().isoformat()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM remote_files WHERE target = ?", (target,))
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO remote_files (target, remote_path, size, mod_time, checked_at) VALUES (?, ?, ?, ?, ?)",
+                    ((target, path, size, mod_time, now) for path, size, mod_time in entries)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to store remote listing: %s", e)
+
+    def upsert_remote_file(self, remote_path: str, size: int, mod_time: str = None, target: str = ''):
+        """Records a single remote file (e.g. right after a successful upload)."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT OR REPLACE INTO remote_files (target, remote_path, size, mod_time, checked_at) VALUES (?, ?, ?, ?, ?)",
+                    (target, remote_path, size, mod_time, datetime.now().isoformat())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record remote file %s: %s", remote_path, e)
+
+    def get_remote_file(self, remote_path: str, target: str = ''):
+        """Returns the cached remote entry for remote_path on target, or None."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT size, mod_time, checked_at FROM remote_files WHERE target = ? AND remote_path = ?", (target, remote_path))
+                row = cursor.fetchone()
+                if row:
+                    return {
+                        'size': row[0],
+                        'mod_time': row[1],
+                        'checked_at': datetime.fromisoformat(row[2])
+                    }
+                return None
+        except sqlite3.Error as e:
+            logging.error("Failed to get remote file: %s", e)
+            return None
+
+    def record_transfer(self, target: str, size: int, seconds: float):
+        """Records a completed upload of `size` bytes that took `seconds`."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO transfers (target, bytes, seconds, finished_at) VALUES (?, ?, ?, ?)",
+                    (target, size, seconds, datetime.now().isoformat())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record transfer: %s", e)
+
+    def get_throughput(self, limit: int = 50):
+        """Bytes/sec of a single transfer over the last `limit` uploads, None without history."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT sum(bytes), sum(seconds) FROM (
+                        SELECT bytes, seconds FROM transfers WHERE seconds > 0 ORDER BY rowid DESC LIMIT ?
+                    )
+                """, (limit,))
+                size, seconds = cursor.fetchone()
+                return size / seconds if size and seconds else None
+        except sqlite3.Error as e:
+            logging.error("Failed to compute throughput: %s", e)
+            return None
+
+    def start_job(self, source_path: Path):
+        """
+        Marks a job as running (creating it if needed) and returns its journal
+        entry so the caller can resume after the last completed step.
+        Only interrupted (running) and queued (retry/failed) jobs resume; a
+        finished job starts over, its steps say nothing about the remote now
+        (the copy may have been deleted since, e.g. re-uploads from --sync).
+        """
+        key = str(source_path.resolve())
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO jobs (source_path, status, attempts, updated_at)
+                    VALUES (?, 'running', 0, ?)
+                    ON CONFLICT(source_path) DO UPDATE SET
+                        step=CASE WHEN status = 'done' THEN NULL ELSE step END,
+                        link=CASE WHEN status = 'done' THEN NULL ELSE link END,
+                        status='running',
+                        updated_at=excluded.updated_at
+                """, (key, datetime.now().isoformat()))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to start job for %s: %s", source_path, e)
+        return self.get_job(source_path) or {'step': None, 'status': 'running', 'link': None, 'attempts': 0, 'last_error': None, 'next_retry_at': None}
+
+    def get_job(self, source_path: Path):
+        """Retrieve the journal entry for a source path."""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT step, status, link, attempts, last_error, next_retry_at FROM jobs WHERE source_path = ?", (str(source_path.resolve()),))
+                row = cursor.fetchone()
+                if row:
+                    return {
+                        'step': row[0],
+                        'status': row[1],
+                        'link': row[2],
+                        'attempts': row[3],
+                        'last_error': row[4],
+                        'next_retry_at': row[5]
+                    }
+                return None
+        except sqlite3.Error as e:
+            logging.error("Failed to get job: %s", e)
+            return None
+
+    def record_step(self, source_path: Path, step: str, link: str = None):
+        """Records that a pipeline step completed. The final step marks the job done."""
+        status = 'done' if step == JOB_STEPS[-1] else 'running'
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE jobs SET
+                        step=?,
+                        status=?,
+                        link=coalesce(?, link),
+                        attempts=CASE WHEN ? = 'done' THEN 0 ELSE attempts END,
+                        last_error=CASE WHEN ? = 'done' THEN NULL ELSE last_error END,
+                        next_retry_at=NULL,
+                        updated_at=?
+                    WHERE source_path=?
+                """, (step, status, link, status, status, datetime.now().isoformat(), str(source_path.resolve())))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record step %s for %s: %s", step, source_path, e)
+
+    def record_failure(self, source_path: Path, error: str, transient: bool = True, max_attempts: int = 5, base_delay: int = 60):
+        """
+        Records a failed attempt. Transient failures are queued for retry with
+        exponential backoff (base_delay * 2^(attempts-1) seconds) until
+        max_attempts is reached; anything else is marked failed.
+        """
+        job = self.get_job(source_path)
+        attempts = (job['attempts'] if job else 0) + 1
+
+        if transient and attempts < max_attempts:
+            status = 'retry'
+            next_retry_at = (datetime.now() + timedelta(seconds=base_delay * 2 ** (attempts - 1))).isoformat()
+        else:
+            status = 'failed'
+            next_retry_at = None
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE jobs SET status=?, attempts=?, last_error=?, next_retry_at=?, updated_at=?
+                    WHERE source_path=?
+                """, (status, attempts, error, next_retry_at, datetime.now().isoformat(), str(source_path.resolve())))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error("Failed to record failure for %s: %s", source_path, e)
+
+        if status == 'retry':
+            logging.warning("Job: %s failed (%s); retry %s scheduled at %s", source_path, error, attempts, next_retry_at)
+        else:
+            logging.error("Job: %s failed permanently after %s attempt(s): %s", source_path, attempts, error)
+
+    def get_resumable_jobs(self, now: datetime = None):
+        """
+        Returns source paths of jobs that were interrupted (still 'running')
+        or whose retry is due.
+        """
+        now = (now or datetime.now()).isoformat()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT source_path FROM jobs
+                    WHERE status = 'running' OR (status = 'retry' AND next_retry_at <= ?)
+                    ORDER BY updated_at
+                """, (now,))
+                return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("Failed to fetch resumable jobs: %s", e)
+            return []
+
+    def get_due_retries(self, now: datetime = None):
+        """Returns source paths of queued retries whose backoff has elapsed."""
+        now = (now or datetime.now()).isoformat()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT source_path FROM jobs
+                    WHERE status = 'retry' AND next_retry_at <= ?
+                    ORDER BY next_retry_at
+                """, (now,))
+                return [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error("Failed to fetch due retries: %s", e)
+            return []
 
     def close(self):
         pass # sqlite3 context manager handles closing, but we keep this for interface
@@ -0,0 +1,124 @@
+import logging
+import threading
+import requests
+from pathlib import PurePath
+from urllib.parse import urljoin
+from metrics import METRICS
+
+class JellyfinNotifier:
+    """
+    Collects library folders touched during a run and reports them to
+    Jellyfin (`POST /Library/Media/Updated`) so only those folders are
+    rescanned instead of the whole remote-backed library.
+
+    Touches are debounced: a flush happens once no folder was touched for
+    `debounce` seconds (0: only on flush()/close()). Folders below another
+    touched folder are dropped, since Jellyfin rescans recursively.
+    """
+    def __init__(self, url, api_key, debounce=0.0, batch_size=50, path_map=None, timeout=10):
+        self.url = urljoin(url, "/Library/Media/Updated")
+        self.headers = {"X-Emby-Token": api_key}
+        self.debounce = debounce
+        self.batch_size = batch_size
+        # Local prefix -> prefix as seen by the Jellyfin server
+        self.path_map = dict(path_map or {})
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def jellyfin_path(self, path) -> str:
+        path = str(path)
+        for local, remote in self.path_map.items():
+            if path.startswith(local):
+                return remote + path[len(local):].replace('\\', '/')
+        return path
+
+    def touch(self, folder, update_type='Modified'):
+        """Records a changed library folder (Created, Modified or Deleted)."""
+        with self._lock:
+            self._pending[str(folder)] = update_type
+            if self.debounce > 0:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = threading.Timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @staticmethod
+    def collapse(pending: dict) -> dict:
+        """Drops folders that lie below another pending folder."""
+        kept = {}
+        for folder in sorted(pending, key=lambda f: len(PurePath(f).parts)):
+            path = PurePath(folder)
+            if not any(path == PurePath(k) or PurePath(k) in path.parents for k in kept):
+                kept[folder] = pending[folder]
+        return kept
+
+    def flush(self) -> int:
+        """Sends all pending folders in batches. Returns the number of folders reported."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+
+        updates = [
+            {"Path": self.jellyfin_path(folder), "UpdateType": update_type}
+            for folder, update_type in sorted(self.collapse(pending).items())
+        ]
+        sent = 0
+        for start in range(0, len(updates), self.batch_size):
+            batch = updates[start:start + self.batch_size]
+            try:
+                METRICS.inc('jellyfin_requests_total')
+                resp = self.session.post(self.url, headers=self.headers, json={"Updates": batch}, timeout=self.timeout)
+                if resp.ok:
+                    sent += len(batch)
+                else:
+                    logging.error("Jellyfin refresh failed. Status: %s, Body: %s", resp.status_code, resp.text)
+            except requests.exceptions.RequestException as e:
+                logging.error("Jellyfin refresh request failed: %s", e)
+        logging.info("Jellyfin: reported %s changed folder(s) (%s touched).", sent, len(pending))
+        return sent
+
+    def close(self):
+        self.flush()
+        self.session.close()
+
+# Active notifier when jellyfin.url is configured
+_notifier = None
+
+def start_notifier(config):
+    """Creates the notifier from the `jellyfin` config section; None if not configured."""
+    global _notifier
+    conf = config.get('jellyfin') or {}
+    if not conf.get('url'):
+        return None
+    _notifier = JellyfinNotifier(
+        conf['url'],
+        conf.get('api_key', ''),
+        debounce=conf.get('debounce', 0),
+        batch_size=conf.get('batch_size', 50),
+        path_map=conf.get('path_map'),
+    )
+    return _notifier
+
+def stop_notifier():
+    global _notifier
+    if _notifier is not None:
+        _notifier.close()
+        _notifier = None
+
+def flush_notifications():
+    """Reports pending folders now (long-running modes); no-op when no notifier is active."""
+    if _notifier is not None:
+        _notifier.flush()
+
+def notify_changed(folder, update_type='Modified'):
+    """Marks a library folder for a Jellyfin refresh; no-op when no notifier is active."""
+    if _notifier is not None:
+        _notifier.touch(folder, update_type)
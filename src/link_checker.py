@@ -0,0 +1,35 @@
+import logging
+from metrics import METRICS
+
+LINK_OK = 'ok'              # Link serves the file
+LINK_BROKEN = 'broken'      # Link revoked or file gone (404/410)
+LINK_ERROR = 'error'        # Probe inconclusive (network error, 5xx, ...); checked again later
+LINK_RELINKED = 'relinked'  # Was broken, a new link and .strm were written
+
+def download_url(link: str) -> str:
+    """URL the .strm actually plays (see build_strm_content)."""
+    return f"{link}?dl=1"
+
+def classify(status_code) -> str:
+    if status_code is None:
+        return LINK_ERROR
+    if status_code in (200, 206):
+        return LINK_OK
+    if status_code in (404, 410):
+        return LINK_BROKEN
+    return LINK_ERROR
+
+def probe_links(engine, links, concurrency=8):
+    """
+    Checks share links concurrently (bounded overall and per host by the engine).
+    Returns {link: LINK_OK | LINK_BROKEN | LINK_ERROR}.
+    """
+    links = list(dict.fromkeys(links))
+    codes = engine.run(engine.gather_bounded([engine.check_url(download_url(l)) for l in links], concurrency))
+    results = {}
+    for link, code in zip(links, codes):
+        results[link] = classify(code)
+        METRICS.inc('link_checks_total', result=results[link])
+        if results[link] != LINK_OK:
+            logging.debug("Link check %s: %s (HTTP %s)", link, results[link], code)
+    return results
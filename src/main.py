@@ -4,50 +4,352 @@ import argparse
 import logging
 import shutil
 import json
+import uuid
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
-from utils import setup_logging, load_config, parse_filename, disable_quick_edit, generate_thumbnail, generate_tvshow_nfo, generate_episode_nfo, save_image, sanitize_filename
-from seafile_client import SeafileClient
-from rclone_wrapper import RcloneWrapper
+from utils import setup_logging, log_context, load_config, parse_filename, disable_quick_edit, generate_thumbnail, generate_tvshow_nfo, generate_episode_nfo, download_image, sanitize_filename, probe_media
 from anilist_client import AniListClient
 from migration import migrate_legacy_library
-from database import VideoMappingDB
+from database import VideoMappingDB, JOB_STEPS
+from metrics import METRICS, stage
+from profiling import profile_run, start_memory_trace, stop_memory_trace, memory_checkpoint
+from contextlib import nullcontext
+from targets import TargetRouter, load_targets
+from jellyfin_notifier import start_notifier, stop_notifier, notify_changed, flush_notifications
+from resolver import resolver_url, serve as serve_resolver
+from cache_proxy import serve as serve_proxy
+from tiering import run_tiering
+from moves import file_fingerprint, find_moved_source
+from torrent_meta import load_torrent, content_files
+from subtitle_extract import extract_embedded, FONT_DIR, KIND_SUBTITLE
+from materialize import materialize, materialize_mode
+from watcher import LibraryWatcher
+from trickplay import start_trickplay, stop_trickplay, queue_trickplay, KIND_TRICKPLAY
+from link_checker import probe_links, LINK_BROKEN, LINK_RELINKED
+from upload_scheduler import order_files, run_ordered, build_bwlimit, split_bwlimit
+from async_net import AsyncNetEngine, resolve_metadata, resolve_share_links, fetch_images
+from planner import build_plan, estimate_seconds, format_duration, PLAN_KINDS, PLAN_UPLOAD
+from sync import scan_local, snapshot_db, snapshot_remote, plan_sync, ACTION_UPLOAD, ACTION_LINK, ACTION_STRM, ACTION_PRUNE
+
+def remove_mapping(db: VideoMappingDB, source_path_str: str, strm_path_str: str):
+    """Deletes the generated strm file (if any) and the mapping row."""
+    strm_path = Path(strm_path_str)
+    if strm_path.exists():
+        try:
+            strm_path.unlink()
+            logging.info("Deleted orphaned strm: %s", strm_path)
+            notify_changed(strm_path.parent)
+        except OSError as e:
+            logging.error("Failed to delete %s: %s", strm_path, e)
+
+    # Subtitle and trickplay sidecars are tracked; fonts are shared by the series and stay
+    for sidecar in db.get_sidecars(source_path_str):
+        sidecar_path = Path(sidecar['path'])
+        try:
+            if sidecar['kind'] == KIND_SUBTITLE and sidecar_path.exists():
+                sidecar_path.unlink()
+            elif sidecar['kind'] == KIND_TRICKPLAY and sidecar_path.is_dir():
+                shutil.rmtree(sidecar_path)
+        except OSError as e:
+            logging.error("Failed to delete %s: %s", sidecar_path, e)
+    # Thumbnails and NFOs are not tracked; strm, subtitles and trickplay are safe.
+    db.delete_mapping(source_path_str)
 
 def prune_mappings(db: VideoMappingDB):
     """
     Checks all mappings in the database.
     If the source file no longer exists, delete the mapping and the generated strm file.
+    Files evicted by tiering are missing on purpose and keep their mapping.
     """
     logging.info("Starting Prune Operation...")
     count = 0
     # Collect removals first to avoid modifying while iterating
     to_remove = []
 
-    for source_path_str, strm_path_str in db.get_all_mappings():
+    for row in db.iter_mappings():
+        source_path_str, strm_path_str = row['source_path'], row['strm_path']
         source_path = Path(source_path_str)
-        strm_path = Path(strm_path_str)
 
-        if not source_path.exists():
-            logging.info(f"Pruning orphaned mapping: {source_path}")
-            to_remove.append(source_path_str)
+        if not source_path.exists() and not row.get('evicted_at'):
+            logging.info("Pruning orphaned mapping: %s", source_path)
+            to_remove.append((source_path_str, strm_path_str))
 
-            # Delete .strm file if it exists
-            if strm_path.exists():
-                try:
-                    strm_path.unlink()
-                    logging.info(f"Deleted orphaned strm: {strm_path}")
-                except OSError as e:
-                    logging.error(f"Failed to delete {strm_path}: {e}")
+    for src, strm in to_remove:
+        remove_mapping(db, src, strm)
+        count += 1
 
-            # We could also delete thumbnails/subtitles if we tracked them or guessed them
-            # For now, just strm is safe.
+    logging.info("Prune finished. Removed %s orphaned mappings.", count)
 
-    for src in to_remove:
-        db.delete_mapping(src)
-        count += 1
+def build_strm_content(link: str, std_name: str, suffix: str) -> str:
+    """
+    Content: link + fragment
+    Fragment: #StandardizedName.OriginalExt
+    """
+    return f"{link}?dl=1#{std_name}{suffix}"
+
+STRM_DIRECT = 'direct'      # .strm holds the share link
+STRM_RESOLVER = 'resolver'  # .strm points at the local resolver, links are created on first playback
+STRM_PROXY = 'proxy'        # .strm points at the LAN caching proxy (links created lazily as well)
+
+def strm_mode(config) -> str:
+    return config['local'].get('strm_mode', STRM_DIRECT)
+
+def lazy_links(config) -> bool:
+    """Share links are created on first playback instead of at ingest."""
+    return strm_mode(config) in (STRM_RESOLVER, STRM_PROXY)
+
+def mapping_strm_content(config, mapping_id: int, link: str, std_name: str, suffix: str) -> str:
+    """.strm content for the configured local.strm_mode."""
+    mode = strm_mode(config)
+    if mode in (STRM_RESOLVER, STRM_PROXY):
+        return resolver_url(config[mode]['public_url'], mapping_id, std_name, suffix)
+    return build_strm_content(link, std_name, suffix)
+
+def write_strm(strm_path: Path, content: str) -> bool:
+    try:
+        with open(strm_path, "w", encoding='utf-8') as f:
+            f.write(content)
+        logging.info("Generated STRM: %s", strm_path)
+        notify_changed(strm_path.parent)
+        return True
+    except Exception as e:
+        logging.error("Failed to write STRM: %s", e)
+        return False
+
+def remote_paths(rel_path: Path, remote_root: str):
+    """
+    Returns (seafile_path, rclone_dest_dir) for a path relative to root_path.
+    """
+    # Convert to WebDAV path: "/Videos/Anime/AOT/Ep1.mkv"
+    remote_rel_path = rel_path.as_posix().lstrip('/')
+
+    # Path for Seafile API
+    seafile_path = f"{remote_root}/{remote_rel_path}".replace('//', '/')
+
+    # Path for Rclone (excludes library_id)
+    # Using parent directory for rclone destination to match "rclone copy file dest_dir" behavior
+    rclone_dest_dir = os.path.dirname(seafile_path)
+    return seafile_path, rclone_dest_dir
+
+def refresh_remote_cache(db: VideoMappingDB, rclone, remote_root: str, target: str = ''):
+    """
+    Replaces the cached remote listing of a target with one `rclone lsjson -R --fast-list`.
+    Returns the raw listing (paths relative to remote_root), or None on failure.
+    """
+    listing = rclone.list_remote(remote_root, recursive=True, fast_list=True)
+    if listing is None:
+        logging.error("Remote cache refresh failed: listing unavailable.")
+        return None
+
+    db.replace_remote_files((
+        (f"{remote_root}/{item['Path']}".replace('//', '/'), item.get('Size'), item.get('ModTime'))
+        for item in listing if not item.get('IsDir')
+    ), target)
+    logging.info("Remote cache refreshed%s: %s entries.", f" ({target})" if target else "", len(listing))
+    return listing
+
+def is_uploaded(db: VideoMappingDB, config, seafile_path: str, file_path: Path, target: str = '') -> bool:
+    """
+    Answers "already on NJUbox?" from the cached remote listing.
+    Only trusts entries younger than rclone.remote_cache_max_age (hours) whose
+    size matches the local file.
+    """
+    entry = db.get_remote_file(seafile_path, target)
+    if not entry:
+        return False
+
+    max_age = timedelta(hours=config['rclone'].get('remote_cache_max_age', 24))
+    if datetime.now() - entry['checked_at'] > max_age:
+        return False
+
+    try:
+        return entry['size'] == file_path.stat().st_size
+    except OSError:
+        return False
+
+def series_title(meta: dict, anilist_meta) -> str:
+    """Series folder name: AniList canonical title when known, parsed title otherwise."""
+    if anilist_meta:
+        canonical_title = anilist_meta['title']['english'] or anilist_meta['title']['romaji'] or meta['title']
+        return sanitize_filename(canonical_title)
+    return meta['title']
+
+def make_engine(config) -> AsyncNetEngine:
+    network_conf = config.get('network') or {}
+    return AsyncNetEngine(per_host_limit=network_conf.get('per_host_limit', 4))
+
+def prefetch_batch(files, config, anilist_client, engine: AsyncNetEngine):
+    """
+    Resolves AniList metadata for every distinct title of a batch and downloads
+    missing series cover art concurrently, before the per-file pipeline runs.
+    process_file then hits the client caches / existing posters.
+    """
+    library_path_str = config['local'].get('library_path')
+    if not library_path_str or not files:
+        return
+    library_path = Path(library_path_str)
+    concurrency = (config.get('network') or {}).get('concurrency', 4)
+
+    metas = [parse_filename(f.name) for f in files]
+    results = resolve_metadata(engine, anilist_client, [m['title'] for m in metas], concurrency)
+
+    covers = {}
+    for meta in metas:
+        media = results.get(meta['title'])
+        cover_url = media and (media.get('coverImage') or {}).get('large')
+        if cover_url:
+            series_dir = library_path / "Anime" / series_title(meta, media)
+            if not (series_dir / "poster.jpg").exists():
+                covers[series_dir] = cover_url
+
+    images = fetch_images(engine, covers.values(), concurrency) if covers else {}
+    for series_dir, url in covers.items():
+        data = images.get(url)
+        if not data:
+            continue
+        try:
+            series_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logging.error("Failed to create %s: %s", series_dir, e)
+            continue
+        write_cover(data, series_dir, materialize_mode(config, 'artwork'))
+
+    logging.info("Prefetched metadata for %s title(s), %s cover(s).", len(results), len(covers))
+
+# Per-series locks: workers processing episodes of the same series share its artwork
+_series_locks = {}
+_series_locks_guard = threading.Lock()
 
-    logging.info(f"Prune finished. Removed {count} orphaned mappings.")
+def series_lock(series_dir: Path) -> threading.Lock:
+    with _series_locks_guard:
+        return _series_locks.setdefault(str(series_dir), threading.Lock())
 
-def process_file(file_path: Path, config, seafile, rclone, anilist_client, db: VideoMappingDB):
+def write_cover(data: bytes, series_dir: Path, mode: str):
+    """Writes poster.jpg and places folder.jpg as a link to it (see materialize)."""
+    poster_path = series_dir / "poster.jpg"
+    # Through a temp file, so a concurrent reader never sees a truncated poster
+    tmp_path = series_dir / f".poster.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, poster_path)
+        method = materialize(poster_path, series_dir / "folder.jpg", mode)
+        METRICS.inc('materialized_total', kind='artwork', method=method)
+        logging.info("Saved image: %s", poster_path)
+    except OSError as e:
+        logging.error("Failed to write cover art in %s: %s", series_dir, e)
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+def series_artwork(db: VideoMappingDB, anilist_meta, series_dir: Path, offline: bool = False, mode: str = 'auto'):
+    """
+    Writes tvshow.nfo and poster.jpg/folder.jpg of a series if missing. Cover
+    art goes through the image cache in the database; unless offline, a
+    missing image is downloaded (or taken from an existing poster) first.
+    Serialized per series, so concurrent episodes write each file once.
+    """
+    with series_lock(series_dir):
+        _series_artwork(db, anilist_meta, series_dir, offline, mode)
+
+def _series_artwork(db: VideoMappingDB, anilist_meta, series_dir: Path, offline: bool, mode: str):
+    if not (series_dir / "tvshow.nfo").exists():
+        generate_tvshow_nfo(anilist_meta, series_dir)
+        notify_changed(series_dir)
+
+    cover_url = (anilist_meta.get('coverImage') or {}).get('large')
+    if not cover_url:
+        return
+    poster_path = series_dir / "poster.jpg"
+    data = db.get_image(cover_url)
+    if not isinstance(data, bytes):
+        data = None
+        if poster_path.exists():
+            # e.g. written by prefetch_batch
+            data = poster_path.read_bytes()
+        elif not offline:
+            data = download_image(cover_url)
+        if data:
+            db.put_image(cover_url, data)
+    if data and not poster_path.exists():
+        write_cover(data, series_dir, mode)
+
+def follow_move(db: VideoMappingDB, rclone, moved, file_path: Path, local_root: Path, remote_root: str, seafile_path: str, target: str = ''):
+    """
+    Takes over the mapping of a moved/renamed source instead of uploading again.
+    The remote copy is moved server-side if its path changes; the old share
+    link is carried over only when it does not.
+    Returns (True, link to reuse or None), or (False, None) if the move failed.
+    """
+    try:
+        old_rel = Path(moved['source_path']).relative_to(local_root.resolve())
+    except ValueError:
+        return False, None
+    old_remote = remote_paths(old_rel, remote_root)[0]
+    remote_changed = old_remote != seafile_path
+
+    if remote_changed:
+        with stage('move'):
+            if not rclone.moveto(old_remote, seafile_path):
+                return False, None
+        db.move_remote_file(old_remote, seafile_path, target)
+    db.rekey_mapping(moved['source_path'], file_path, clear_link=remote_changed)
+    METRICS.inc('moves_detected_total', remote='moved' if remote_changed else 'unchanged')
+    logging.info("Detected move: %s -> %s", moved['source_path'], file_path)
+    return True, None if remote_changed else moved['seafile_url']
+
+def media_info(db: VideoMappingDB, file_path: Path, fingerprint: str = None):
+    """ffprobe summary of a file, from the cache keyed by content fingerprint when possible."""
+    if fingerprint:
+        cached = db.get_media_info(fingerprint)
+        # Summaries from before embedded track extraction lack the attachments
+        if isinstance(cached, dict) and 'attachments' in cached:
+            METRICS.inc('media_probe_total', result='cached')
+            return cached
+    media = probe_media(file_path)
+    if media is None:
+        return None
+    METRICS.inc('media_probe_total', result='probed')
+    if fingerprint:
+        db.put_media_info(fingerprint, media)
+    return media
+
+def step_done(job, step: str) -> bool:
+    """True if the job journal shows `step` (or a later one) already completed."""
+    if not job or job.get('step') not in JOB_STEPS:
+        return False
+    return JOB_STEPS.index(job['step']) >= JOB_STEPS.index(step)
+
+def advance_job(db: VideoMappingDB, job, file_path: Path, step: str, link: str = None):
+    """Journals a completed step without moving a resumed job backwards."""
+    if step == JOB_STEPS[-1] or not step_done(job, step):
+        db.record_step(file_path, step, link)
+
+def record_failure(db: VideoMappingDB, config, file_path: Path, error: str, transient: bool = True):
+    METRICS.inc('files_processed_total', result='failed')
+    jobs_conf = config.get('jobs', {})
+    db.record_failure(
+        file_path, error, transient=transient,
+        max_attempts=jobs_conf.get('max_attempts', 5),
+        base_delay=jobs_conf.get('retry_base_delay', 60)
+    )
+
+def process_file(file_path: Path, config, seafile, rclone, anilist_client, db: VideoMappingDB, skip_upload: bool = False, router: TargetRouter = None):
+    """
+    Runs the full pipeline for one video file.
+    skip_upload: the file is known to be on the remote already (e.g. from --sync).
+    router: picks the upload target; seafile/rclone are used directly if None.
+    Every log record emitted while processing carries a per-file correlation id.
+    """
+    with log_context(cid=uuid.uuid4().hex[:8], file=file_path.name):
+        _process_file(file_path, config, seafile, rclone, anilist_client, db, skip_upload, router)
+
+def _process_file(file_path: Path, config, seafile, rclone, anilist_client, db: VideoMappingDB, skip_upload: bool, router: TargetRouter = None):
     local_root = Path(config['local']['root_path'])
     remote_root = config['rclone']['remote_root']
     
@@ -63,31 +365,32 @@ def process_file(file_path: Path, config, seafile, rclone, anilist_client, db: V
     try:
         rel_path = file_path.relative_to(local_root)
     except ValueError:
-        logging.warning(f"Skipping: {file_path} (Not in {local_root})")
+        logging.warning("Skipping: %s (Not in %s)", file_path, local_root)
         return
 
+    # Journal: resume after the last completed step if this file was interrupted
+    job = db.start_job(file_path)
+
     # 2. Standardization Analysis
     # Parse filename using anitopy
-    meta = parse_filename(file_path.name)
+    with stage('parse'):
+        meta = parse_filename(file_path.name)
 
     # AniList Lookup
-    anilist_meta = anilist_client.search_anime(meta['title'])
+    with stage('anilist'):
+        anilist_meta = anilist_client.search_anime(meta['title'])
 
-    if anilist_meta:
-        canonical_title = anilist_meta['title']['english'] or anilist_meta['title']['romaji'] or meta['title']
-        canonical_title = sanitize_filename(canonical_title)
-        series_dir_name = canonical_title
+    series_dir_name = series_title(meta, anilist_meta)
 
+    if anilist_meta:
         meta_status = 'SUCCESS'
         meta_info = json.dumps({
             'id': anilist_meta.get('id'),
             'title_en': anilist_meta['title'].get('english'),
             'title_ro': anilist_meta['title'].get('romaji'),
-            'canonical': canonical_title
+            'canonical': series_dir_name
         })
     else:
-        series_dir_name = meta['title']
-
         meta_status = 'FAILED'
         meta_info = json.dumps({
             'error': 'Not found',
@@ -99,68 +402,131 @@ def process_file(file_path: Path, config, seafile, rclone, anilist_client, db: V
     # Construct Destination Path: Library / Anime / Canonical Title / Season XX /
     dest_dir = library_path / "Anime" / series_dir_name / f"Season {meta['season']}"
     dest_dir.mkdir(parents=True, exist_ok=True)
+    advance_job(db, job, file_path, 'parsed')
 
     # Generate Series NFO if AniList data found (and not exists)
     if anilist_meta:
-        if not (dest_dir.parent / "tvshow.nfo").exists():
-             generate_tvshow_nfo(anilist_meta, dest_dir.parent)
-
-        # Download cover art if missing
-        poster_path = dest_dir.parent / "poster.jpg"
-        if not poster_path.exists() and anilist_meta.get('coverImage') and anilist_meta['coverImage'].get('large'):
-             save_image(anilist_meta['coverImage']['large'], poster_path)
-             # Also folder.jpg
-             save_image(anilist_meta['coverImage']['large'], dest_dir.parent / "folder.jpg")
+        if anilist_meta.get('id'):
+            # Kept for offline rebuilds (--rebuild-library)
+            db.put_anilist_meta(anilist_meta)
+        with stage('series_artwork'):
+            series_artwork(db, anilist_meta, dest_dir.parent, mode=materialize_mode(config, 'artwork'))
 
     # 3. Upload
-    # Convert to WebDAV path: "/Videos/Anime/AOT/Ep1.mkv"
-    remote_rel_path = rel_path.as_posix().lstrip('/')
+    # An unmapped path with the content of a vanished mapped file was moved/renamed
+    fingerprint = file_fingerprint(file_path)
+    moved = None
+    if not step_done(job, 'uploaded') and not skip_upload and db.get_mapping(file_path) is None:
+        moved = find_moved_source(db, file_path, fingerprint)
 
-    # Path for Seafile API
-    seafile_path = f"{remote_root}/{remote_rel_path}".replace('//', '/')
+    target = ''
+    uploader = rclone
+    if router is not None:
+        placed = router.get(moved['target']) if moved else router.resolve(file_path, rel_path, series_dir_name)
+        target, seafile, rclone, remote_root = placed.name, placed.seafile, placed.rclone, placed.remote_root
+        uploader = placed.uploader
+    seafile_path, rclone_dest_dir = remote_paths(rel_path, remote_root)
 
-    # Path for Rclone (excludes library_id)
-    # Using parent directory for rclone destination to match "rclone copy file dest_dir" behavior
-    rclone_dest_dir = os.path.dirname(f"{remote_root}/{remote_rel_path}".replace('//', '/'))
+    carried_link = None
+    if moved:
+        followed, carried_link = follow_move(db, rclone, moved, file_path, local_root, remote_root, seafile_path, target)
+        if not followed:
+            moved = None
 
-    if not rclone.upload(file_path, rclone_dest_dir):
-        return
+    if moved or step_done(job, 'uploaded') or skip_upload or is_uploaded(db, config, seafile_path, file_path, target):
+        logging.info("Already uploaded, skipping transfer: %s", seafile_path)
+    else:
+        # A cached remote entry that failed the size check is a partial/stale copy to overwrite
+        replace = db.get_remote_file(seafile_path, target) is not None
+        started = time.monotonic()
+        with stage('upload'):
+            uploaded = uploader.upload(file_path, rclone_dest_dir, replace=replace)
+        if not uploaded:
+            record_failure(db, config, file_path, "upload failed")
+            return
+        try:
+            stat = file_path.stat()
+            db.record_transfer(target, stat.st_size, time.monotonic() - started)
+            db.upsert_remote_file(seafile_path, stat.st_size, datetime.fromtimestamp(stat.st_mtime).isoformat(), target)
+        except OSError as e:
+            logging.warning("Could not record uploaded file in remote cache: %s", e)
+    advance_job(db, job, file_path, 'uploaded')
 
-    # 4. Get Link
-    link = seafile.get_share_link(seafile_path)
-    if not link:
-        return
+    # 4. Get Link (resolver mode: created by the resolver on first playback)
+    lazy = lazy_links(config)
+    if lazy:
+        link = None
+    elif carried_link:
+        link = carried_link
+        advance_job(db, job, file_path, 'linked', link)
+    elif step_done(job, 'linked') and job.get('link'):
+        link = job['link']
+    else:
+        with stage('link'):
+            link = seafile.get_share_link(seafile_path)
+        if not link:
+            record_failure(db, config, file_path, "share link creation failed")
+            return
+        advance_job(db, job, file_path, 'linked', link)
 
     # 5. Generate .strm
-    # Content: link + fragment
-    # Fragment: #StandardizedName.OriginalExt
-    fragment = f"#{std_name}{file_path.suffix}"
-    strm_content = f"{link}?dl=1{fragment}"
-    
     strm_filename = f"{std_name}.strm"
     strm_path = dest_dir / strm_filename
-    
     try:
-        with open(strm_path, "w", encoding='utf-8') as f:
-            f.write(strm_content)
-        logging.info(f"Generated STRM: {strm_path}")
+        size = file_path.stat().st_size
+    except OSError:
+        size = None
+
+    with stage('strm'):
+        mapping_id = None
+        if lazy:
+            # The resolver URL contains the mapping id, so the row comes first
+            db.upsert_mapping(file_path, strm_path, None, meta_status, meta_info, target or None, size)
+            mapping_id = db.get_mapping(file_path)['id']
+        strm_content = mapping_strm_content(config, mapping_id, link, std_name, file_path.suffix)
+
+        if not write_strm(strm_path, strm_content):
+            record_failure(db, config, file_path, f"cannot write {strm_path}", transient=False)
+            return
 
         # Save mapping to DB
-        db.upsert_mapping(file_path, strm_path, link, meta_status, meta_info)
+        db.upsert_mapping(file_path, strm_path, link, meta_status, meta_info, target or None, size, fingerprint)
 
-    except Exception as e:
-        logging.error(f"Failed to write STRM: {e}")
+        # A moved file may get a new standardized name; drop the old .strm
+        if moved and Path(moved['strm_path']) != strm_path.resolve():
+            old_strm = Path(moved['strm_path'])
+            if old_strm.exists():
+                try:
+                    old_strm.unlink()
+                    notify_changed(old_strm.parent)
+                except OSError as e:
+                    logging.error("Failed to delete old strm %s: %s", old_strm, e)
+    advance_job(db, job, file_path, 'strm')
+
+    # 5a. Probe media info once (cached by content), shared by thumbnail and NFO
+    with stage('probe'):
+        media = media_info(db, file_path, fingerprint)
 
-    # 5a. Generate Thumbnail
+    # 5b. Generate Thumbnail
     thumb_filename = f"{std_name}.jpg"
     thumb_path = dest_dir / thumb_filename
-    generate_thumbnail(file_path, thumb_path)
+    with stage('thumbnail'):
+        generate_thumbnail(file_path, thumb_path, duration=media.get('duration') if media else None)
 
-    # 5b. Generate Episode NFO
-    if anilist_meta:
+    # 5c. Trickplay sheets while the source is local (Jellyfin would download the .strm)
+    trickplay = None
+    if media and media.get('video'):
+        def trickplay_done(output_dir):
+            db.record_sidecars(file_path, [(KIND_TRICKPLAY, output_dir.parent, None)])
+            notify_changed(dest_dir)
+        trickplay = queue_trickplay(file_path, dest_dir, std_name, trickplay_done)
+
+    # 5d. Generate Episode NFO (without AniList data still worth it for the probed streamdetails)
+    if anilist_meta or media:
         nfo_filename = f"{std_name}.nfo"
         nfo_path = dest_dir / nfo_filename
-        generate_episode_nfo(anilist_meta, meta['episode'], meta['season'], nfo_path)
+        with stage('nfo'):
+            generate_episode_nfo(anilist_meta, meta['episode'], meta['season'], nfo_path, media, show_title=series_dir_name)
 
     # 6. Handle Subtitles
     # Look for files with same stem in source dir
@@ -169,37 +535,500 @@ def process_file(file_path: Path, config, seafile, rclone, anilist_client, db: V
 
     # Iterate over files in the same directory as the video
     # Strategy: Find files where file.stem == file_path.stem and suffix in sub_exts
-    for sibling in file_path.parent.iterdir():
-        if sibling.is_file() and sibling.stem == file_path.stem and sibling.suffix.lower() in sub_exts:
-            # Found subtitle
-            sub_dest_name = f"{std_name}{sibling.suffix}"
-            sub_dest_path = dest_dir / sub_dest_name
-            try:
-                shutil.copy2(sibling, sub_dest_path)
-                logging.info(f"Copied Subtitle: {sibling} -> {sub_dest_path}")
-            except Exception as e:
-                logging.error(f"Failed to copy subtitle {sibling}: {e}")
+    sidecars = []
+    with stage('subtitles'):
+        for sibling in file_path.parent.iterdir():
+            if sibling.is_file() and sibling.stem == file_path.stem and sibling.suffix.lower() in sub_exts:
+                # Found subtitle
+                sub_dest_name = f"{std_name}{sibling.suffix}"
+                sub_dest_path = dest_dir / sub_dest_name
+                try:
+                    method = materialize(sibling, sub_dest_path, materialize_mode(config, 'subtitles'))
+                    METRICS.inc('materialized_total', kind='subtitle', method=method)
+                    logging.info("Placed Subtitle (%s): %s -> %s", method, sibling, sub_dest_path)
+                    sidecars.append((KIND_SUBTITLE, sub_dest_path, None))
+                except Exception as e:
+                    logging.error("Failed to copy subtitle %s: %s", sibling, e)
+
+        # Embedded tracks (fansub MKVs), so Jellyfin need not pull the remote file for them
+        sub_conf = config.get('subtitles') or {}
+        if media and sub_conf.get('extract_embedded', True):
+            font_dir = dest_dir.parent / FONT_DIR if sub_conf.get('fonts', True) else None
+            sidecars += extract_embedded(file_path, media, std_name, dest_dir, font_dir, sub_conf.get('max_parallel', 2))
+    if sidecars:
+        db.record_sidecars(file_path, sidecars)
 
-    # 7. Optional Delete
+    advance_job(db, job, file_path, 'artifacts')
+    METRICS.inc('files_processed_total', result='done')
+
+    # 7. Optional Delete (after queued trickplay sheets, which still read the source)
     if config['local'].get('delete_after_upload', False):
-        try:
-            file_path.unlink()
-            logging.info(f"Deleted local file: {file_path}")
-        except OSError as e:
-            logging.error(f"Failed to delete local file: {e}")
+        if trickplay is not None:
+            trickplay.add_done_callback(lambda _: delete_source(file_path))
+        else:
+            delete_source(file_path)
 
-def process_path_arg(target_path: Path, config, seafile, rclone, anilist_client, video_exts, db: VideoMappingDB):
+def delete_source(file_path: Path):
+    try:
+        file_path.unlink()
+        logging.info("Deleted local file: %s", file_path)
+    except OSError as e:
+        logging.error("Failed to delete local file: %s", e)
+
+def upload_concurrency(config) -> int:
+    return max(1, int((config.get('upload') or {}).get('concurrency', 1)))
+
+def process_batch(files, config, seafile, rclone, anilist_client, db: VideoMappingDB, skip_upload: bool = False, router: TargetRouter = None):
+    """
+    Processes a batch of files in the configured upload order
+    (upload.order: walk, shortest, episode) with upload.concurrency transfers at once.
+    With several targets the concurrent transfers go to different accounts.
+    """
+    upload_conf = config.get('upload') or {}
+    files = order_files(files, upload_conf.get('order', 'walk'))
+    total = len(files)
+
+    def on_done(index):
+        if index % 100 == 0:
+            memory_checkpoint(f"processed {index}/{total}")
+
+    run_ordered(
+        files,
+        lambda f: process_file(f, config, seafile, rclone, anilist_client, db, skip_upload=skip_upload, router=router),
+        upload_concurrency(config),
+        on_done,
+    )
+
+def process_path_arg(target_path: Path, config, seafile, rclone, anilist_client, video_exts, db: VideoMappingDB, engine: AsyncNetEngine = None, router: TargetRouter = None):
     """
     Recursively processes a file or directory.
+    For directories the network metadata of the whole batch is resolved
+    concurrently first (engine: shared AsyncNetEngine, created ad hoc if None).
     """
+    memory_checkpoint(f"start {target_path.name}")
     if target_path.is_file():
         if target_path.suffix.lower() in video_exts:
-            process_file(target_path, config, seafile, rclone, anilist_client, db)
+            process_file(target_path, config, seafile, rclone, anilist_client, db, router=router)
     elif target_path.is_dir():
-        for file_path in target_path.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in video_exts:
-                process_file(file_path, config, seafile, rclone, anilist_client, db)
+        files = [p for p in target_path.rglob('*') if p.is_file() and p.suffix.lower() in video_exts]
+        memory_checkpoint(f"walked {len(files)} files")
+        process_files(files, config, seafile, rclone, anilist_client, db, engine, router)
+    memory_checkpoint(f"done {target_path.name}")
+
+def process_files(files, config, seafile, rclone, anilist_client, db: VideoMappingDB, engine: AsyncNetEngine = None, router: TargetRouter = None):
+    """Prefetches the network metadata of a batch concurrently, then processes it."""
+    if len(files) > 1:
+        owned = engine is None
+        engine = engine or make_engine(config)
+        try:
+            prefetch_batch(files, config, anilist_client, engine)
+        except Exception as e:
+            logging.error("Batch prefetch failed, continuing per file: %s", e)
+        finally:
+            if owned:
+                engine.close()
+        memory_checkpoint("prefetched metadata")
+    process_batch(files, config, seafile, rclone, anilist_client, db, router=router)
+
+def ingest_torrent(config, seafile, rclone, anilist_client, video_exts, db: VideoMappingDB, engine: AsyncNetEngine = None, router: TargetRouter = None,
+                   torrent_path: Path = None, infohash: str = None, save_path: Path = None):
+    """
+    Processes the videos of one torrent, enumerated from its metadata (a
+    .torrent file, or an infohash in qBittorrent's BT_backup) instead of a
+    directory walk. Files are identified by infohash + file index: one already
+    mapped under that identity at the same path and size is skipped (re-run),
+    one mapped at another path that still exists is a duplicate.
+    Returns the number of files processed.
+    """
+    bt_backup = (config.get('torrents') or {}).get('bt_backup')
+    info, save_root, resume = load_torrent(torrent_path, infohash, Path(os.path.expandvars(bt_backup)) if bt_backup else None, save_path)
+    logging.info("Torrent '%s' (%s): %s file(s) in %s", info.name, info.infohash, len(info.files), save_root)
+
+    todo = []
+    for entry, path in content_files(info, save_root, resume, video_exts):
+        key = str(path.resolve())
+        known = [m for m in db.find_by_torrent(info.infohash, entry.index) if not m['evicted_at']]
+        if any(m['source_path'] == key and m['size'] == entry.size for m in known):
+            METRICS.inc('torrent_files_total', result='unchanged')
+            continue
+        duplicate = next((m for m in known if m['source_path'] != key and os.path.exists(m['source_path'])), None)
+        if duplicate:
+            logging.info("Skipping %s: same torrent file already mapped at %s", path, duplicate['source_path'])
+            METRICS.inc('torrent_files_total', result='duplicate')
+            continue
+        try:
+            size = path.stat().st_size
+        except OSError:
+            logging.warning("Torrent file missing on disk, skipping: %s", path)
+            METRICS.inc('torrent_files_total', result='missing')
+            continue
+        if size != entry.size:
+            logging.warning("Torrent file incomplete (%s of %s bytes), skipping: %s", size, entry.size, path)
+            METRICS.inc('torrent_files_total', result='incomplete')
+            continue
+        todo.append((entry, path))
+
+    memory_checkpoint(f"listed {len(todo)} torrent files")
+    process_files([path for _, path in todo], config, seafile, rclone, anilist_client, db, engine, router)
+    for entry, path in todo:
+        if db.get_mapping(path):
+            db.set_torrent_identity(path, info.infohash, entry.index)
+            METRICS.inc('torrent_files_total', result='processed')
+    return len(todo)
+
+
+def resume_jobs(config, seafile, rclone, anilist_client, db: VideoMappingDB, retries_only: bool = False, router: TargetRouter = None):
+    """
+    Re-runs journaled jobs. process_file picks up after the last completed step.
+    retries_only: only drain the retry queue (backoff elapsed), skip interrupted jobs.
+    """
+    pending = db.get_due_retries() if retries_only else db.get_resumable_jobs()
+    if not pending:
+        return
+
+    logging.info("Resuming %s journaled job(s)...", len(pending))
+    for source_path_str in pending:
+        file_path = Path(source_path_str)
+        if not file_path.exists():
+            logging.warning("Job source vanished, marking failed: %s", file_path)
+            record_failure(db, config, file_path, "source file missing", transient=False)
+            continue
+        try:
+            process_file(file_path, config, seafile, rclone, anilist_client, db, router=router)
+        except Exception as e:
+            logging.exception("Critical error while resuming %s: %s", file_path, e)
+
+def sync_library(config, seafile, rclone, anilist_client, video_exts, db: VideoMappingDB, engine: AsyncNetEngine = None, router: TargetRouter = None):
+    """
+    Three-way reconciliation of the local archive, the mappings table and the
+    remote tree. Each source is snapshotted once, then diffed with a sorted
+    merge so only inconsistent files are touched.
+    With several targets the remote snapshot is the union of their listings.
+    """
+    local_root = Path(config['local']['root_path'])
+    remote_root = config['rclone']['remote_root']
+
+    logging.info("Starting Sync Operation...")
+    local = scan_local(local_root, video_exts)
+    db_rows = snapshot_db(db, local_root)
+    if router is not None:
+        sources = [(t.name, t.rclone, t.remote_root) for t in router.targets]
+    else:
+        sources = [('', rclone, remote_root)]
+    remote = {}
+    for name, target_rclone, target_root in sources:
+        listing = refresh_remote_cache(db, target_rclone, target_root, name)
+        if listing is None:
+            logging.error("Sync aborted: remote listing failed.")
+            return
+        remote.update(snapshot_remote(listing, video_exts))
+    remote = sorted(remote.items())
 
+    logging.info("Sync snapshot: %s local, %s mapped, %s remote files.", len(local), len(db_rows), len(remote))
+    lazy = lazy_links(config)
+    actions = plan_sync(local, db_rows, remote, local_root, lazy_links=lazy)
+
+    counts = {}
+    for action in actions:
+        counts[action.kind] = counts.get(action.kind, 0) + 1
+    logging.info("Sync plan: %s", counts or 'nothing to do')
+
+    # Resolve metadata and share links of the whole plan concurrently up front
+    batch = [a.local_path for a in actions if a.kind in (ACTION_UPLOAD, ACTION_LINK)]
+    link_paths = {}
+    for a in actions:
+        if a.kind == ACTION_LINK and not lazy:
+            placed = router.locate(Path(a.rel_path)) if router is not None else None
+            client, root = (placed.seafile, placed.remote_root) if placed else (seafile, remote_root)
+            link_paths.setdefault(client, []).append(remote_paths(Path(a.rel_path), root)[0])
+    if batch:
+        owned = engine is None
+        engine = engine or make_engine(config)
+        try:
+            prefetch_batch(batch, config, anilist_client, engine)
+            for client, paths in link_paths.items():
+                resolve_share_links(engine, client, paths, (config.get('network') or {}).get('concurrency', 4))
+        except Exception as e:
+            logging.error("Batch prefetch failed, continuing per file: %s", e)
+        finally:
+            if owned:
+                engine.close()
+
+    # Cheap local fixes first, then links, then the (scheduled) uploads
+    for action in actions:
+        try:
+            if action.kind == ACTION_STRM:
+                mapping = action.mapping
+                strm_path = Path(mapping['strm_path'])
+                strm_path.parent.mkdir(parents=True, exist_ok=True)
+                content = mapping_strm_content(config, mapping['id'], mapping['seafile_url'], strm_path.stem, Path(mapping['source_path']).suffix)
+                write_strm(strm_path, content)
+            elif action.kind == ACTION_PRUNE:
+                logging.info("Pruning orphaned mapping: %s", action.mapping['source_path'])
+                remove_mapping(db, action.mapping['source_path'], action.mapping['strm_path'])
+        except Exception as e:
+            logging.exception("Sync action %s failed for %s: %s", action.kind, action.rel_path, e)
+
+    links = [a.local_path for a in actions if a.kind == ACTION_LINK]
+    if links:
+        process_batch(links, config, seafile, rclone, anilist_client, db, skip_upload=True, router=router)
+    uploads = [a.local_path for a in actions if a.kind == ACTION_UPLOAD]
+    if uploads:
+        process_batch(uploads, config, seafile, rclone, anilist_client, db, router=router)
+
+    logging.info("Sync finished.")
+
+def relink(config, db: VideoMappingDB, router: TargetRouter, row) -> str:
+    """Replaces a broken share link and rewrites its .strm. Returns the new link status."""
+    source_path = row['source_path']
+    target = router.get(row['target'])
+    try:
+        rel_path = Path(source_path).relative_to(Path(config['local']['root_path']).resolve())
+    except ValueError:
+        logging.warning("Broken link outside root_path, cannot re-link: %s", source_path)
+        db.record_link_status(source_path, LINK_BROKEN)
+        return LINK_BROKEN
+
+    seafile_path = remote_paths(rel_path, target.remote_root)[0]
+    target.seafile.forget_link(seafile_path)
+    link = target.seafile.get_share_link(seafile_path)
+    if not link or link == row['seafile_url']:
+        logging.warning("Broken link could not be replaced (file moved or deleted on server?): %s", seafile_path)
+        db.record_link_status(source_path, LINK_BROKEN)
+        return LINK_BROKEN
+
+    # Resolver/proxy .strm files point at the mapping id, the database update is enough
+    if not lazy_links(config):
+        strm_path = Path(row['strm_path'])
+        strm_path.parent.mkdir(parents=True, exist_ok=True)
+        if not write_strm(strm_path, build_strm_content(link, strm_path.stem, Path(source_path).suffix)):
+            db.record_link_status(source_path, LINK_BROKEN)
+            return LINK_BROKEN
+
+    logging.info("Re-linked %s -> %s", seafile_path, link)
+    db.record_link_status(source_path, LINK_RELINKED, link)
+    return LINK_RELINKED
+
+def watch_library(config, seafile, rclone, anilist_client, video_exts, db: VideoMappingDB, engine: AsyncNetEngine = None, router: TargetRouter = None):
+    """
+    --watch: processes files that appear under root_path (copied in by hand or
+    by other tools) once they are complete, batched per directory. Blocks
+    until interrupted.
+    """
+    conf = config.get('watch') or {}
+
+    def on_batch(files):
+        # Unchanged mapped files (e.g. touched by a recheck) are not processed again
+        todo = []
+        for f in files:
+            mapping = db.get_mapping(f)
+            if mapping and mapping.get('fingerprint') and mapping['fingerprint'] == file_fingerprint(f):
+                continue
+            todo.append(f)
+        if todo:
+            process_files(todo, config, seafile, rclone, anilist_client, db, engine, router)
+            resume_jobs(config, seafile, rclone, anilist_client, db, retries_only=True, router=router)
+            flush_notifications()
+
+    watcher = LibraryWatcher(
+        Path(config['local']['root_path']), video_exts, on_batch,
+        settle=conf.get('settle_seconds', 30),
+        max_hold=conf.get('max_hold_seconds', 600),
+        poll_interval=conf.get('poll_interval', 60),
+    )
+    watcher.run()
+
+def rebuild_library(config, db: VideoMappingDB, workers: int = 8, chunk_size: int = 500):
+    """
+    --rebuild-library: regenerates the .strm/NFO/artwork tree from the database
+    alone (mappings, cached AniList metadata, cover art and media info), e.g.
+    after losing library_path or changing the naming. Touches no network.
+    Mappings are streamed and written by a pool of `workers` threads; sidecars
+    and thumbnails (made from the sources) are not recreated.
+    Returns the counts per outcome.
+    """
+    library_path = Path(config['local']['library_path'])
+    direct = strm_mode(config) == STRM_DIRECT
+    lock = threading.Lock()
+    metas = {}
+    series_done = set()
+
+    def anilist_for(row):
+        if row.get('metadata_status') != 'SUCCESS':
+            return None
+        try:
+            anilist_id = json.loads(row.get('metadata_info') or '{}').get('id')
+        except ValueError:
+            return None
+        if not anilist_id:
+            return None
+        with lock:
+            if anilist_id not in metas:
+                metas[anilist_id] = db.get_anilist_meta(anilist_id)
+            return metas[anilist_id]
+
+    def rebuild_one(row):
+        source = Path(row['source_path'])
+        meta = parse_filename(source.name)
+        anilist_meta = anilist_for(row)
+        series_name = series_title(meta, anilist_meta)
+        if not anilist_meta:
+            # Mappings from before the metadata cache still know their folder name
+            try:
+                series_name = json.loads(row.get('metadata_info') or '{}').get('canonical') or series_name
+            except ValueError:
+                pass
+        series_dir = library_path / "Anime" / series_name
+        dest_dir = series_dir / f"Season {meta['season']}"
+        std_name = meta['full_name']
+        strm_path = dest_dir / f"{std_name}.strm"
+        if not anilist_meta and Path(row['strm_path']).exists():
+            # Without AniList data the naming cannot be re-derived reliably; keep the .strm where it is
+            strm_path = Path(row['strm_path'])
+            dest_dir = strm_path.parent
+        try:
+            dest_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            logging.error("Rebuild: cannot create %s: %s", dest_dir, e)
+            return 'failed', None
+
+        if anilist_meta:
+            with lock:
+                first = series_dir not in series_done
+                series_done.add(series_dir)
+            if first:
+                series_artwork(db, anilist_meta, series_dir, offline=True, mode=materialize_mode(config, 'artwork'))
+        media = db.get_media_info(row['fingerprint']) if row.get('fingerprint') else None
+        if anilist_meta or media:
+            generate_episode_nfo(anilist_meta, meta['episode'], meta['season'], strm_path.with_suffix('.nfo'), media, show_title=series_name)
+
+        if direct and not row.get('seafile_url'):
+            return 'no_link', None
+        content = mapping_strm_content(config, row['id'], row['seafile_url'], std_name, source.suffix)
+        if not write_strm(strm_path, content):
+            return 'failed', None
+
+        if str(strm_path.resolve()) != row['strm_path']:
+            # Naming changed: drop the .strm written under the old name
+            old_strm = Path(row['strm_path'])
+            if old_strm.exists():
+                try:
+                    old_strm.unlink()
+                except OSError as e:
+                    logging.error("Rebuild: failed to delete old strm %s: %s", old_strm, e)
+            return 'renamed', (row['source_path'], strm_path)
+        return 'written', None
+
+    logging.info("Rebuilding library in %s from the database...", library_path)
+    counts = {'written': 0, 'renamed': 0, 'no_link': 0, 'failed': 0}
+    renamed = []
+
+    def tally(results):
+        for outcome, update in results:
+            counts[outcome] += 1
+            if update:
+                renamed.append(update)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='rebuild') as pool:
+        chunk = []
+        for row in db.iter_mappings():
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                tally(pool.map(rebuild_one, chunk))
+                chunk = []
+                memory_checkpoint(f"rebuilt {sum(counts.values())} mappings")
+        tally(pool.map(rebuild_one, chunk))
+
+    if renamed:
+        db.update_strm_paths(renamed)
+    for outcome, count in counts.items():
+        METRICS.inc('rebuild_files_total', count, result=outcome)
+    logging.info("Rebuild finished: %s written, %s renamed, %s without link, %s failed.",
+                 counts['written'], counts['renamed'], counts['no_link'], counts['failed'])
+    if counts['no_link']:
+        logging.warning("Rebuild: mappings without a share link were skipped; run --sync to link them.")
+    return counts
+
+def check_links(config, db: VideoMappingDB, router: TargetRouter, engine: AsyncNetEngine, chunk_size: int = 200):
+    """
+    Probes the stored share links and re-links broken ones.
+    Each run checks links.check_fraction of the mappings, least recently
+    checked first, so the whole library is covered over several runs without
+    loading the server; rows are streamed from the database in chunks.
+    """
+    links_conf = config.get('links') or {}
+    fraction = float(links_conf.get('check_fraction', 0.1))
+    concurrency = int(links_conf.get('concurrency', 8))
+
+    total = db.count_mappings()
+    budget = min(total, math.ceil(total * fraction))
+    logging.info("Checking %s of %s share link(s)...", budget, total)
+
+    started = datetime.now().isoformat()
+    counts = {}
+    seen = set()
+    while len(seen) < budget:
+        rows = db.get_links_to_check(started, min(chunk_size, budget - len(seen)))
+        rows = [r for r in rows if r['source_path'] not in seen]
+        if not rows:
+            break
+        results = probe_links(engine, [r['seafile_url'] for r in rows], concurrency)
+        for row in rows:
+            seen.add(row['source_path'])
+            status = results[row['seafile_url']]
+            if status == LINK_BROKEN:
+                status = relink(config, db, router, row)
+            else:
+                db.record_link_status(row['source_path'], status)
+            counts[status] = counts.get(status, 0) + 1
+
+    logging.info("Link check finished: %s", counts or 'nothing to check')
+    return counts
+
+def plan_paths(config, db: VideoMappingDB, router: TargetRouter, video_exts, paths):
+    """
+    --plan: classifies the files under `paths` (root_path if none) as upload,
+    relink, artifacts or skip and reports bytes to move, the estimated
+    transfer time and the remote calls a real run would make. Reads only
+    the database, the cached remote listing and the local files.
+    """
+    local_root = Path(config['local']['root_path'])
+    files = []
+    for target_path in (Path(p) for p in paths or [local_root]):
+        if target_path.is_file():
+            if target_path.suffix.lower() in video_exts:
+                files.append(target_path)
+        elif target_path.is_dir():
+            files.extend(target_path / rel for rel, _ in scan_local(target_path, video_exts))
+        else:
+            logging.warning("Plan: %s does not exist", target_path)
+
+    plan = build_plan(files, db, config, lazy_links(config), router)
+    upload_bytes = plan.total_bytes(PLAN_UPLOAD)
+    concurrency = upload_concurrency(config)
+    throughput = db.get_throughput()
+
+    logging.info("Plan: %s file(s): %s", len(plan.files), ", ".join(f"{kind} {plan.count(kind)}" for kind in PLAN_KINDS))
+    logging.info("Plan: %.2f GiB to upload, %.2f GiB already on the remote", upload_bytes / 2**30,
+                 sum(plan.total_bytes(kind) for kind in PLAN_KINDS if kind != PLAN_UPLOAD) / 2**30)
+    logging.info("Plan: bwlimit %s, historical throughput %s per transfer, concurrency %s",
+                 build_bwlimit(config['rclone']), f"{throughput / 2**20:.2f} MiB/s" if throughput else "unknown", concurrency)
+    logging.info("Plan: estimated upload time %s", format_duration(estimate_seconds(upload_bytes, config['rclone'], throughput, concurrency)))
+    logging.info("Plan: API calls: %s", ", ".join(f"{name} {count}" for name, count in plan.api_calls().items()))
+    return plan
+
+def write_metrics(config, root_dir: Path):
+    """Emits the run's metrics as a JSON summary and, if configured, a Prometheus textfile."""
+    metrics_conf = config.get('metrics') or {}
+    json_path = metrics_conf.get('json_path') or str(root_dir / "logs" / "metrics.json")
+    METRICS.write_json(json_path)
+
+    textfile_path = metrics_conf.get('textfile_path')
+    if textfile_path:
+        METRICS.write_prometheus(textfile_path)
+
+    for entry in METRICS.summary()['histograms'].get('stage_seconds', []):
+        logging.info("Stage %s: n=%s p50=%.3fs p95=%.3fs", entry['labels'].get('stage'), entry['count'], entry['p50'], entry['p95'])
 
 def main():
     # Disable Quick Edit Mode (Windows)
@@ -214,7 +1043,7 @@ def main():
 
     # Setup logging with config
     log_level = config.get('log_level', 'INFO')
-    setup_logging(str(root_dir / "logs"), log_level=log_level)
+    setup_logging(str(root_dir / "logs"), log_level=log_level, log_format=config.get('log_format', 'text'))
 
     # Init DB
     db_path = root_dir / "data" / "video_map.db"
@@ -225,25 +1054,71 @@ def main():
     # Parse Args
     parser = argparse.ArgumentParser(description="NAS Seafile Offloader")
     parser.add_argument("paths", nargs='*', help="File or Folder paths passed by qBittorrent or manual selection")
+    parser.add_argument("--torrent", action="append", default=[], help="Process the files of a .torrent (a .fastresume next to it supplies the save path)")
+    parser.add_argument("--infohash", action="append", default=[], help="Process a torrent by infohash (qBittorrent %%I), read from torrents.bt_backup")
+    parser.add_argument("--save-path", help="Save path of the --torrent/--infohash content, overrides the resume data")
+    parser.add_argument("--plan", action="store_true", help="Dry run: classify the given paths (root_path if none) and estimate bytes, upload time and API calls, then exit")
     parser.add_argument("--prune", action="store_true", help="Remove orphaned strm files for deleted source files")
+    parser.add_argument("--resume", action="store_true", help="Resume interrupted jobs and due retries from the job journal")
+    parser.add_argument("--refresh-remote", action="store_true", help="Force a refresh of the cached remote listing")
+    parser.add_argument("--sync", action="store_true", help="Reconcile local archive, database and remote tree")
+    parser.add_argument("--check-links", action="store_true", help="Probe a sample of share links and re-link broken ones")
+    parser.add_argument("--watch", action="store_true", help="Keep running and process files that appear under root_path once complete (blocks)")
+    parser.add_argument("--rebuild-library", action="store_true", help="Regenerate the .strm/NFO/artwork tree from the database only (no network), then exit")
+    parser.add_argument("--tier", action="store_true", help="Evict uploaded local files (oldest first) until root_path reaches tiering.min_free_gb")
+    parser.add_argument("--serve-resolver", action="store_true", help="Run the share link resolver for local.strm_mode: resolver (blocks)")
+    parser.add_argument("--serve-proxy", action="store_true", help="Run the LAN caching proxy for local.strm_mode: proxy (blocks)")
+    parser.add_argument("--profile", action="store_true", help="Profile the run (cProfile .pstats + sampled .collapsed stacks in logs/)")
+    parser.add_argument("--trace-memory", action="store_true", help="Trace allocations at stage boundaries and report top allocators")
     args = parser.parse_args()
-    
+
+    log_dir = root_dir / "logs"
+    if args.trace_memory:
+        start_memory_trace(log_dir)
+
+    try:
+        with profile_run(log_dir) if args.profile else nullcontext():
+            run(args, config, db, root_dir)
+    finally:
+        stop_memory_trace()
+
+    logging.info("Job execution finished.")
+
+def run(args, config, db: VideoMappingDB, root_dir: Path):
+    """Executes the commands selected on the command line."""
+    if args.plan:
+        # Dry run: no network, no library or metrics output
+        video_exts = tuple(ext.lower() for ext in config.get('local', {}).get('extensions', ['.mp4', '.mkv', '.avi', '.mov']))
+        targets = load_targets(config, build_bwlimit(config['rclone']))
+        plan_paths(config, db, TargetRouter(targets, db, config.get('placement', 'hash')), video_exts, args.paths)
+        return
+
+    if args.rebuild_library:
+        # Offline: needs nothing but the database (no clients, migration, retries or Jellyfin)
+        if args.prune:
+            prune_mappings(db)
+        rebuild_library(config, db)
+        write_metrics(config, root_dir)
+        return
+
+    # Changed library folders are reported to Jellyfin (if configured) at the end
+    start_notifier(config)
+    # Trickplay sheets are generated in the background and awaited at the end
+    start_trickplay(config)
+
     # Handle Prune
     if args.prune:
         prune_mappings(db)
 
     # Init Clients
-    seafile = SeafileClient(
-        config['seafile']['host'],
-        config['seafile']['api_token'],
-        config['seafile']['repo_id']
-    )
-    rclone = RcloneWrapper(
-        config['rclone']['remote_name'],
-        config['rclone']['bwlimit']
-    )
+    # Concurrent transfers share the configured limit (--bwlimit is per process)
+    concurrency = upload_concurrency(config)
+    targets = load_targets(config, split_bwlimit(build_bwlimit(config['rclone']), concurrency), progress=concurrency == 1)
+    router = TargetRouter(targets, db, config.get('placement', 'hash'))
+    seafile, rclone = targets[0].seafile, targets[0].rclone
 
     anilist_client = AniListClient()
+    engine = make_engine(config)
 
     # Migration Check
     # Check if migration is needed (files outside /Anime)
@@ -251,26 +1126,66 @@ def main():
     library_path_str = config['local'].get('library_path')
     if library_path_str:
         try:
-             migrate_legacy_library(Path(library_path_str), anilist_client)
+             migrate_legacy_library(Path(library_path_str), anilist_client, materialize_mode(config, 'migration'))
         except Exception as e:
-             logging.error(f"Migration failed: {e}")
+             logging.error("Migration failed: %s", e)
 
     # Get extensions from config or default
     video_exts = tuple(config.get('local', {}).get('extensions', ['.mp4', '.mkv', '.avi', '.mov']))
     # Ensure they are lower case
     video_exts = tuple(ext.lower() for ext in video_exts)
 
+    if args.refresh_remote and not args.sync:
+        for target in targets:
+            refresh_remote_cache(db, target.rclone, target.remote_root, target.name)
+
+    if args.sync:
+        sync_library(config, seafile, rclone, anilist_client, video_exts, db, engine, router)
+
+    if args.check_links:
+        check_links(config, db, router, engine)
+
     for path_str in args.paths:
         target_path = Path(path_str)
-        logging.info(f"Triggered for: {target_path}")
+        logging.info("Triggered for: %s", target_path)
 
         try:
-            process_path_arg(target_path, config, seafile, rclone, anilist_client, video_exts, db)
+            process_path_arg(target_path, config, seafile, rclone, anilist_client, video_exts, db, engine, router)
         except Exception as e:
-            logging.exception(f"Critical error during execution for {target_path}: {e}")
+            logging.exception("Critical error during execution for %s: %s", target_path, e)
             # Continue with other paths even if one fails
-    
-    logging.info("Job execution finished.")
+
+    torrents = [(Path(t), None) for t in args.torrent] + [(None, h) for h in args.infohash]
+    for torrent_path, infohash in torrents:
+        logging.info("Triggered for torrent: %s", torrent_path or infohash)
+        try:
+            ingest_torrent(config, seafile, rclone, anilist_client, video_exts, db, engine, router,
+                           torrent_path, infohash, Path(args.save_path) if args.save_path else None)
+        except (OSError, ValueError) as e:
+            logging.error("Cannot read torrent %s: %s", torrent_path or infohash, e)
+        except Exception as e:
+            logging.exception("Critical error during execution for torrent %s: %s", torrent_path or infohash, e)
+
+    # Interrupted jobs on request; the retry queue is drained on every run
+    resume_jobs(config, seafile, rclone, anilist_client, db, retries_only=not args.resume, router=router)
+
+    if args.watch:
+        watch_library(config, seafile, rclone, anilist_client, video_exts, db, engine, router)
+
+    # Sheets need the local sources, so they are finished before tiering evicts any
+    stop_trickplay()
+
+    if args.tier:
+        run_tiering(config, db, router, lazy_links(config))
+
+    engine.close()
+    stop_notifier()
+    write_metrics(config, root_dir)
+
+    if args.serve_resolver:
+        serve_resolver(config, db, router)
+    elif args.serve_proxy:
+        serve_proxy(config, db, router, root_dir / "cache")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import errno
+import shutil
+import logging
+import threading
+from pathlib import Path
+
+MODE_AUTO = 'auto'          # hardlink, then reflink, then copy
+MODE_HARDLINK = 'hardlink'  # hardlink or copy
+MODE_REFLINK = 'reflink'    # reflink or copy
+MODE_COPY = 'copy'
+
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)): shares the extents of a file (Btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+# Errors meaning "not possible here", as opposed to a real I/O failure
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOTTY, errno.ENOSYS}
+
+# Devices on which a technique failed once; not tried again in this process
+_unsupported = set()
+_lock = threading.Lock()
+
+def materialize_mode(config, kind: str) -> str:
+    """Configured mode for an artifact kind (`materialize` section: subtitles, artwork, migration)."""
+    mode = (config.get('materialize') or {}).get(kind, MODE_AUTO)
+    if mode not in (MODE_AUTO, MODE_HARDLINK, MODE_REFLINK, MODE_COPY):
+        logging.warning("Unknown materialize mode '%s' for %s, using %s.", mode, kind, MODE_AUTO)
+        return MODE_AUTO
+    return mode
+
+def _device(path: Path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+def _known_unsupported(technique, device) -> bool:
+    with _lock:
+        return (technique, device) in _unsupported
+
+def _mark_unsupported(technique, device, error):
+    logging.debug("Materialize: %s not available on device %s: %s", technique, device, error)
+    with _lock:
+        _unsupported.add((technique, device))
+
+def _reflink(src: Path, dest: Path):
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.ENOTSUP, "reflinks are only used on Linux")
+    import fcntl
+    with open(src, 'rb') as s, open(dest, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dest)
+
+def materialize(src: Path, dest: Path, mode: str = MODE_AUTO) -> str:
+    """
+    Places the content of src at dest without copying bytes where possible:
+    a hardlink, then a reflink, then a plain copy (as allowed by mode).
+    Links are only tried when both paths are on the same device. An existing
+    dest is replaced. Returns the technique used; raises OSError if even the
+    copy fails.
+    """
+    src, dest = Path(src), Path(dest)
+    src_dev = _device(src)
+    same_device = src_dev is not None and src_dev == _device(dest.parent)
+
+    if dest.exists():
+        if same_device and os.path.samefile(src, dest):
+            return MODE_HARDLINK
+        dest.unlink()
+
+    techniques = []
+    if same_device and mode in (MODE_AUTO, MODE_HARDLINK):
+        techniques.append((MODE_HARDLINK, os.link))
+    if same_device and mode in (MODE_AUTO, MODE_REFLINK):
+        techniques.append((MODE_REFLINK, _reflink))
+
+    for technique, place in techniques:
+        if _known_unsupported(technique, src_dev):
+            continue
+        try:
+            place(src, dest)
+            return technique
+        except OSError as e:
+            if dest.exists():
+                dest.unlink()
+            if e.errno not in _UNSUPPORTED:
+                raise
+            _mark_unsupported(technique, src_dev, e)
+
+    shutil.copy2(src, dest)
+    return MODE_COPY
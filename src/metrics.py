@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from utils import log_context
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+def _label_key(labels: dict):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms for one run.
+    Histograms keep raw samples (one per processed item) so the run summary
+    has exact percentiles; the Prometheus export uses fixed buckets.
+    """
+    def __init__(self, prefix="njubox_sync", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def inc(self, name: str, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.histograms.setdefault(key, []).append(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def summary(self) -> dict:
+        """JSON-serialisable summary of the run."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+
+        result = {
+            'started': self.started,
+            'duration': time.time() - self.started,
+            'counters': {},
+            'histograms': {},
+        }
+        for (name, key), value in sorted(counters.items()):
+            result['counters'].setdefault(name, []).append({'labels': dict(key), 'value': value})
+        for (name, key), values in sorted(histograms.items()):
+            result['histograms'].setdefault(name, []).append({
+                'labels': dict(key),
+                'count': len(values),
+                'sum': sum(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'max': max(values),
+            })
+        return result
+
+    def to_prometheus(self) -> str:
+        """Renders the registry in Prometheus text exposition format."""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {k: list(v) for k, v in self.histograms.items()}
+
+        lines = []
+        seen = set()
+        for (name, key), value in sorted(counters.items()):
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_format_labels(key)} {value}")
+
+        for (name, key), values in sorted(histograms.items()):
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} histogram")
+                seen.add(metric)
+            for bound in self.buckets:
+                count = sum(1 for v in values if v <= bound)
+                lines.append(f"{metric}_bucket{_format_labels(key, [('le', bound)])} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(key, [('le', '+Inf')])} {len(values)}")
+            lines.append(f"{metric}_sum{_format_labels(key)} {sum(values)}")
+            lines.append(f"{metric}_count{_format_labels(key)} {len(values)}")
+
+        lines.append(f"# TYPE {self.prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{self.prefix}_last_run_timestamp_seconds {self.started:.0f}")
+        lines.append(f"# TYPE {self.prefix}_last_run_duration_seconds gauge")
+        lines.append(f"{self.prefix}_last_run_duration_seconds {time.time() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        _atomic_write(path, json.dumps(self.summary(), indent=2))
+        logging.info("Metrics summary written: %s", path)
+
+    def write_prometheus(self, path: str):
+        # node_exporter may read the file at any time, so replace it atomically
+        _atomic_write(path, self.to_prometheus())
+        logging.info("Metrics textfile written: %s", path)
+
+def _atomic_write(path: str, content: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.error("Failed to write metrics file %s: %s", path, e)
+
+# Process-wide registry used by the pipeline modules
+METRICS = MetricsRegistry()
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a process_file stage: `with stage('upload'): ...`
+    Log records emitted inside carry the stage name.
+    """
+    with log_context(stage=name), METRICS.timer('stage_seconds', stage=name):
+        yield
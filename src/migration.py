@@ -3,15 +3,16 @@ import logging
 from pathlib import Path
 from utils import generate_tvshow_nfo, save_image, sanitize_filename
 from anilist_client import AniListClient
+from materialize import materialize, MODE_AUTO
 
-def migrate_legacy_library(library_path: Path, anilist_client: AniListClient):
+def migrate_legacy_library(library_path: Path, anilist_client: AniListClient, artwork_mode: str = MODE_AUTO):
     """
     Scans the library_path for folders that are NOT "Anime".
     Moves them into library_path / "Anime" / [Canonical Title] / ...
-    Generates NFOs and cover art.
+    Generates NFOs and cover art (folder.jpg placed per artwork_mode, see materialize).
     """
     if not library_path.exists():
-        logging.warning(f"Library path {library_path} does not exist. Skipping migration.")
+        logging.warning("Library path %s does not exist. Skipping migration.", library_path)
         return
 
     anime_root = library_path / "Anime"
@@ -28,7 +29,7 @@ def migrate_legacy_library(library_path: Path, anilist_client: AniListClient):
 
         # Found a potential legacy series folder
         legacy_name = item.name
-        logging.info(f"Migration: Found legacy folder '{legacy_name}'")
+        logging.info("Migration: Found legacy folder '%s'", legacy_name)
 
         # 1. Identify Series
         metadata = anilist_client.search_anime(legacy_name)
@@ -36,9 +37,9 @@ def migrate_legacy_library(library_path: Path, anilist_client: AniListClient):
             canonical_title = metadata['title']['english'] or metadata['title']['romaji']
             # Sanitize for filesystem
             canonical_title = sanitize_filename(canonical_title)
-            logging.info(f"Migration: Identified '{legacy_name}' as '{canonical_title}'")
+            logging.info("Migration: Identified '%s' as '%s'", legacy_name, canonical_title)
         else:
-            logging.warning(f"Migration: Could not identify '{legacy_name}'. Moving as is.")
+            logging.warning("Migration: Could not identify '%s'. Moving as is.", legacy_name)
             canonical_title = sanitize_filename(legacy_name)
             metadata = None # Cannot generate full NFO
 
@@ -58,27 +59,32 @@ def migrate_legacy_library(library_path: Path, anilist_client: AniListClient):
                         # Recursively move/merge content?
                         # For now, let's just use shutil.move which might fail if dest exists
                         # Better: iterate deeper or rename source
-                        logging.warning(f"Migration: Destination {dest} already exists. Skipping merge for {sub_item.name}")
+                        logging.warning("Migration: Destination %s already exists. Skipping merge for %s", dest, sub_item.name)
                     else:
-                        logging.warning(f"Migration: File {dest} already exists. Skipping {sub_item.name}")
+                        logging.warning("Migration: File %s already exists. Skipping %s", dest, sub_item.name)
                 else:
                     shutil.move(str(sub_item), str(dest))
             except Exception as e:
-                logging.error(f"Migration: Failed to move {sub_item} to {dest}: {e}")
+                logging.error("Migration: Failed to move %s to %s: %s", sub_item, dest, e)
 
         # 4. Generate Metadata (NFO / Images)
         if metadata:
             generate_tvshow_nfo(metadata, target_series_dir)
             if metadata.get('coverImage') and metadata['coverImage'].get('large'):
                 # Save as poster.jpg
-                save_image(metadata['coverImage']['large'], target_series_dir / "poster.jpg")
-                # Also save as folder.jpg for Windows/some players
-                save_image(metadata['coverImage']['large'], target_series_dir / "folder.jpg")
+                poster_path = target_series_dir / "poster.jpg"
+                save_image(metadata['coverImage']['large'], poster_path)
+                # Also folder.jpg for Windows/some players, linked instead of downloaded again
+                if poster_path.exists():
+                    try:
+                        materialize(poster_path, target_series_dir / "folder.jpg", artwork_mode)
+                    except OSError as e:
+                        logging.error("Migration: Failed to place folder.jpg in %s: %s", target_series_dir, e)
 
         # 5. Clean up old folder
         try:
             # Only remove if empty
             item.rmdir()
-            logging.info(f"Migration: Removed empty legacy folder '{legacy_name}'")
+            logging.info("Migration: Removed empty legacy folder '%s'", legacy_name)
         except OSError:
-            logging.warning(f"Migration: Could not remove '{legacy_name}' (not empty?)")
+            logging.warning("Migration: Could not remove '%s' (not empty?)", legacy_name)
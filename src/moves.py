@@ -0,0 +1,43 @@
+import os
+import hashlib
+import logging
+from pathlib import Path
+
+# Bytes hashed at the start, middle and end of a file
+SAMPLE_SIZE = 64 * 1024
+
+def file_fingerprint(path: Path, sample_size: int = SAMPLE_SIZE):
+    """
+    Cheap content identity: "<size>:<blake2b of three sampled chunks>".
+    Survives renames and moves across volumes without reading whole files.
+    Returns None if the file cannot be read.
+    """
+    try:
+        size = os.path.getsize(path)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(size).encode('ascii'))
+        with open(path, 'rb') as f:
+            for offset in sorted({0, max(0, size // 2 - sample_size // 2), max(0, size - sample_size)}):
+                f.seek(offset)
+                digest.update(f.read(sample_size))
+        return f"{size}:{digest.hexdigest()}"
+    except OSError as e:
+        logging.debug("Cannot fingerprint %s: %s", path, e)
+        return None
+
+def find_moved_source(db, file_path: Path, fingerprint: str):
+    """
+    Returns the mapping of a file that was moved/renamed to file_path: same
+    fingerprint, different source path, and the old source is gone (a copy
+    that still exists is a new file). Evicted mappings do not count as moved,
+    their source is missing on purpose.
+    """
+    if not fingerprint:
+        return None
+    new_key = str(file_path.resolve())
+    for row in db.find_by_fingerprint(fingerprint):
+        if row['source_path'] == new_key or row.get('evicted_at'):
+            continue
+        if not os.path.exists(row['source_path']):
+            return row
+    return None
@@ -0,0 +1,187 @@
+import logging
+from pathlib import Path
+from typing import NamedTuple
+from datetime import datetime, timedelta
+from utils import parse_filename
+from moves import file_fingerprint, find_moved_source
+from upload_scheduler import parse_rate
+from database import JOB_STEPS
+
+PLAN_UPLOAD = 'upload'        # Not on the remote: transfer, link and artifacts
+PLAN_RELINK = 'relink'        # On the remote (or moved there): share link and artifacts
+PLAN_ARTIFACTS = 'artifacts'  # Uploaded and linked: .strm/NFO/thumbnail only
+PLAN_SKIP = 'skip'            # Nothing remote to do and the .strm is in place
+
+PLAN_KINDS = (PLAN_UPLOAD, PLAN_RELINK, PLAN_ARTIFACTS, PLAN_SKIP)
+
+# Longest horizon simulated through a bwlimit timetable
+MAX_ESTIMATE_DAYS = 365
+
+class PlannedFile(NamedTuple):
+    kind: str
+    path: Path
+    size: int
+    target: str
+    moved: bool = False
+
+def _reached(job, step: str) -> bool:
+    return bool(job) and job.get('step') in JOB_STEPS and JOB_STEPS.index(job['step']) >= JOB_STEPS.index(step)
+
+def classify(mapping, job, remote_entry, size: int, lazy_links: bool, moved=None, max_age: timedelta = None, now: datetime = None) -> str:
+    """
+    What the pipeline would still do for a file, mirroring _process_file:
+    a transfer unless the job journal, a fresh cached remote entry of the
+    same size or a detected move says the content is there; a share link
+    unless the journal holds one or links are lazy (a moved file needs a new
+    one); the library artifacts unless the .strm is in place. The steps of a
+    finished job count for nothing, like in start_job: a re-run starts over.
+    """
+    if job and job.get('status') == 'done':
+        job = None
+    cached = bool(remote_entry) and remote_entry['size'] == size
+    if cached and max_age is not None and (now or datetime.now()) - remote_entry['checked_at'] > max_age:
+        cached = False
+    if not (moved or cached or _reached(job, 'uploaded')):
+        return PLAN_UPLOAD
+
+    if moved:
+        has_link = lazy_links
+    else:
+        has_link = lazy_links or (_reached(job, 'linked') and bool(job.get('link')))
+    if not has_link:
+        return PLAN_RELINK
+
+    if moved or not mapping or not Path(mapping['strm_path']).exists():
+        return PLAN_ARTIFACTS
+    if job is not None and not _reached(job, 'artifacts'):
+        return PLAN_ARTIFACTS
+    return PLAN_SKIP
+
+def _rate_at(schedule, when: datetime):
+    """(bytes/sec or None, next switch) of a {"HH:MM": rate} timetable at `when`."""
+    slots = sorted((int(k.split(':')[0]) * 60 + int(k.split(':')[1]), v) for k, v in schedule.items())
+    minute = when.hour * 60 + when.minute
+    current = slots[-1][1] # Before the first switch the last one of the previous day applies
+    next_minute = slots[0][0] + 24 * 60
+    for start, rate in slots:
+        if start <= minute:
+            current = rate
+        else:
+            next_minute = start
+            break
+    midnight = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    return _upload_rate(current), midnight + timedelta(minutes=next_minute)
+
+def _upload_rate(rate) -> float:
+    # "up:down" limits: uploads are bound by the first one
+    return parse_rate(str(rate).split(':')[0])
+
+def estimate_seconds(total_bytes: int, rclone_conf: dict, throughput: float = None, concurrency: int = 1, start: datetime = None):
+    """
+    Seconds to transfer total_bytes. The rate at any time is the configured
+    bwlimit (static or `bwlimit_schedule` timetable, shared by all concurrent
+    transfers) capped by `throughput` (historical bytes/sec of one transfer)
+    times concurrency. Returns None when neither bounds the rate.
+    """
+    if total_bytes <= 0:
+        return 0.0
+    history = throughput * max(1, concurrency) if throughput else None
+
+    def effective(limit):
+        rates = [r for r in (limit, history) if r]
+        return min(rates) if rates else None
+
+    schedule = rclone_conf.get('bwlimit_schedule')
+    if not schedule:
+        rate = effective(_upload_rate(rclone_conf.get('bwlimit', 'off')))
+        return total_bytes / rate if rate else None
+
+    start = start or datetime.now()
+    when, remaining = start, float(total_bytes)
+    while when - start < timedelta(days=MAX_ESTIMATE_DAYS):
+        limit, switch = _rate_at(schedule, when)
+        rate = effective(limit)
+        if rate is None:
+            return None
+        window = (switch - when).total_seconds()
+        if remaining <= rate * window:
+            return (when - start).total_seconds() + remaining / rate
+        remaining -= rate * window
+        when = switch
+    return None
+
+def format_duration(seconds) -> str:
+    if seconds is None:
+        return "unknown"
+    seconds = int(round(seconds))
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{days}d {hours:02}:{minutes:02}:{seconds:02}" if days else f"{hours:02}:{minutes:02}:{seconds:02}"
+
+class Plan:
+    """Classified files of a dry run and the totals derived from them."""
+    def __init__(self, lazy_links: bool = False):
+        self.lazy_links = lazy_links
+        self.files = []
+
+    def add(self, entry: PlannedFile):
+        self.files.append(entry)
+
+    def count(self, kind: str) -> int:
+        return sum(1 for f in self.files if f.kind == kind)
+
+    def total_bytes(self, kind: str = PLAN_UPLOAD) -> int:
+        return sum(f.size for f in self.files if f.kind == kind)
+
+    def api_calls(self) -> dict:
+        """
+        Remote calls the run would make: rclone transfers and server-side
+        moves, Seafile share-link requests (one POST per missing link, a GET
+        more if it already exists) and AniList searches (one per distinct
+        parsed title; answers are cached for the run).
+        """
+        work = [f for f in self.files if f.kind != PLAN_SKIP]
+        return {
+            'rclone_uploads': self.count(PLAN_UPLOAD),
+            'rclone_moves': sum(1 for f in work if f.moved),
+            'seafile_share_links': 0 if self.lazy_links else self.count(PLAN_UPLOAD) + self.count(PLAN_RELINK),
+            'anilist_searches': len({parse_filename(f.path.name)['title'] for f in work}),
+        }
+
+def build_plan(files, db, config, lazy_links: bool, router=None) -> Plan:
+    """
+    Classifies files (paths under root_path) without network access or
+    writes: only the database, the cached remote listing and the local files
+    themselves (size, fingerprint samples of unmapped ones) are read.
+    """
+    local_root = Path(config['local']['root_path'])
+    remote_root = config['rclone']['remote_root']
+    max_age = timedelta(hours=config['rclone'].get('remote_cache_max_age', 24))
+
+    plan = Plan(lazy_links)
+    for file_path in files:
+        try:
+            rel_path = file_path.relative_to(local_root)
+            size = file_path.stat().st_size
+        except (ValueError, OSError) as e:
+            logging.warning("Plan: skipping %s: %s", file_path, e)
+            continue
+
+        mapping = db.get_mapping(file_path)
+        job = db.get_job(file_path)
+        moved = None
+        if mapping is None and not _reached(job, 'uploaded'):
+            moved = find_moved_source(db, file_path, file_fingerprint(file_path))
+
+        target, root = '', remote_root
+        if router is not None:
+            # Offline the parsed title stands in for the AniList series name of the hash policy
+            placed = router.get(moved['target']) if moved else router.resolve(file_path, rel_path, parse_filename(file_path.name)['title'])
+            target, root = placed.name, placed.remote_root
+        remote_path = f"{root}/{rel_path.as_posix().lstrip('/')}".replace('//', '/')
+
+        kind = classify(mapping, job, db.get_remote_file(remote_path, target), size, lazy_links, moved, max_age)
+        plan.add(PlannedFile(kind, file_path, size, target, moved is not None))
+        logging.debug("Plan: %s %s", kind, file_path)
+    return plan
@@ -0,0 +1,154 @@
+import os
+import sys
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+class StackSampler:
+    """
+    Statistical profiler: a daemon thread samples the stacks of all other
+    threads every `interval` seconds and counts collapsed stacks
+    ("outer;inner;leaf count" lines, the input format of flamegraph.pl / speedscope).
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding='utf-8') as f:
+            for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def profile_run(output_dir, interval=0.005, top=25):
+    """
+    Profiles the enclosed block with cProfile (deterministic, .pstats) and a
+    StackSampler (statistical, .collapsed for flamegraphs). Both files are
+    written to output_dir with a shared timestamp.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = output_dir / f"profile-{datetime.now():%Y%m%d-%H%M%S}"
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler(interval)
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+        pstats_path = f"{stem}.pstats"
+        collapsed_path = f"{stem}.collapsed"
+        profiler.dump_stats(pstats_path)
+        sampler.write_collapsed(collapsed_path)
+        logging.info("Profile written: %s (%s samples -> %s)", pstats_path, sampler.samples, collapsed_path)
+
+        stats = pstats.Stats(profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+        for (filename, line, func), (cc, nc, tt, ct, callers) in rows:
+            logging.info("Profile: %8.3fs cum %8.3fs self %7d calls  %s:%s(%s)", ct, tt, nc, os.path.basename(filename), line, func)
+
+class MemoryTracer:
+    """
+    tracemalloc snapshots at stage boundaries. Each checkpoint logs the top
+    allocation growth since the previous checkpoint; report() logs and writes
+    the top allocators of the final snapshot.
+    """
+    def __init__(self, output_dir, top=10, frames=5):
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.frames = frames
+        self.previous = None
+        self.checkpoints = []
+
+    def start(self):
+        tracemalloc.start(self.frames)
+        self.previous = tracemalloc.take_snapshot()
+        self.checkpoints.append(('start', 0, 0))
+
+    def checkpoint(self, label):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        self.checkpoints.append((label, current, peak))
+        logging.info("Memory [%s]: current %.1f MiB, peak %.1f MiB", label, current / 2**20, peak / 2**20)
+        for stat in snapshot.compare_to(self.previous, 'lineno')[:self.top]:
+            if stat.size_diff > 0:
+                logging.debug("Memory [%s] growth: %s", label, stat)
+        self.previous = snapshot
+
+    def report(self):
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"memory-{datetime.now():%Y%m%d-%H%M%S}.txt"
+        top_stats = snapshot.statistics('traceback')[:self.top]
+
+        with open(path, "w", encoding='utf-8') as f:
+            f.write(f"current {current} bytes, peak {peak} bytes\n\nCheckpoints:\n")
+            for label, cur, pk in self.checkpoints:
+                f.write(f"  {label}: current {cur} peak {pk}\n")
+            f.write("\nTop allocators:\n")
+            for stat in top_stats:
+                f.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+
+        logging.info("Memory trace: peak %.1f MiB, report written to %s", peak / 2**20, path)
+        for stat in top_stats[:5]:
+            frame = stat.traceback[0]
+            logging.info("Memory top: %.1f KiB in %d blocks at %s:%s", stat.size / 1024, stat.count, frame.filename, frame.lineno)
+
+# Active tracer when running with --trace-memory
+_memory_tracer = None
+
+def start_memory_trace(output_dir, top=10):
+    global _memory_tracer
+    _memory_tracer = MemoryTracer(output_dir, top=top)
+    _memory_tracer.start()
+    return _memory_tracer
+
+def stop_memory_trace():
+    global _memory_tracer
+    if _memory_tracer is not None:
+        _memory_tracer.report()
+        _memory_tracer = None
+
+def memory_checkpoint(label):
+    """Takes a tracemalloc snapshot if --trace-memory is active; no-op otherwise."""
+    if _memory_tracer is not None:
+        _memory_tracer.checkpoint(label)
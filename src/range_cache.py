@@ -0,0 +1,149 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+class RangeCache:
+    """
+    Size-bounded on-disk cache of byte ranges.
+
+    Each object (one video) is a data file of the object's full size, written
+    only where blocks were fetched (sparse where the filesystem supports it).
+    A sqlite index records the object size, which `block_size` blocks are
+    present and when the object was last read; when the cached blocks exceed
+    `max_bytes` the least recently used objects are evicted.
+    """
+    def __init__(self, cache_dir, max_bytes, block_size=1 << 20):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.index_path = str(self.cache_dir / "index.db")
+        self._lock = threading.Lock()
+        self._init_index()
+
+    def _init_index(self):
+        with sqlite3.connect(self.index_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS objects (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER,
+                    content_type TEXT,
+                    last_access REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blocks (
+                    key TEXT,
+                    block INTEGER,
+                    PRIMARY KEY (key, block)
+                )
+            """)
+            conn.commit()
+
+    def _data_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.data"
+
+    def get_object(self, key: str):
+        """Returns {'size', 'content_type'} of a known object, or None."""
+        with sqlite3.connect(self.index_path) as conn:
+            row = conn.execute("SELECT size, content_type FROM objects WHERE key = ?", (key,)).fetchone()
+        return {'size': row[0], 'content_type': row[1]} if row else None
+
+    def put_object(self, key: str, size: int, content_type: str = None):
+        """Registers an object. A size change (file replaced at the origin) drops its cached blocks."""
+        known = self.get_object(key)
+        if known and known['size'] == size:
+            return
+        with self._lock, sqlite3.connect(self.index_path) as conn:
+            conn.execute("DELETE FROM blocks WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO objects (key, size, content_type, last_access) VALUES (?, ?, ?, ?)",
+                (key, size, content_type, time.time())
+            )
+            conn.commit()
+            with open(self._data_path(key), "wb") as f:
+                f.truncate(size)
+
+    def block_range(self, start: int, end: int):
+        """First and last block covering the inclusive byte range start-end."""
+        return start // self.block_size, end // self.block_size
+
+    def missing_blocks(self, key: str, first: int, last: int):
+        with sqlite3.connect(self.index_path) as conn:
+            present = {row[0] for row in conn.execute(
+                "SELECT block FROM blocks WHERE key = ? AND block BETWEEN ? AND ?", (key, first, last)
+            )}
+        return [b for b in range(first, last + 1) if b not in present]
+
+    def write_blocks(self, key: str, first_block: int, data: bytes):
+        """
+        Stores data starting at first_block. Only whole blocks (or the final,
+        shorter block of the object) are marked present.
+        """
+        obj = self.get_object(key)
+        if not obj:
+            return
+        offset = first_block * self.block_size
+        with open(self._data_path(key), "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+
+        blocks = []
+        end = offset + len(data)
+        block = first_block
+        while True:
+            block_end = min((block + 1) * self.block_size, obj['size'])
+            if block_end > end or block_end <= block * self.block_size:
+                break
+            blocks.append(block)
+            block += 1
+        if blocks:
+            with sqlite3.connect(self.index_path) as conn:
+                conn.executemany("INSERT OR IGNORE INTO blocks (key, block) VALUES (?, ?)", ((key, b) for b in blocks))
+                conn.commit()
+        self.evict(keep=key)
+
+    def read(self, key: str, start: int, end: int) -> bytes:
+        """Reads the inclusive byte range start-end (the blocks must be present)."""
+        with open(self._data_path(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def touch(self, key: str):
+        with sqlite3.connect(self.index_path) as conn:
+            conn.execute("UPDATE objects SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+
+    def usage(self) -> int:
+        """Cached bytes (present blocks times block size)."""
+        with sqlite3.connect(self.index_path) as conn:
+            return conn.execute("SELECT count(*) FROM blocks").fetchone()[0] * self.block_size
+
+    def evict(self, keep: str = None):
+        """Evicts least recently used objects until the cache fits max_bytes."""
+        with self._lock:
+            used = self.usage()
+            if used <= self.max_bytes:
+                return
+            with sqlite3.connect(self.index_path) as conn:
+                rows = conn.execute("""
+                    SELECT o.key, count(b.block) FROM objects o LEFT JOIN blocks b ON b.key = o.key
+                    GROUP BY o.key ORDER BY o.last_access
+                """).fetchall()
+                for key, blocks in rows:
+                    if used <= self.max_bytes:
+                        break
+                    if key == keep:
+                        continue
+                    conn.execute("DELETE FROM blocks WHERE key = ?", (key,))
+                    conn.execute("DELETE FROM objects WHERE key = ?", (key,))
+                    try:
+                        os.remove(self._data_path(key))
+                    except OSError as e:
+                        logging.warning("Cache: could not remove %s: %s", key, e)
+                    used -= blocks * self.block_size
+                    logging.info("Cache: evicted %s (%s blocks)", key, blocks)
+                conn.commit()
@@ -1,27 +1,37 @@
 import subprocess
 import logging
 import os
+import json
+from metrics import METRICS
 
 class RcloneWrapper:
-    def __init__(self, remote_name, bandwidth_limit="5M"):
+    def __init__(self, remote_name, bandwidth_limit="5M", executable="rclone", progress=True):
         self.remote_name = remote_name
+        # A plain rate ("5M") or an rclone timetable ("08:00,1M 23:00,off")
         self.bwlimit = bandwidth_limit
+        self.executable = executable
+        # Concurrent uploads would interleave their progress bars on the console
+        self.progress = progress
 
-    def upload(self, local_path, remote_dir):
+    def upload(self, local_path, remote_dir, replace=False):
         """
         Uploads file to remote using Rclone.
+        An existing remote file is kept unless replace is set (e.g. a partial copy).
         Returns True if successful, False otherwise.
         """
         # cmd: rclone copy "C:\..." "remote:/dir" --bwlimit 5M --transfers 2 --ignore-existing
         cmd = [
-            "rclone", "copy", str(local_path),
+            self.executable, "copy", str(local_path),
             f"{self.remote_name}:{remote_dir}",
             "--bwlimit", self.bwlimit,
             "--transfers", "2",
-            "--ignore-existing","--progress"
         ]
+        if not replace:
+            cmd.append("--ignore-existing")
+        if self.progress:
+            cmd.append("--progress")
 
-        logging.info(f"Rclone uploading: {local_path} -> {remote_dir}")
+        logging.info("Rclone uploading: %s -> %s", local_path, remote_dir)
 
         try:
             # Use subprocess.run without capturing output to allow direct console access
@@ -31,9 +41,15 @@ class RcloneWrapper:
             )
 
             if result.returncode == 0:
+                METRICS.inc('rclone_uploads_total', result='ok')
+                try:
+                    METRICS.inc('rclone_upload_bytes_total', os.path.getsize(local_path))
+                except OSError:
+                    pass
                 return True
             else:
-                logging.error(f"Rclone failed with code {result.returncode}")
+                METRICS.inc('rclone_uploads_total', result='failed')
+                logging.error("Rclone failed with code %s", result.returncode)
                 # Stderr is not captured, so we direct the user to look at the console
                 logging.error("Check console output for error details.")
                 return False
@@ -41,5 +57,72 @@ class RcloneWrapper:
             logging.error("Rclone executable not found in PATH.")
             return False
         except Exception as e:
-            logging.error(f"An unexpected error occurred during rclone execution: {e}")
+            logging.error("An unexpected error occurred during rclone execution: %s", e)
+            return False
+
+    def list_remote(self, remote_dir, recursive=True, fast_list=False):
+        """
+        Lists files under remote_dir using `rclone lsjson`.
+        Returns a list of dicts (Path, Size, ModTime, ...) with paths relative
+        to remote_dir, or None if the listing failed.
+        """
+        cmd = [
+            self.executable, "lsjson", f"{self.remote_name}:{remote_dir}",
+            "--files-only"
+        ]
+        if recursive:
+            cmd.append("--recursive")
+        if fast_list:
+            cmd.append("--fast-list")
+
+        logging.info("Rclone listing: %s", remote_dir)
+
+        try:
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding='utf-8', errors='replace'
+            )
+            if result.returncode != 0:
+                logging.error("Rclone lsjson failed with code %s: %s", result.returncode, result.stderr.strip())
+                return None
+            return json.loads(result.stdout or "[]")
+        except FileNotFoundError:
+            logging.error("Rclone executable not found in PATH.")
+            return None
+        except json.JSONDecodeError as e:
+            logging.error("Failed to parse rclone lsjson output: %s", e)
+            return None
+        except Exception as e:
+            logging.error("An unexpected error occurred during rclone listing: %s", e)
+            return None
+
+    def moveto(self, src_path, dest_path):
+        """
+        Server-side move/rename of one remote file (`rclone moveto`).
+        Returns True if successful, False otherwise.
+        """
+        cmd = [
+            self.executable, "moveto",
+            f"{self.remote_name}:{src_path}",
+            f"{self.remote_name}:{dest_path}"
+        ]
+
+        logging.info("Rclone moving: %s -> %s", src_path, dest_path)
+
+        try:
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding='utf-8', errors='replace'
+            )
+            if result.returncode != 0:
+                METRICS.inc('rclone_moves_total', result='failed')
+                logging.error("Rclone moveto failed with code %s: %s", result.returncode, result.stderr.strip())
+                return False
+            METRICS.inc('rclone_moves_total', result='ok')
+            return True
+        except FileNotFoundError:
+            logging.error("Rclone executable not found in PATH.")
+            return False
+        except Exception as e:
+            logging.error("An unexpected error occurred during rclone moveto: %s", e)
             return False
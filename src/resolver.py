@@ -0,0 +1,112 @@
+import time
+import logging
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from metrics import METRICS
+from link_checker import LINK_OK, download_url
+
+def resolver_url(base_url: str, mapping_id: int, std_name: str, suffix: str) -> str:
+    """
+    .strm content in resolver mode: the resolver endpoint of the mapping
+    plus the same #StandardizedName.OriginalExt fragment as direct links.
+    """
+    return f"{base_url.rstrip('/')}/m/{mapping_id}#{std_name}{suffix}"
+
+class LinkResolver:
+    """
+    Resolves mapping ids to share links on demand.
+    A mapping without a link gets one created via its target's SeafileClient
+    and stored in the database; resolved links are cached for `ttl` seconds,
+    so rotating a link only needs a database update.
+    """
+    def __init__(self, db, router, local_root: Path, ttl=300):
+        self.db = db
+        self.router = router
+        self.local_root = local_root.resolve()
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, mapping_id: int):
+        """Returns the share link for a mapping id, or None if unknown/unavailable."""
+        now = time.monotonic()
+        cached = self._cache.get(mapping_id)
+        if cached and now - cached[1] < self.ttl:
+            METRICS.inc('resolver_requests_total', result='cached')
+            return cached[0]
+
+        # One creation at a time: concurrent first plays of an episode share the link
+        with self._lock:
+            mapping = self.db.get_mapping_by_id(mapping_id)
+            if not mapping:
+                METRICS.inc('resolver_requests_total', result='unknown')
+                return None
+
+            link = mapping['seafile_url']
+            if not link:
+                link = self._create_link(mapping)
+                if not link:
+                    METRICS.inc('resolver_requests_total', result='failed')
+                    return None
+                self.db.record_link_status(mapping['source_path'], LINK_OK, link)
+                METRICS.inc('resolver_requests_total', result='created')
+            else:
+                METRICS.inc('resolver_requests_total', result='db')
+            self._cache[mapping_id] = (link, now)
+            return link
+
+    def _create_link(self, mapping):
+        target = self.router.get(mapping['target'])
+        try:
+            rel_path = Path(mapping['source_path']).relative_to(self.local_root)
+        except ValueError:
+            logging.error("Resolver: %s is outside root_path", mapping['source_path'])
+            return None
+        remote_path = target.remote_path(rel_path)
+        logging.info("Resolver: creating share link for %s", remote_path)
+        return target.seafile.get_share_link(remote_path)
+
+class ResolverHandler(BaseHTTPRequestHandler):
+    """GET/HEAD /m/<mapping id> -> 302 to the share link's download URL."""
+    def log_message(self, format, *args):
+        logging.debug("Resolver: %s - %s", self.address_string(), format % args)
+
+    def _redirect(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'm' or not parts[1].isdigit():
+            self.send_error(404)
+            return
+        link = self.server.resolver.resolve(int(parts[1]))
+        if not link:
+            self.send_error(404 if self.server.resolver.db.get_mapping_by_id(int(parts[1])) is None else 502)
+            return
+        self.send_response(302)
+        self.send_header('Location', download_url(link))
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self._redirect()
+
+    def do_HEAD(self):
+        self._redirect()
+
+def make_server(resolver: LinkResolver, host='127.0.0.1', port=8765) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ResolverHandler)
+    server.daemon_threads = True
+    server.resolver = resolver
+    return server
+
+def serve(config, db, router):
+    """Runs the resolver (`resolver` config section) until interrupted."""
+    conf = config.get('resolver') or {}
+    resolver = LinkResolver(db, router, Path(config['local']['root_path']), conf.get('cache_ttl', 300))
+    server = make_server(resolver, conf.get('host', '127.0.0.1'), conf.get('port', 8765))
+    logging.info("Link resolver listening on %s:%s", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Link resolver stopped.")
+    finally:
+        server.server_close()
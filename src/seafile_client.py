@@ -1,15 +1,25 @@
 import requests
 from urllib.parse import urljoin
 import logging
+from metrics import METRICS
 
 class SeafileClient:
     def __init__(self, host, token, repo_id):
         self.host = host
         self.headers = {"Authorization": f"Token {token}", "Accept": "application/json"}
         self.repo_id = repo_id
+        # Links resolved in this run, by remote path (filled by batch prefetching too)
+        self._links = {}
+
+    def forget_link(self, remote_path):
+        """Drops a cached link (e.g. one found broken) so the next call asks the server."""
+        self._links.pop(remote_path, None)
 
     def get_share_link(self, remote_path):
         """Generates or retrieves a direct download link."""
+        if remote_path in self._links:
+            return self._links[remote_path]
+
         url = urljoin(self.host, "/api/v2.1/share-links/")
         
         # Payload for creating a link
@@ -20,41 +30,46 @@ class SeafileClient:
 
         try:
             # Try to create a new link
+            METRICS.inc('seafile_requests_total', endpoint='share-links', method='POST')
             resp = requests.post(url, headers=self.headers, data=payload)
             
             # If link already exists (400 Bad Request with specific msg), fetch it
             if resp.status_code == 400:
-                logging.warning(f"Create link returned 400. Response: {resp.text}")
-                logging.info(f"Link likely exists for {remote_path}, fetching existing...")
+                logging.warning("Create link returned 400. Response: %s", resp.text)
+                logging.info("Link likely exists for %s, fetching existing...", remote_path)
 
                 get_params = {"repo_id": self.repo_id, "path": remote_path}
+                METRICS.inc('seafile_requests_total', endpoint='share-links', method='GET')
                 get_resp = requests.get(url, headers=self.headers, params=get_params)
 
                 if not get_resp.ok:
-                    logging.error(f"Failed to fetch existing links. Status: {get_resp.status_code}, Body: {get_resp.text}")
+                    logging.error("Failed to fetch existing links. Status: %s, Body: %s", get_resp.status_code, get_resp.text)
                     get_resp.raise_for_status()
 
                 links_data = get_resp.json()
                 if not links_data:
-                    logging.error(f"No share links found for {remote_path} despite 400 error.")
-                    logging.error(f"Get existing links response body: {get_resp.text}")
+                    logging.error("No share links found for %s despite 400 error.", remote_path)
+                    logging.error("Get existing links response body: %s", get_resp.text)
                     return None
 
                 # Return the first link found
                 link = links_data[0]['link']
+                self._links[remote_path] = link
                 return link
 
             if not resp.ok:
-                logging.error(f"Failed to create link. Status: {resp.status_code}, Body: {resp.text}")
+                logging.error("Failed to create link. Status: %s, Body: %s", resp.status_code, resp.text)
                 resp.raise_for_status()
 
-            return resp.json()['link']
+            link = resp.json()['link']
+            self._links[remote_path] = link
+            return link
             
         except requests.exceptions.RequestException as e:
-            logging.error(f"Seafile API Request Failed: {e}")
+            logging.error("Seafile API Request Failed: %s", e)
             if e.response is not None:
-                logging.error(f"Error Response Body: {e.response.text}")
+                logging.error("Error Response Body: %s", e.response.text)
             return None
         except Exception as e:
-            logging.error(f"Unexpected Seafile Client Error: {e}")
+            logging.error("Unexpected Seafile Client Error: %s", e)
             return None
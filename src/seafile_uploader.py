@@ -0,0 +1,160 @@
+import time
+import logging
+import requests
+from pathlib import Path
+from urllib.parse import urljoin, quote
+from requests.adapters import HTTPAdapter
+from metrics import METRICS
+from upload_scheduler import current_rate
+
+BACKEND_RCLONE = 'rclone'
+BACKEND_SEAFILE = 'seafile'
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+class SeafileUploader:
+    """
+    Uploads files through Seafile's upload-link API, an alternative to rclone
+    over WebDAV with the same upload(local_path, remote_dir) interface.
+
+    Files larger than `chunk_size` go up as Content-Range chunks (Seafile's
+    resumable upload protocol), read one fixed-size buffer at a time, so
+    memory stays at one chunk per transfer. A failed chunk is retried with a
+    fresh upload link from the offset the server reports, and an upload
+    interrupted in an earlier run continues from there as well. All
+    concurrent uploads share one pooled session.
+    """
+    def __init__(self, host, token, repo_id, bandwidth_limit="off", chunk_size=DEFAULT_CHUNK_SIZE,
+                 retries=5, retry_delay=2.0, pool_size=4, timeout=120):
+        self.host = host
+        self.repo_id = repo_id
+        # A plain rate ("5M") or an rclone timetable ("08:00,1M 23:00,off"), applied per upload
+        self.bwlimit = bandwidth_limit
+        self.chunk_size = max(1, int(chunk_size))
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Token {token}", "Accept": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _api(self, path):
+        return urljoin(self.host, path)
+
+    def remote_size(self, remote_path):
+        """Size of an existing remote file, None if there is none."""
+        METRICS.inc('seafile_requests_total', endpoint='file-detail', method='GET')
+        resp = self.session.get(self._api(f"/api2/repos/{self.repo_id}/file/detail/"), params={'p': remote_path}, timeout=self.timeout)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return resp.json().get('size')
+
+    def upload_link(self):
+        """A fresh upload link for the library root (files name their directory via relative_path)."""
+        METRICS.inc('seafile_requests_total', endpoint='upload-link', method='GET')
+        resp = self.session.get(self._api(f"/api2/repos/{self.repo_id}/upload-link/"), params={'p': '/'}, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def uploaded_bytes(self, remote_dir, name) -> int:
+        """Bytes of a chunked upload the server already holds (0 if none or unknown)."""
+        METRICS.inc('seafile_requests_total', endpoint='file-uploaded-bytes', method='GET')
+        try:
+            resp = self.session.get(self._api(f"/api/v2.1/repos/{self.repo_id}/file-uploaded-bytes/"),
+                                    params={'parent_dir': remote_dir, 'file_name': name}, timeout=self.timeout)
+            if resp.ok:
+                return int(resp.json().get('uploadedBytes') or 0)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.debug("Cannot query uploaded bytes of %s: %s", name, e)
+        return 0
+
+    def _post(self, link, remote_dir, name, data, start, total, replace=False):
+        headers = {}
+        if start or len(data) < total:
+            headers['Content-Range'] = f"bytes {start}-{start + len(data) - 1}/{total}"
+            headers['Content-Disposition'] = f"attachment; filename=\"{quote(name)}\""
+        form = {'parent_dir': '/', 'relative_path': remote_dir.strip('/')}
+        if replace:
+            form['replace'] = '1'
+        METRICS.inc('seafile_requests_total', endpoint='upload-api', method='POST')
+        return self.session.post(f"{link}?ret-json=1", data=form, files={'file': (name, data)}, headers=headers, timeout=self.timeout)
+
+    def _throttle(self, sent, elapsed):
+        rate = current_rate(self.bwlimit)
+        if rate and sent / rate > elapsed:
+            time.sleep(sent / rate - elapsed)
+
+    def _send(self, local_path: Path, remote_dir, name, total, replace=False):
+        chunked = total > self.chunk_size
+        link = self.upload_link()
+        offset = self.uploaded_bytes(remote_dir, name) if chunked else 0
+        if offset:
+            logging.info("Seafile resuming %s at %s of %s bytes", name, offset, total)
+
+        failures = 0
+        with open(local_path, 'rb') as f:
+            while True:
+                f.seek(offset)
+                data = f.read(self.chunk_size)
+                started = time.monotonic()
+                try:
+                    resp = self._post(link, remote_dir, name, data, offset, total, replace)
+                    if resp.ok:
+                        offset += len(data)
+                        failures = 0
+                        if offset >= total:
+                            return
+                        self._throttle(len(data), time.monotonic() - started)
+                        continue
+                    error = requests.exceptions.HTTPError(f"{resp.status_code} {resp.text[:200]}", response=resp)
+                except requests.exceptions.RequestException as e:
+                    error = e
+
+                failures += 1
+                if failures > self.retries:
+                    raise error
+                logging.warning("Seafile chunk at %s of %s failed (%s), retry %s/%s", offset, name, error, failures, self.retries)
+                time.sleep(self.retry_delay * 2 ** (failures - 1))
+                # Upload links expire; the server's byte count says where to continue
+                link = self.upload_link()
+                if chunked:
+                    offset = min(offset, self.uploaded_bytes(remote_dir, name))
+                else:
+                    offset = 0
+
+    def upload(self, local_path, remote_dir, replace=False):
+        """
+        Uploads a file into remote_dir (library path; missing directories are
+        created). An existing remote file is left alone, like rclone
+        --ignore-existing, unless replace is set (e.g. a partial copy).
+        Returns True if successful, False otherwise.
+        """
+        local_path = Path(local_path)
+        name = local_path.name
+        logging.info("Seafile uploading: %s -> %s", local_path, remote_dir)
+        try:
+            total = local_path.stat().st_size
+            if not replace and self.remote_size(f"{remote_dir.rstrip('/')}/{name}") is not None:
+                logging.info("Already on Seafile, skipping: %s/%s", remote_dir, name)
+                METRICS.inc('seafile_uploads_total', result='exists')
+                return True
+            self._send(local_path, remote_dir, name, total, replace)
+        except OSError as e:
+            logging.error("Cannot read %s: %s", local_path, e)
+            METRICS.inc('seafile_uploads_total', result='failed')
+            return False
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.error("Seafile upload failed for %s: %s", local_path, e)
+            METRICS.inc('seafile_uploads_total', result='failed')
+            return False
+
+        METRICS.inc('seafile_uploads_total', result='ok')
+        METRICS.inc('seafile_upload_bytes_total', total)
+        return True
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,137 @@
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+# Text subtitle codecs ffmpeg can stream-copy to a sidecar, by sidecar extension
+SIDECAR_EXTS = {'ass': '.ass', 'ssa': '.ass', 'subrip': '.srt', 'webvtt': '.vtt'}
+FONT_EXTS = ('.ttf', '.otf', '.ttc', '.woff', '.woff2')
+
+# Fonts of a series live next to its seasons; Jellyfin ignores dot-directories
+FONT_DIR = ".fonts"
+
+KIND_SUBTITLE = 'subtitle'
+KIND_FONT = 'font'
+
+_slots = None
+_slots_lock = threading.Lock()
+
+def extraction_slots(limit: int = 2) -> threading.BoundedSemaphore:
+    """Process-wide cap on concurrent extractions (each reads a whole file)."""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(max(1, limit))
+        return _slots
+
+def subtitle_targets(media: dict, std_name: str, dest_dir: Path):
+    """
+    Sidecar paths of the embedded text subtitles in a probe_media summary, as
+    (stream index, path). Named `{std_name}.{lang}.ass`; further tracks of
+    the same language get a number before the language.
+    """
+    targets = []
+    seen = {}
+    for stream in media.get('subtitle') or []:
+        ext = SIDECAR_EXTS.get(stream.get('codec'))
+        if ext is None or stream.get('index') is None:
+            continue # Image-based (PGS/VobSub) tracks cannot be copied to text
+        lang = stream.get('language') or 'und'
+        seen[lang] = seen.get(lang, 0) + 1
+        name = f"{std_name}.{lang}{ext}" if seen[lang] == 1 else f"{std_name}.{seen[lang]}.{lang}{ext}"
+        targets.append((stream['index'], dest_dir / name))
+    return targets
+
+def font_attachments(media: dict):
+    """(stream index, filename) of the font attachments in a probe_media summary."""
+    fonts = []
+    for att in media.get('attachments') or []:
+        name = Path(att.get('filename') or '').name
+        mimetype = att.get('mimetype') or ''
+        if name and ('font' in mimetype or name.lower().endswith(FONT_EXTS)):
+            fonts.append((att['index'], name))
+    return fonts
+
+def _run_ffmpeg(args, cwd=None):
+    ffmpeg_cmd = shutil.which('ffmpeg')
+    if not ffmpeg_cmd:
+        logging.warning("FFmpeg not found. Skipping embedded track extraction.")
+        return None
+    return subprocess.run([ffmpeg_cmd, '-v', 'error', '-y'] + args, cwd=cwd,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+
+def extract_subtitles(input_path: Path, targets) -> list:
+    """Stream-copies all target subtitle tracks in one ffmpeg pass. Returns the written paths."""
+    if not targets:
+        return []
+    args = ['-i', str(input_path)]
+    for index, path in targets:
+        args += ['-map', f"0:{index}", '-c', 'copy', str(path)]
+    result = _run_ffmpeg(args)
+    if result is None:
+        return []
+    if result.returncode != 0:
+        logging.error("Subtitle extraction failed for %s: %s", input_path, result.stderr)
+    written = []
+    for _, path in targets:
+        if path.exists() and path.stat().st_size > 0:
+            written.append(path)
+        else:
+            # An empty leftover would pass for an extracted track on the next run
+            path.unlink(missing_ok=True)
+    return written
+
+def cache_fonts(input_path: Path, fonts, font_dir: Path) -> list:
+    """
+    Dumps font attachments into the series font directory. Fansub releases
+    attach the same fonts to every episode, so fonts already cached under
+    their file name are reused without dumping them again.
+    Returns the cached font paths.
+    """
+    cached = [font_dir / name for _, name in fonts if (font_dir / name).exists()]
+    missing = [(index, name) for index, name in fonts if not (font_dir / name).exists()]
+    if not missing:
+        return cached
+    font_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        args = []
+        for index, name in missing:
+            args += [f"-dump_attachment:{index}", str(Path(tmp) / name)]
+        # ffmpeg dumps attachments while opening the input and then complains
+        # about the missing output; the dumped files are what counts
+        if _run_ffmpeg(args + ['-i', str(input_path)], cwd=tmp) is None:
+            return cached
+        for _, name in missing:
+            dumped = Path(tmp) / name
+            if not dumped.exists() or dumped.stat().st_size == 0:
+                logging.warning("Font attachment %s of %s was not extracted", name, input_path.name)
+                continue
+            shutil.move(str(dumped), font_dir / name)
+            logging.info("Cached font: %s", font_dir / name)
+            cached.append(font_dir / name)
+    return cached
+
+def extract_embedded(input_path: Path, media: dict, std_name: str, dest_dir: Path, font_dir: Path = None, max_parallel: int = 2):
+    """
+    Writes the embedded text subtitles of a video as sidecars in dest_dir and
+    (if font_dir is given) its attached fonts into the font cache. Sidecars
+    that already exist are kept, so re-runs do not read the file again.
+    Returns (kind, path, stream index) tuples of the sidecars.
+    """
+    targets = subtitle_targets(media, std_name, dest_dir)
+    fonts = font_attachments(media) if font_dir else []
+    written = [(KIND_SUBTITLE, path, index) for index, path in targets if path.exists()]
+    targets = [(index, path) for index, path in targets if not path.exists()]
+    if not targets and all((font_dir / name).exists() for _, name in fonts):
+        return written + [(KIND_FONT, font_dir / name, None) for _, name in fonts]
+
+    with extraction_slots(max_parallel):
+        by_path = {path: index for index, path in targets}
+        for path in extract_subtitles(input_path, targets):
+            logging.info("Extracted Subtitle: %s", path)
+            written.append((KIND_SUBTITLE, path, by_path[path]))
+        for path in cache_fonts(input_path, fonts, font_dir):
+            written.append((KIND_FONT, path, None))
+    return written
@@ -0,0 +1,132 @@
+import os
+import logging
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Action kinds, in the order they are executed
+ACTION_UPLOAD = 'upload'   # Local file missing on the remote: full pipeline
+ACTION_LINK = 'link'       # Remote file exists but has no mapping / link yet
+ACTION_STRM = 'strm'       # Mapping exists but the .strm file is missing
+ACTION_PRUNE = 'prune'     # Mapping whose source is gone locally and remotely
+
+class SyncAction(NamedTuple):
+    kind: str
+    rel_path: str
+    local_path: Optional[Path] = None
+    mapping: Optional[dict] = None
+
+def scan_local(local_root: Path, video_exts):
+    """
+    Walks local_root with os.scandir and returns a sorted list of
+    (relative posix path, size) for every video file.
+    """
+    entries = []
+    stack = [str(local_root)]
+    root_len = len(str(local_root).rstrip('\\/')) + 1
+
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in video_exts:
+                            rel = entry.path[root_len:].replace('\\', '/')
+                            entries.append((rel, entry.stat().st_size))
+                    except OSError as e:
+                        logging.warning("Sync: Cannot stat %s: %s", entry.path, e)
+        except OSError as e:
+            logging.warning("Sync: Cannot scan %s: %s", current, e)
+
+    entries.sort()
+    return entries
+
+def snapshot_db(db, local_root: Path):
+    """
+    Returns a sorted list of (relative posix path, mapping dict) for every
+    mapping whose source lives under local_root.
+    """
+    root = local_root.resolve()
+    rows = []
+    for row in db.iter_mappings():
+        try:
+            rel = Path(row['source_path']).relative_to(root).as_posix()
+        except ValueError:
+            continue
+        rows.append((rel, row))
+    rows.sort(key=lambda r: r[0])
+    return rows
+
+def snapshot_remote(listing, video_exts):
+    """
+    Filters an `rclone lsjson --recursive` listing of remote_root down to video files.
+    Returns a sorted list of (relative posix path, size).
+    """
+    entries = [
+        (item['Path'], item.get('Size', -1))
+        for item in listing
+        if not item.get('IsDir') and os.path.splitext(item['Path'])[1].lower() in video_exts
+    ]
+    entries.sort()
+    return entries
+
+def _merge(local, db_rows, remote):
+    """
+    Sorted-merge over the three snapshots.
+    Yields (rel_path, local_size, mapping, remote_size) with None for sources
+    that do not contain rel_path.
+    """
+    i = j = k = 0
+    while i < len(local) or j < len(db_rows) or k < len(remote):
+        candidates = []
+        if i < len(local):
+            candidates.append(local[i][0])
+        if j < len(db_rows):
+            candidates.append(db_rows[j][0])
+        if k < len(remote):
+            candidates.append(remote[k][0])
+        key = min(candidates)
+
+        local_size = mapping = remote_size = None
+        if i < len(local) and local[i][0] == key:
+            local_size = local[i][1]
+            i += 1
+        if j < len(db_rows) and db_rows[j][0] == key:
+            mapping = db_rows[j][1]
+            j += 1
+        if k < len(remote) and remote[k][0] == key:
+            remote_size = remote[k][1]
+            k += 1
+
+        yield key, local_size, mapping, remote_size
+
+def plan_sync(local, db_rows, remote, local_root: Path, lazy_links: bool = False):
+    """
+    Computes the minimal list of SyncActions that brings the three sources
+    into agreement. Files that are consistent produce no action.
+    lazy_links: share links are created on first playback (resolver mode),
+    so a mapping without one is complete.
+    """
+    actions = []
+    for rel, local_size, mapping, remote_size in _merge(local, db_rows, remote):
+        local_path = local_root / rel if local_size is not None else None
+        has_link = mapping is not None and (lazy_links or bool(mapping.get('seafile_url')))
+
+        if local_size is not None:
+            # A remote copy of another size is partial or stale (-1: size unknown to rclone)
+            if remote_size is None or (remote_size >= 0 and remote_size != local_size):
+                actions.append(SyncAction(ACTION_UPLOAD, rel, local_path, mapping))
+            elif not has_link:
+                actions.append(SyncAction(ACTION_LINK, rel, local_path, mapping))
+            elif not os.path.exists(mapping['strm_path']):
+                actions.append(SyncAction(ACTION_STRM, rel, local_path, mapping))
+        elif mapping is not None:
+            if remote_size is None:
+                actions.append(SyncAction(ACTION_PRUNE, rel, None, mapping))
+            elif not os.path.exists(mapping['strm_path']) and has_link:
+                # Offloaded (deleted locally after upload) but still streamable
+                actions.append(SyncAction(ACTION_STRM, rel, None, mapping))
+
+    return actions
@@ -0,0 +1,155 @@
+import bisect
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from seafile_client import SeafileClient
+from rclone_wrapper import RcloneWrapper
+from seafile_uploader import SeafileUploader, BACKEND_RCLONE, BACKEND_SEAFILE, DEFAULT_CHUNK_SIZE
+
+POLICY_HASH = 'hash'              # Consistent hashing by series: a series stays on one target
+POLICY_LEAST_USED = 'least_used'  # Target with the fewest tracked bytes
+
+DEFAULT_TARGET = 'default'
+
+class Target:
+    """
+    One upload destination: an rclone remote and the Seafile library behind it.
+    Files are uploaded by `uploader` (the rclone remote unless another backend is set).
+    """
+    def __init__(self, name, rclone, seafile, remote_root, uploader=None):
+        self.name = name
+        self.rclone = rclone
+        self.seafile = seafile
+        self.remote_root = remote_root
+        self.uploader = uploader or rclone
+
+    def remote_path(self, rel_path: Path) -> str:
+        """Full remote path of a file given relative to local root_path."""
+        return f"{self.remote_root}/{rel_path.as_posix().lstrip('/')}".replace('//', '/')
+
+    def __repr__(self):
+        return f"Target({self.name!r})"
+
+def load_targets(config, bwlimit, progress=True):
+    """
+    Builds the upload targets from config.
+    `targets:` lists several (rclone remote, Seafile library) pairs; without
+    it the top-level `rclone`/`seafile` sections form a single 'default' target.
+    Targets without their own `bwlimit` use the shared one.
+    upload.backend: seafile uploads through the Seafile API instead of rclone.
+    """
+    rclone_conf = config['rclone']
+    executable = rclone_conf.get('executable', 'rclone')
+    upload_conf = config.get('upload') or {}
+    backend = upload_conf.get('backend', BACKEND_RCLONE)
+    if backend not in (BACKEND_RCLONE, BACKEND_SEAFILE):
+        logging.warning("Unknown upload backend '%s', using %s.", backend, BACKEND_RCLONE)
+        backend = BACKEND_RCLONE
+    entries = config.get('targets')
+    if not entries:
+        entries = [{
+            'name': DEFAULT_TARGET,
+            'remote_name': rclone_conf['remote_name'],
+            'remote_root': rclone_conf['remote_root'],
+            'seafile': config['seafile'],
+        }]
+
+    targets = []
+    for entry in entries:
+        seafile_conf = entry['seafile']
+        uploader = None
+        if backend == BACKEND_SEAFILE:
+            uploader = SeafileUploader(
+                seafile_conf['host'], seafile_conf['api_token'], seafile_conf['repo_id'],
+                entry.get('bwlimit', bwlimit),
+                chunk_size=int(upload_conf.get('chunk_size_mb', DEFAULT_CHUNK_SIZE / 2**20) * 2**20),
+                retries=upload_conf.get('retries', 5),
+                pool_size=upload_conf.get('concurrency', 1),
+            )
+        targets.append(Target(
+            entry['name'],
+            RcloneWrapper(entry['remote_name'], entry.get('bwlimit', bwlimit), executable, progress=progress),
+            SeafileClient(seafile_conf['host'], seafile_conf['api_token'], seafile_conf['repo_id']),
+            entry.get('remote_root', rclone_conf['remote_root']),
+            uploader,
+        ))
+    return targets
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+class TargetRouter:
+    """
+    Places files on targets and remembers the placement.
+
+    A file keeps the target recorded in its mapping or found in the remote
+    cache; only new files are placed by the policy. Consistent hashing uses
+    `vnodes` points per target on the ring, so adding a target moves only
+    the series that now hash to it.
+    """
+    def __init__(self, targets, db, policy=POLICY_HASH, vnodes=64):
+        if not targets:
+            raise ValueError("At least one upload target is required")
+        if policy not in (POLICY_HASH, POLICY_LEAST_USED):
+            logging.warning("Unknown placement policy '%s', using %s.", policy, POLICY_HASH)
+            policy = POLICY_HASH
+        self.targets = list(targets)
+        self.by_name = {t.name: t for t in self.targets}
+        self.db = db
+        self.policy = policy
+        self._ring = sorted((_hash(f"{t.name}#{i}"), t.name) for t in self.targets for i in range(vnodes))
+        self._points = [point for point, _ in self._ring]
+        self._usage = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Target by name; legacy rows without a target belong to the first one."""
+        return self.by_name.get(name) or self.targets[0]
+
+    def _hashed(self, key: str) -> Target:
+        idx = bisect.bisect(self._points, _hash(key)) % len(self._ring)
+        return self.by_name[self._ring[idx][1]]
+
+    def _least_used(self, size: int) -> Target:
+        with self._lock:
+            if self._usage is None:
+                usage = self.db.get_target_usage()
+                self._usage = {t.name: 0 for t in self.targets}
+                for name, used in usage.items():
+                    self._usage[self.get(name).name] += used or 0
+            name = min(self._usage, key=lambda n: (self._usage[n], n))
+            # Count the bytes now so concurrent placements spread out
+            self._usage[name] += size
+            return self.by_name[name]
+
+    def locate(self, rel_path: Path):
+        """Returns the target whose cached remote listing holds rel_path, or None."""
+        if len(self.targets) == 1:
+            return None
+        for target in self.targets:
+            if self.db.get_remote_file(target.remote_path(rel_path), target.name):
+                return target
+        return None
+
+    def resolve(self, file_path: Path, rel_path: Path, series_key: str) -> Target:
+        """Target for a file: recorded mapping, then remote cache, then the policy."""
+        if len(self.targets) == 1:
+            return self.targets[0]
+
+        mapping = self.db.get_mapping(file_path)
+        if mapping:
+            # Includes rows from before sharding (no target): they stay with the first one
+            return self.get(mapping.get('target'))
+
+        located = self.locate(rel_path)
+        if located:
+            return located
+
+        if self.policy == POLICY_LEAST_USED:
+            try:
+                size = file_path.stat().st_size
+            except OSError:
+                size = 0
+            return self._least_used(size)
+        return self._hashed(series_key)
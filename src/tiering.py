@@ -0,0 +1,126 @@
+import os
+import shutil
+import logging
+import requests
+from pathlib import Path
+from datetime import datetime
+from typing import NamedTuple
+from urllib.parse import urljoin
+from metrics import METRICS
+from link_checker import LINK_BROKEN
+
+# qBittorrent states of torrents that reached their seeding goal
+FINISHED_STATES = ('pausedUP', 'stoppedUP')
+
+class EvictionCandidate(NamedTuple):
+    source_path: str
+    size: int
+    last_access: float
+    finished: bool
+
+def finished_torrent_roots(conf):
+    """
+    Content paths of torrents that finished seeding, from the qBittorrent
+    Web API (`tiering.qbittorrent`: url, username, password). Empty list if
+    not configured or unreachable.
+    """
+    if not conf or not conf.get('url'):
+        return []
+    session = requests.Session()
+    try:
+        login = session.post(urljoin(conf['url'], "/api/v2/auth/login"),
+                             data={'username': conf.get('username', ''), 'password': conf.get('password', '')}, timeout=10)
+        if not login.ok or login.text.strip() != 'Ok.':
+            logging.error("qBittorrent login failed: %s %s", login.status_code, login.text)
+            return []
+        resp = session.get(urljoin(conf['url'], "/api/v2/torrents/info"), params={'filter': 'completed'}, timeout=10)
+        resp.raise_for_status()
+        return [Path(t['content_path']) for t in resp.json() if t.get('state') in FINISHED_STATES and t.get('content_path')]
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.error("qBittorrent query failed, treating all torrents as seeding: %s", e)
+        return []
+    finally:
+        session.close()
+
+def _under(path: Path, roots) -> bool:
+    return any(path == root or root in path.parents for root in roots)
+
+def collect_candidates(db, router, local_root: Path, lazy_links: bool, finished_roots=()):
+    """
+    Local files that are safe to evict: mapped, confirmed on the remote (cached
+    listing entry of the mapping's target with the local size) and with a link
+    that is not known to be broken (or created lazily). Sorted by eviction
+    priority: finished torrents first, then least recently accessed/added.
+    """
+    root = local_root.resolve()
+    candidates = []
+    for row in db.iter_mappings():
+        if row.get('evicted_at'):
+            continue
+        if row.get('link_status') == LINK_BROKEN or not (row.get('seafile_url') or lazy_links):
+            continue
+        source = Path(row['source_path'])
+        try:
+            stat = source.stat()
+            rel_path = source.relative_to(root)
+        except (OSError, ValueError):
+            continue
+        target = router.get(row.get('target'))
+        remote = db.get_remote_file(target.remote_path(rel_path), target.name)
+        if not remote or remote['size'] != stat.st_size:
+            continue
+
+        added = datetime.fromisoformat(str(row['last_updated'])).timestamp() if row.get('last_updated') else 0
+        candidates.append(EvictionCandidate(
+            row['source_path'], stat.st_size, max(stat.st_atime, added), _under(source, finished_roots)
+        ))
+    candidates.sort(key=lambda c: (not c.finished, c.last_access))
+    return candidates
+
+def evict(db, candidates, root_path: Path, min_free_bytes: int, dry_run=False):
+    """
+    Deletes candidates in order until root_path has min_free_bytes free.
+    Returns (files evicted, bytes freed).
+    """
+    free = shutil.disk_usage(root_path).free
+    count = freed = 0
+    for candidate in candidates:
+        if free + freed >= min_free_bytes:
+            break
+        if dry_run:
+            logging.info("Tiering (dry run): would evict %s (%.1f MiB)", candidate.source_path, candidate.size / 2**20)
+        else:
+            try:
+                os.remove(candidate.source_path)
+            except OSError as e:
+                logging.error("Tiering: failed to evict %s: %s", candidate.source_path, e)
+                continue
+            db.mark_evicted(candidate.source_path)
+            METRICS.inc('tiering_evicted_bytes_total', candidate.size)
+            logging.info("Tiering: evicted %s (%.1f MiB)", candidate.source_path, candidate.size / 2**20)
+        count += 1
+        freed += candidate.size
+    return count, freed
+
+def run_tiering(config, db, router, lazy_links: bool, dry_run=False):
+    """--tier: frees space on root_path down to the `tiering.min_free_gb` watermark."""
+    conf = config.get('tiering') or {}
+    local_root = Path(config['local']['root_path'])
+    min_free = int(float(conf.get('min_free_gb', 100)) * 2**30)
+
+    free = shutil.disk_usage(local_root).free
+    if free >= min_free:
+        logging.info("Tiering: %.1f GiB free on %s, above the watermark.", free / 2**30, local_root)
+        return 0, 0
+
+    finished = finished_torrent_roots(conf.get('qbittorrent'))
+    candidates = collect_candidates(db, router, local_root, lazy_links, finished)
+    if conf.get('finished_only'):
+        candidates = [c for c in candidates if c.finished]
+    logging.info("Tiering: %.1f GiB free, need %.1f GiB; %s evictable file(s).", free / 2**30, min_free / 2**30, len(candidates))
+
+    count, freed = evict(db, candidates, local_root, min_free, dry_run)
+    logging.info("Tiering finished: %s file(s), %.1f GiB freed.", count, freed / 2**30)
+    if free + freed < min_free:
+        logging.warning("Tiering: still below the watermark, no further files are safe to evict.")
+    return count, freed
@@ -0,0 +1,209 @@
+import os
+import sys
+import hashlib
+import logging
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple, Optional
+
+# Byte strings streamed through the hashers without being kept in memory
+SKIPPED_KEYS = (b'pieces', b'piece layers')
+CHUNK_SIZE = 1 << 20
+
+class TorrentFile(NamedTuple):
+    index: int        # libtorrent file index (padding files count too)
+    path: Path        # Relative to the save path
+    size: int
+
+class TorrentInfo(NamedTuple):
+    infohash: str     # v1 SHA-1, or the truncated v2 SHA-256 for v2-only torrents (as qBittorrent's %I)
+    name: str
+    files: list       # TorrentFile, padding files excluded
+
+class _Decoder:
+    """
+    Bencode decoder reading from a binary stream. The raw bytes of the `info`
+    dictionary are fed to the SHA-1/SHA-256 hashers as they are read, and the
+    piece hashes are skipped instead of loaded.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.hashers = ()
+
+    def _read(self, n: int) -> bytes:
+        data = self.stream.read(n)
+        if len(data) < n:
+            raise ValueError("truncated bencode data")
+        for hasher in self.hashers:
+            hasher.update(data)
+        return data
+
+    def _read_until(self, end: bytes) -> bytes:
+        out = bytearray()
+        while True:
+            c = self._read(1)
+            if c == end:
+                return bytes(out)
+            out += c
+
+    def _string(self, first: bytes, keep=True):
+        length = int(first + self._read_until(b':'))
+        if keep:
+            return self._read(length)
+        while length > 0:
+            length -= len(self._read(min(length, CHUNK_SIZE)))
+        return None
+
+    def decode(self, keep=True, first: bytes = None):
+        c = first or self._read(1)
+        if c == b'i':
+            return int(self._read_until(b'e'))
+        if c == b'l':
+            items = []
+            while (c := self._read(1)) != b'e':
+                items.append(self.decode(first=c))
+            return items
+        if c == b'd':
+            return self._dict()
+        if c.isdigit():
+            return self._string(c, keep)
+        raise ValueError(f"invalid bencode token {c!r}")
+
+    def _dict(self, top_level=False):
+        result = {}
+        while (c := self._read(1)) != b'e':
+            key = self._string(c)
+            if top_level and key == b'info':
+                self.hashers = (hashlib.sha1(), hashlib.sha256())
+                result[key] = self.decode()
+                result[b'.hashes'] = self.hashers
+                self.hashers = ()
+            else:
+                result[key] = self.decode(keep=key not in SKIPPED_KEYS)
+        return result
+
+    def decode_root(self):
+        if self._read(1) != b'd':
+            raise ValueError("bencoded root is not a dictionary")
+        return self._dict(top_level=True)
+
+def bdecode_file(path: Path) -> dict:
+    """Decodes a bencoded file (.torrent, .fastresume) without loading it whole."""
+    with open(path, 'rb') as f:
+        return _Decoder(f).decode_root()
+
+def _text(value) -> str:
+    return value.decode('utf-8', errors='replace') if isinstance(value, bytes) else str(value)
+
+def _safe_parts(parts):
+    parts = [_text(p) for p in parts]
+    if not parts or any(p in ('', '.', '..') or '/' in p or '\\' in p for p in parts):
+        raise ValueError(f"unsafe path in torrent: {parts!r}")
+    return parts
+
+def _v2_files(tree, prefix=()):
+    """Walks a BEP 52 file tree in its (sorted) key order."""
+    for name in sorted(tree):
+        node = tree[name]
+        if name == b'':
+            yield list(prefix), node.get(b'length', 0)
+        else:
+            yield from _v2_files(node, prefix + (name,))
+
+def parse_torrent(path: Path) -> TorrentInfo:
+    """Reads a .torrent file. Raises ValueError for malformed or unsupported files."""
+    meta = bdecode_file(path)
+    info = meta.get(b'info')
+    if not isinstance(info, dict):
+        raise ValueError(f"{path} has no info dictionary")
+    sha1, sha256 = meta[b'.hashes']
+    name = _text(info.get(b'name.utf-8') or info.get(b'name') or b'')
+
+    files = []
+    if b'files' in info or b'length' in info:
+        infohash = sha1.hexdigest()
+        if b'length' in info:
+            files.append(TorrentFile(0, Path(*_safe_parts([name])), info[b'length']))
+        else:
+            for index, entry in enumerate(info[b'files']):
+                if b'p' in entry.get(b'attr', b''):
+                    continue # BEP 47 padding file
+                parts = _safe_parts([name] + (entry.get(b'path.utf-8') or entry[b'path']))
+                files.append(TorrentFile(index, Path(*parts), entry[b'length']))
+    elif b'file tree' in info:
+        infohash = sha256.hexdigest()[:40]
+        piece_length = info.get(b'piece length') or 1
+        entries = list(_v2_files(info[b'file tree']))
+        index = 0
+        for n, (parts, length) in enumerate(entries):
+            # A single-file v2 torrent stores the file itself under the name
+            if len(parts) > 1 or parts[0] != info.get(b'name'):
+                parts = [name] + parts
+            files.append(TorrentFile(index, Path(*_safe_parts(parts)), length))
+            # libtorrent aligns v2 files to pieces with implicit padding files
+            index += 2 if n < len(entries) - 1 and length % piece_length else 1
+    else:
+        raise ValueError(f"{path} lists no files")
+    return TorrentInfo(infohash, name, files)
+
+def default_bt_backup() -> Path:
+    """qBittorrent's default BT_backup directory on this platform."""
+    if sys.platform == 'win32':
+        return Path(os.environ.get('LOCALAPPDATA', '')) / "qBittorrent" / "BT_backup"
+    return Path.home() / ".local" / "share" / "qBittorrent" / "BT_backup"
+
+def bt_backup_paths(infohash: str, bt_backup: Path):
+    """.torrent and .fastresume of a torrent in qBittorrent's BT_backup directory."""
+    infohash = infohash.strip().lower()
+    return bt_backup / f"{infohash}.torrent", bt_backup / f"{infohash}.fastresume"
+
+class ResumeData(NamedTuple):
+    save_path: Optional[Path]
+    mapped_files: dict    # file index -> renamed path relative to the save path
+    skipped: set          # file indexes not selected for download
+
+def read_resume_data(path: Path) -> ResumeData:
+    """Save path, renamed and deselected files from a qBittorrent .fastresume."""
+    data = bdecode_file(path)
+    save_path = data.get(b'save_path') or data.get(b'qBt-savePath')
+    mapped = {i: Path(*PurePosixPath(_text(p).replace('\\', '/')).parts)
+              for i, p in enumerate(data.get(b'mapped_files') or []) if p}
+    skipped = {i for i, prio in enumerate(data.get(b'file_priority') or []) if prio == 0}
+    return ResumeData(Path(_text(save_path)) if save_path else None, mapped, skipped)
+
+def content_files(info: TorrentInfo, save_path: Path, resume: ResumeData = None, exts=None):
+    """
+    Absolute local paths of a torrent's files as (TorrentFile, Path), honouring
+    files renamed or deselected in qBittorrent. exts filters by suffix.
+    """
+    result = []
+    for f in info.files:
+        if resume and f.index in resume.skipped:
+            continue
+        rel = resume.mapped_files.get(f.index, f.path) if resume else f.path
+        if exts and rel.suffix.lower() not in exts:
+            continue
+        result.append((f, save_path / rel))
+    return result
+
+def load_torrent(torrent_path: Path = None, infohash: str = None, bt_backup: Path = None, save_path: Path = None):
+    """
+    Loads a torrent given as a .torrent file or as an infohash in BT_backup.
+    A .fastresume next to the .torrent supplies the save path and renames;
+    an explicit save_path wins. Returns (TorrentInfo, save path, ResumeData or None).
+    """
+    if torrent_path is None:
+        torrent_path, resume_path = bt_backup_paths(infohash, bt_backup or default_bt_backup())
+    else:
+        resume_path = torrent_path.with_suffix('.fastresume')
+    info = parse_torrent(torrent_path)
+
+    resume = None
+    if resume_path.exists():
+        try:
+            resume = read_resume_data(resume_path)
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable resume data %s: %s", resume_path, e)
+    save_path = save_path or (resume.save_path if resume else None)
+    if save_path is None:
+        raise ValueError(f"No save path known for {torrent_path.name}; pass --save-path")
+    return info, save_path, resume
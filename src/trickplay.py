@@ -0,0 +1,154 @@
+import sys
+import shutil
+import logging
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from metrics import METRICS
+
+# Sidecar kind of the <name>.trickplay directory (see database.record_sidecars)
+KIND_TRICKPLAY = 'trickplay'
+
+PRIORITY_NORMAL = 'normal'
+PRIORITY_LOW = 'low'      # nice 10 / below-normal priority class
+PRIORITY_IDLE = 'idle'    # nice 19 + idle I/O class / idle priority class
+
+def trickplay_dir(dest_dir: Path, std_name: str, width: int, cols: int, rows: int) -> Path:
+    """Jellyfin's "save trickplay images next to media" layout: <name>.trickplay/<width> - <cols>x<rows>/"""
+    return dest_dir / f"{std_name}.trickplay" / f"{width} - {cols}x{rows}"
+
+def build_command(ffmpeg_cmd, input_path, output_dir: Path, interval=10, width=320, cols=10, rows=10, quality=4, threads=1):
+    """
+    One ffmpeg pass: decode keyframes only, take one frame per `interval`
+    seconds, scale to `width` and tile into cols x rows sheets (0.jpg, 1.jpg, ...).
+    """
+    return [
+        ffmpeg_cmd, '-v', 'error', '-y',
+        '-threads', str(threads),
+        '-skip_frame', 'nokey',
+        '-i', str(input_path),
+        '-an', '-sn', '-dn',
+        '-vf', f"fps=1/{interval},scale={width}:-2,tile={cols}x{rows}",
+        '-fps_mode', 'vfr',
+        '-q:v', str(quality),
+        '-start_number', '0',
+        str(output_dir / '%d.jpg'),
+    ]
+
+def priority_options(priority: str):
+    """subprocess.Popen keyword arguments (and a command prefix) for a background priority."""
+    if priority == PRIORITY_NORMAL:
+        return [], {}
+    if sys.platform == 'win32':
+        flag = subprocess.IDLE_PRIORITY_CLASS if priority == PRIORITY_IDLE else subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        return [], {'creationflags': flag}
+    # Command prefixes rather than preexec_fn, which is unsafe in a threaded process
+    prefix = []
+    if shutil.which('nice'):
+        prefix = [shutil.which('nice'), '-n', '19' if priority == PRIORITY_IDLE else '10']
+    if priority == PRIORITY_IDLE and shutil.which('ionice'):
+        # Yield disk I/O to seeding
+        prefix += [shutil.which('ionice'), '-c', '3']
+    return prefix, {}
+
+class TrickplayGenerator:
+    """
+    Generates Jellyfin trickplay sheets for local sources on a bounded worker
+    pool (`workers` ffmpeg processes, each limited to `threads` threads, at
+    reduced CPU/I/O priority). Sheets are written to a temporary directory
+    and renamed into place, so a present directory means a complete set.
+    """
+    def __init__(self, interval=10, width=320, cols=10, rows=10, quality=4, workers=1, threads=1, priority=PRIORITY_LOW):
+        self.interval = interval
+        self.width = width
+        self.cols = cols
+        self.rows = rows
+        self.quality = quality
+        self.threads = threads
+        self.priority = priority
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='trickplay')
+        self._futures = []
+
+    def output_dir(self, dest_dir: Path, std_name: str) -> Path:
+        return trickplay_dir(dest_dir, std_name, self.width, self.cols, self.rows)
+
+    def submit(self, input_path: Path, dest_dir: Path, std_name: str, on_done=None):
+        """Queues generation; skipped if the sheets exist. on_done(output_dir) runs after success."""
+        output_dir = self.output_dir(dest_dir, std_name)
+        if output_dir.exists():
+            return None
+        future = self._pool.submit(self.generate, input_path, output_dir, on_done)
+        self._futures.append(future)
+        return future
+
+    def generate(self, input_path: Path, output_dir: Path, on_done=None) -> bool:
+        ffmpeg_cmd = shutil.which('ffmpeg')
+        if not ffmpeg_cmd:
+            logging.warning("FFmpeg not found. Skipping trickplay generation.")
+            return False
+
+        tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        prefix, popen_kwargs = priority_options(self.priority)
+        cmd = prefix + build_command(ffmpeg_cmd, input_path, tmp_dir, self.interval, self.width, self.cols, self.rows, self.quality, self.threads)
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace', **popen_kwargs)
+            if result.returncode != 0 or not any(tmp_dir.iterdir()):
+                logging.error("Trickplay generation failed for %s: %s", input_path, result.stderr)
+                METRICS.inc('trickplay_total', result='failed')
+                return False
+            tmp_dir.rename(output_dir)
+        except OSError as e:
+            logging.error("Trickplay generation failed for %s: %s", input_path, e)
+            METRICS.inc('trickplay_total', result='failed')
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        METRICS.inc('trickplay_total', result='done')
+        logging.info("Generated trickplay: %s", output_dir)
+        if on_done:
+            on_done(output_dir)
+        return True
+
+    def close(self):
+        """Waits for queued sheets."""
+        self._pool.shutdown(wait=True)
+        for future in self._futures:
+            if future.exception():
+                logging.error("Trickplay worker failed: %s", future.exception())
+        self._futures = []
+
+# Active generator when trickplay.enabled is set
+_generator = None
+
+def start_trickplay(config):
+    """Creates the generator from the `trickplay` config section; None if disabled."""
+    global _generator
+    conf = config.get('trickplay') or {}
+    if not conf.get('enabled'):
+        return None
+    _generator = TrickplayGenerator(
+        interval=conf.get('interval', 10),
+        width=conf.get('width', 320),
+        cols=conf.get('tile_width', 10),
+        rows=conf.get('tile_height', 10),
+        quality=conf.get('quality', 4),
+        workers=conf.get('workers', 1),
+        threads=conf.get('threads', 1),
+        priority=conf.get('priority', PRIORITY_LOW),
+    )
+    return _generator
+
+def stop_trickplay():
+    global _generator
+    if _generator is not None:
+        _generator.close()
+        _generator = None
+
+def queue_trickplay(input_path: Path, dest_dir: Path, std_name: str, on_done=None):
+    """Queues trickplay sheets for a file; no-op when trickplay is disabled."""
+    if _generator is not None:
+        return _generator.submit(input_path, dest_dir, std_name, on_done)
+    return None
@@ -0,0 +1,135 @@
+import re
+import logging
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import parse_filename
+
+ORDER_WALK = 'walk'         # Directory walk order (previous behaviour)
+ORDER_SHORTEST = 'shortest' # Smallest files first: most files playable soonest
+ORDER_EPISODE = 'episode'   # Early episodes of every series first, then by size
+
+_RATE_RE = re.compile(r'^(\d+(?:\.\d+)?)([bBkKmMgGtT]?)$')
+_UNITS = {'': 1024, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+def parse_rate(rate: str):
+    """rclone bandwidth ("512k", "5M", "off") -> bytes/sec, None for unlimited."""
+    rate = str(rate).strip()
+    if rate.lower() in ('off', '0', ''):
+        return None
+    match = _RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid bandwidth value: {rate}")
+    return float(match.group(1)) * _UNITS[match.group(2).lower()]
+
+def format_rate(bytes_per_sec) -> str:
+    if bytes_per_sec is None:
+        return 'off'
+    return f"{max(1, int(bytes_per_sec // 1024))}k"
+
+def _split_rate(rate: str, parts: int) -> str:
+    # "up:down" form limits both directions separately
+    if ':' in rate:
+        return ':'.join(_split_rate(r, parts) for r in rate.split(':'))
+    value = parse_rate(rate)
+    return format_rate(value / parts) if value is not None else 'off'
+
+def build_bwlimit(rclone_conf: dict) -> str:
+    """
+    Returns the value for rclone --bwlimit: either the static `bwlimit` or,
+    if `bwlimit_schedule` is set ({"08:00": "1M", "23:00": "off"}), rclone's
+    timetable syntax "08:00,1M 23:00,off" so rclone switches rates by itself.
+    """
+    schedule = rclone_conf.get('bwlimit_schedule')
+    if not schedule:
+        return str(rclone_conf.get('bwlimit', 'off'))
+    return ' '.join(f"{when},{rate}" for when, rate in sorted(schedule.items()))
+
+def split_bwlimit(bwlimit: str, parts: int) -> str:
+    """
+    --bwlimit applies per rclone process; divides every rate of a static or
+    timetable limit so `parts` concurrent transfers share the configured total.
+    """
+    if parts <= 1:
+        return bwlimit
+    entries = bwlimit.split()
+    if len(entries) == 1 and ',' not in entries[0]:
+        return _split_rate(entries[0], parts)
+    out = []
+    for entry in entries:
+        when, _, rate = entry.partition(',')
+        out.append(f"{when},{_split_rate(rate, parts)}")
+    return ' '.join(out)
+
+def current_rate(bwlimit: str, now: datetime = None):
+    """
+    Upload bytes/sec of a static or timetable --bwlimit value at `now`, for
+    uploaders that throttle themselves (None: unlimited). Before the first
+    switch of the day the last one still applies, as in rclone.
+    """
+    entries = str(bwlimit).split()
+    if len(entries) == 1 and ',' not in entries[0]:
+        rate = entries[0]
+    else:
+        now = now or datetime.now()
+        slots = sorted((entry.partition(',')[0], entry.partition(',')[2]) for entry in entries)
+        rate = slots[-1][1]
+        for when, slot_rate in slots:
+            if when <= now.strftime('%H:%M'):
+                rate = slot_rate
+    # "up:down" limits: the first one applies to uploads
+    return parse_rate(rate.split(':')[0])
+
+def _episode_key(path: Path):
+    meta = parse_filename(path.name)
+    try:
+        episode = float(meta['episode'])
+    except (TypeError, ValueError):
+        episode = float('inf')
+    return (int(meta['season']), episode, meta['title'])
+
+def _size(path: Path):
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+def order_files(files, policy: str = ORDER_WALK):
+    """Orders a batch of video files according to the upload policy."""
+    files = list(files)
+    if policy == ORDER_SHORTEST:
+        return sorted(files, key=_size)
+    if policy == ORDER_EPISODE:
+        return sorted(files, key=lambda f: (_episode_key(f), _size(f)))
+    if policy != ORDER_WALK:
+        logging.warning("Unknown upload order '%s', using walk order.", policy)
+    return files
+
+def run_ordered(items, worker, concurrency: int = 1, on_done=None):
+    """
+    Runs worker(item) for every item, starting them in the given order with at
+    most `concurrency` running at once. on_done(index) is called in the
+    calling thread after each completion (index counts completions from 1).
+    Exceptions are logged per item and do not stop the batch.
+    """
+    items = list(items)
+    if concurrency <= 1:
+        for index, item in enumerate(items, 1):
+            try:
+                worker(item)
+            except Exception as e:
+                logging.exception("Critical error while processing %s: %s", item, e)
+            if on_done:
+                on_done(index)
+        return
+
+    # The pool takes queued work FIFO, so start order follows `items`
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="upload") as pool:
+        futures = {pool.submit(worker, item): item for item in items}
+        for index, future in enumerate(as_completed(futures), 1):
+            try:
+                future.result()
+            except Exception as e:
+                logging.exception("Critical error while processing %s: %s", futures[future], e)
+            if on_done:
+                on_done(index)
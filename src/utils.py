@@ -1,5 +1,9 @@
 import logging
 import logging.handlers
+import atexit
+import contextvars
+import json
+import queue
 import sys
 import io
 import os
@@ -9,15 +13,85 @@ import yaml
 import anitopy
 import ctypes
 import re
+import threading
 import requests
 from pathlib import Path
+from contextlib import contextmanager
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 
-def generate_thumbnail(input_path: str, output_path: str):
+def probe_media(input_path: str):
+    """
+    Runs ffprobe on a video file and returns a compact summary for NFO
+    streamdetails and embedded track extraction: {'duration': seconds,
+    'video': [...], 'audio': [...], 'subtitle': [...], 'attachments': [...]}. Returns None if ffprobe is missing or fails.
+    """
+    ffprobe_cmd = shutil.which('ffprobe')
+    if not ffprobe_cmd:
+        logging.warning("FFprobe not found. Skipping media info.")
+        return None
+
+    cmd = [
+        ffprobe_cmd,
+        '-v', 'error',
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        str(input_path)
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        if result.returncode != 0:
+            logging.error("FFprobe failed: %s", result.stderr)
+            return None
+        return summarize_probe(json.loads(result.stdout))
+    except (OSError, ValueError) as e:
+        logging.error("Error probing media: %s", e)
+        return None
+
+def summarize_probe(probe: dict) -> dict:
+    """Reduces `ffprobe -show_format -show_streams` JSON to what NFO streamdetails need."""
+    def number(value, cast=float):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return None
+
+    duration = number((probe.get('format') or {}).get('duration'))
+    info = {'duration': duration, 'video': [], 'audio': [], 'subtitle': [], 'attachments': []}
+    for stream in probe.get('streams') or []:
+        kind = stream.get('codec_type')
+        disposition = stream.get('disposition') or {}
+        language = (stream.get('tags') or {}).get('language')
+        if kind == 'video' and not disposition.get('attached_pic'):
+            width, height = number(stream.get('width'), int), number(stream.get('height'), int)
+            info['video'].append({
+                'codec': stream.get('codec_name'),
+                'width': width,
+                'height': height,
+                'aspect': round(width / height, 2) if width and height else None,
+                'duration': number(stream.get('duration')) or duration,
+            })
+        elif kind == 'audio':
+            info['audio'].append({'codec': stream.get('codec_name'), 'language': language, 'channels': number(stream.get('channels'), int)})
+        elif kind == 'subtitle':
+            info['subtitle'].append({'index': stream.get('index'), 'codec': stream.get('codec_name'), 'language': language})
+        elif kind == 'attachment':
+            tags = stream.get('tags') or {}
+            info['attachments'].append({'index': stream.get('index'), 'filename': tags.get('filename'), 'mimetype': tags.get('mimetype')})
+    return info
+
+def thumbnail_offset(duration: float = None) -> str:
+    """Seek position of the thumbnail: 10 seconds in, or the middle of shorter videos."""
+    if not duration or duration >= 20:
+        return '00:00:10'
+    return f"00:00:{duration / 2:06.3f}"
+
+def generate_thumbnail(input_path: str, output_path: str, duration: float = None):
     """
     Generates a thumbnail for the video file using FFmpeg.
-    Takes a frame at 10 seconds.
+    Takes a frame at 10 seconds (mid-point of clips shorter than 20 seconds
+    when the probed duration is known).
     """
     ffmpeg_cmd = shutil.which('ffmpeg')
     if not ffmpeg_cmd:
@@ -29,7 +103,7 @@ def generate_thumbnail(input_path: str, output_path: str):
         cmd = [
             ffmpeg_cmd,
             '-i', str(input_path),
-            '-ss', '00:00:10',
+            '-ss', thumbnail_offset(duration),
             '-vframes', '1',
             str(output_path),
             '-y'
@@ -40,33 +114,45 @@ def generate_thumbnail(input_path: str, output_path: str):
 
         if result.returncode == 0:
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                logging.info(f"Generated Thumbnail: {output_path}")
+                logging.info("Generated Thumbnail: %s", output_path)
             else:
-                logging.error(f"FFmpeg ran but thumbnail file is empty or missing: {output_path}")
+                logging.error("FFmpeg ran but thumbnail file is empty or missing: %s", output_path)
         else:
-            logging.error(f"FFmpeg failed: {result.stderr}")
+            logging.error("FFmpeg failed: %s", result.stderr)
 
     except Exception as e:
-        logging.error(f"Error generating thumbnail: {e}")
+        logging.error("Error generating thumbnail: %s", e)
 
-def save_image(url: str, output_path: str):
+def download_image(url: str):
     """
-    Downloads and saves an image from a URL.
+    Downloads an image from a URL. Returns the bytes, or None on failure.
     """
     if not url:
-        return
+        return None
 
     try:
-        response = requests.get(url, stream=True, timeout=10)
+        response = requests.get(url, timeout=10)
         if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(1024):
-                    f.write(chunk)
-            logging.info(f"Saved image: {output_path}")
-        else:
-            logging.error(f"Failed to download image {url}: Status {response.status_code}")
+            return response.content
+        logging.error("Failed to download image %s: Status %s", url, response.status_code)
     except Exception as e:
-        logging.error(f"Error downloading image {url}: {e}")
+        logging.error("Error downloading image %s: %s", url, e)
+    return None
+
+def save_image(url: str, output_path: str):
+    """
+    Downloads and saves an image from a URL.
+    """
+    data = download_image(url)
+    if data is None:
+        return
+
+    try:
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        logging.info("Saved image: %s", output_path)
+    except OSError as e:
+        logging.error("Failed to save image %s: %s", output_path, e)
 
 def prettify_xml(elem):
     """Return a pretty-printed XML string for the Element."""
@@ -138,14 +224,41 @@ def generate_tvshow_nfo(metadata: dict, output_dir: Path):
     try:
         with open(nfo_path, "w", encoding='utf-8') as f:
             f.write(prettify_xml(root))
-        logging.info(f"Generated NFO: {nfo_path}")
+        logging.info("Generated NFO: %s", nfo_path)
     except Exception as e:
-        logging.error(f"Failed to generate tvshow.nfo: {e}")
-
-def generate_episode_nfo(metadata: dict, episode_num: str, season_num: str, output_path: Path):
+        logging.error("Failed to generate tvshow.nfo: %s", e)
+
+def add_streamdetails(root: ET.Element, media: dict):
+    """Appends <runtime> (minutes) and <fileinfo><streamdetails> from a probe_media summary."""
+    if media.get('duration'):
+        runtime = ET.SubElement(root, "runtime")
+        runtime.text = str(max(1, round(media['duration'] / 60)))
+
+    details = ET.SubElement(ET.SubElement(root, "fileinfo"), "streamdetails")
+    fields = {
+        'video': (('codec', 'codec'), ('aspect', 'aspect'), ('width', 'width'), ('height', 'height'), ('durationinseconds', 'duration')),
+        'audio': (('codec', 'codec'), ('language', 'language'), ('channels', 'channels')),
+        'subtitle': (('language', 'language'),),
+    }
+    for kind, tags in fields.items():
+        for stream in media.get(kind) or []:
+            node = ET.SubElement(details, kind)
+            for tag, key in tags:
+                value = stream.get(key)
+                if value is None:
+                    continue
+                if key == 'duration':
+                    value = int(value)
+                ET.SubElement(node, tag).text = str(value)
+
+def generate_episode_nfo(metadata: dict, episode_num: str, season_num: str, output_path: Path, media: dict = None, show_title: str = None):
     """
     Generates episode .nfo
     Currently just basic info as we don't fetch per-episode data.
+    media: probe_media summary; written as streamdetails so Jellyfin does
+    not have to probe the remote stream.
+    metadata may be None (no AniList match): show_title, if any, then names
+    the show and the NFO mostly carries the streamdetails.
     """
     root = ET.Element("episodedetails")
 
@@ -160,15 +273,21 @@ def generate_episode_nfo(metadata: dict, episode_num: str, season_num: str, outp
     episode.text = str(episode_num)
 
     # Link to show
-    showtitle = ET.SubElement(root, "showtitle")
-    showtitle.text = metadata['title']['english'] or metadata['title']['romaji']
+    if metadata:
+        show_title = metadata['title']['english'] or metadata['title']['romaji']
+    if show_title:
+        showtitle = ET.SubElement(root, "showtitle")
+        showtitle.text = show_title
+
+    if media:
+        add_streamdetails(root, media)
 
     try:
         with open(output_path, "w", encoding='utf-8') as f:
             f.write(prettify_xml(root))
-        logging.info(f"Generated Episode NFO: {output_path}")
+        logging.info("Generated Episode NFO: %s", output_path)
     except Exception as e:
-        logging.error(f"Failed to generate episode nfo: {e}")
+        logging.error("Failed to generate episode nfo: %s", e)
 
 def sanitize_filename(name: str) -> str:
     """
@@ -211,6 +330,9 @@ def disable_quick_edit():
             # Don't let this crash the app
             print(f"Failed to disable Quick Edit mode: {e}", file=sys.stderr)
 
+# anitopy parses into module-level token/element lists; concurrent calls corrupt each other
+_anitopy_lock = threading.Lock()
+
 def parse_filename(filename: str) -> dict:
     """
     Parses a filename using anitopy and returns standardized metadata.
@@ -221,7 +343,8 @@ def parse_filename(filename: str) -> dict:
         - full_name: Standardized Name (e.g. "Title - S01E01")
         - original_name: The input filename
     """
-    data = anitopy.parse(filename)
+    with _anitopy_lock:
+        data = anitopy.parse(filename)
 
     title_raw = data.get('anime_title', filename)
     title = sanitize_filename(title_raw)
@@ -258,7 +381,51 @@ def parse_filename(filename: str) -> dict:
         'original_name': filename
     }
 
-def setup_logging(log_dir="logs", log_level="INFO", max_bytes=5*1024*1024, backup_count=3):
+# Per-file logging context (correlation id, file, stage), set by log_context()
+LOG_CONTEXT = contextvars.ContextVar('log_context', default={})
+
+_queue_listener = None
+
+@contextmanager
+def log_context(**fields):
+    """
+    Adds fields (e.g. cid, file, stage) to every log record emitted inside the block.
+    Nested contexts inherit and override outer fields.
+    """
+    token = LOG_CONTEXT.set({**LOG_CONTEXT.get(), **fields})
+    try:
+        yield
+    finally:
+        LOG_CONTEXT.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copies the current log_context() fields onto the record in the emitting thread."""
+    def filter(self, record):
+        record.context = LOG_CONTEXT.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, message plus log_context() fields."""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def setup_logging(log_dir="logs", log_level="INFO", max_bytes=5*1024*1024, backup_count=3, log_format="text"):
+    """
+    Routes all logging through a QueueHandler; a background QueueListener
+    thread does the file and console I/O. log_format "json" writes the log
+    file as JSON lines (console output stays human readable).
+    Returns the listener (stopped automatically at exit).
+    """
+    global _queue_listener
+
     log_dir = str(log_dir)
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
@@ -272,6 +439,7 @@ def setup_logging(log_dir="logs", log_level="INFO", max_bytes=5*1024*1024, backu
             pass
 
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
+    text_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 
     # Create handlers
     file_handler = logging.handlers.RotatingFileHandler(
@@ -280,13 +448,34 @@ def setup_logging(log_dir="logs", log_level="INFO", max_bytes=5*1024*1024, backu
         backupCount=backup_count,
         encoding='utf-8'
     )
+    file_handler.setFormatter(JsonFormatter() if log_format == 'json' else text_formatter)
     stream_handler = logging.StreamHandler(sys.stdout)
-    
-    logging.basicConfig(
-        level=numeric_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[file_handler, stream_handler]
-    )
+    stream_handler.setFormatter(text_formatter)
+
+    # Replace a previous setup (e.g. repeated calls in tests)
+    root = logging.getLogger()
+    stop_logging()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    root.addHandler(queue_handler)
+    root.setLevel(numeric_level)
+
+    _queue_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(stop_logging)
+    return _queue_listener
+
+def stop_logging():
+    """Flushes queued records and stops the background logging thread."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
 
 def load_config(config_path="config/config.yaml"):
     if not os.path.exists(config_path):
@@ -0,0 +1,198 @@
+import os
+import sys
+import time
+import logging
+import threading
+from pathlib import Path
+from metrics import METRICS
+from sync import scan_local
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError: # Optional: without watchdog, root_path is polled
+    Observer = None
+    FileSystemEventHandler = object
+
+def is_open_for_writing(path: Path) -> bool:
+    """
+    Best-effort check whether another process has path open for writing.
+    Linux: /proc/<pid>/fdinfo flags. Windows: an open file cannot be renamed
+    onto itself, which also holds for readers without delete sharing (players,
+    copy tools, a seeding client), so false positives are expected there; see
+    StabilityTracker.max_hold. Elsewhere: False (size/mtime stability alone decides).
+    """
+    if sys.platform == 'win32':
+        try:
+            os.rename(path, path)
+            return False
+        except OSError:
+            return True
+    if not os.path.isdir('/proc/self/fd'):
+        return False
+
+    target = os.path.realpath(path)
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue # Process gone or not ours
+        for fd in fds:
+            try:
+                if os.readlink(f"{fd_dir}/{fd}") != target:
+                    continue
+                with open(f"/proc/{pid}/fdinfo/{fd}") as info:
+                    for line in info:
+                        if line.startswith('flags:'):
+                            if int(line.split()[1], 8) & (os.O_WRONLY | os.O_RDWR):
+                                return True
+                            break
+            except (OSError, ValueError):
+                continue
+    return False
+
+class StabilityTracker:
+    """
+    Candidate files from watch events. A file is ready once its size and
+    mtime stayed unchanged for `settle` seconds and nobody has it open for
+    writing, or unchanged for `max_hold` seconds even though it still looks
+    busy (on Windows any open handle does). Ready files are released per
+    directory, once nothing else in the directory is still settling (a season
+    arriving file by file becomes one batch), or after `max_hold` seconds at
+    the latest.
+    """
+    def __init__(self, settle=30.0, max_hold=600.0, is_busy=is_open_for_writing):
+        self.settle = settle
+        self.max_hold = max_hold
+        self.is_busy = is_busy
+        # path -> [(size, mtime), stable since, ready since or None]
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def touch(self, path: Path):
+        with self._lock:
+            self._pending.setdefault(Path(path), [None, None, None])
+
+    def __len__(self):
+        return len(self._pending)
+
+    def ready_batches(self, now: float = None):
+        """Returns {directory: [files]} of batches to process now; they stop being tracked."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for path, state in list(self._pending.items()):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    del self._pending[path] # Deleted or moved away again
+                    continue
+                signature = (stat.st_size, stat.st_mtime)
+                if state[0] != signature:
+                    self._pending[path] = [signature, now, None]
+                elif state[2] is None and now - state[1] >= self.settle:
+                    if now - state[1] >= self.max_hold:
+                        logging.info("Watch: %s unchanged for %ss, taking it although it looks open", path, int(now - state[1]))
+                        state[2] = now
+                    elif not self.is_busy(path):
+                        state[2] = now
+
+            by_dir = {}
+            for path, state in self._pending.items():
+                by_dir.setdefault(path.parent, []).append((path, state[2]))
+            batches = {}
+            for directory, entries in by_dir.items():
+                ready = [p for p, since in entries if since is not None]
+                settling = len(ready) < len(entries)
+                overdue = any(since is not None and now - since >= self.max_hold for _, since in entries)
+                if ready and (not settling or overdue):
+                    batches[directory] = sorted(ready)
+                    for path in ready:
+                        del self._pending[path]
+            return batches
+
+# watchdog event types that mean new content; 'closed' is a close after
+# writing, unlike 'opened'/'closed_no_write', which every reader triggers
+TRACKED_EVENTS = ('created', 'modified', 'moved', 'closed')
+
+class _EventHandler(FileSystemEventHandler):
+    """Feeds created/modified/moved-in/closed-after-write video files to the tracker."""
+    def __init__(self, tracker: StabilityTracker, video_exts):
+        self.tracker = tracker
+        self.video_exts = video_exts
+
+    def _track(self, path: str, is_directory: bool):
+        if is_directory:
+            # A directory moved in arrives as a single event
+            for entry, _ in scan_local(Path(path), self.video_exts):
+                self.tracker.touch(Path(path) / entry)
+        elif os.path.splitext(path)[1].lower() in self.video_exts:
+            self.tracker.touch(Path(path))
+
+    def on_any_event(self, event):
+        if event.event_type not in TRACKED_EVENTS:
+            return
+        METRICS.inc('watch_events_total', type=event.event_type)
+        self._track(getattr(event, 'dest_path', '') or event.src_path, event.is_directory)
+
+class LibraryWatcher:
+    """
+    Watches root_path and hands stable files to on_batch(files), one call per
+    directory batch. Uses inotify/ReadDirectoryChangesW through watchdog when
+    installed; otherwise root_path is rescanned every `poll_interval` seconds.
+    """
+    def __init__(self, root: Path, video_exts, on_batch, settle=30.0, max_hold=600.0, poll_interval=60.0, tick=1.0):
+        self.root = Path(root)
+        self.video_exts = video_exts
+        self.on_batch = on_batch
+        self.tracker = StabilityTracker(settle, max_hold)
+        self.poll_interval = poll_interval
+        self.tick = tick
+        self.stop_event = threading.Event()
+        self._snapshot = None
+
+    def _poll(self):
+        """Fallback change detection: diff (path, size) against the previous scan."""
+        current = dict(scan_local(self.root, self.video_exts))
+        if self._snapshot is not None:
+            for rel, size in current.items():
+                if self._snapshot.get(rel) != size:
+                    self.tracker.touch(self.root / rel)
+        self._snapshot = current
+
+    def run(self):
+        """Blocks until stop() or KeyboardInterrupt."""
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_EventHandler(self.tracker, self.video_exts), str(self.root), recursive=True)
+            observer.start()
+            logging.info("Watching %s for new files.", self.root)
+        else:
+            logging.info("watchdog not installed; polling %s every %ss.", self.root, self.poll_interval)
+
+        next_poll = 0.0
+        try:
+            while not self.stop_event.is_set():
+                if observer is None and time.monotonic() >= next_poll:
+                    self._poll()
+                    next_poll = time.monotonic() + self.poll_interval
+                for directory, files in self.tracker.ready_batches().items():
+                    logging.info("Watch: %s new file(s) in %s", len(files), directory)
+                    METRICS.inc('watch_batches_total')
+                    try:
+                        self.on_batch(files)
+                    except Exception as e:
+                        logging.exception("Watch: batch in %s failed: %s", directory, e)
+                self.stop_event.wait(self.tick)
+        except KeyboardInterrupt:
+            logging.info("Watch stopped.")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def stop(self):
+        self.stop_event.set()
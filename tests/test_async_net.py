@@ -0,0 +1,54 @@
+import unittest
+import os
+import sys
+import time
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from anilist_client import AniListClient
+from seafile_client import SeafileClient
+from async_net import AsyncNetEngine, resolve_metadata, resolve_share_links, fetch_images
+from benchmarks.stubs import anilist_stub, seafile_stub, COVER_BYTES
+
+class TestAsyncNetEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = AsyncNetEngine(per_host_limit=4)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_resolve_metadata_concurrent_and_cached(self):
+        titles = [f"Show {i}" for i in range(8)] + ["Show 0"]
+        with anilist_stub(latency=0.1) as srv:
+            client = AniListClient(url=srv.url, request_delay=0)
+
+            start = time.perf_counter()
+            results = resolve_metadata(self.engine, client, titles, concurrency=4)
+            elapsed = time.perf_counter() - start
+
+            # Synchronous call site now answered from the cache
+            self.assertEqual(client.search_anime("Show 3")['title']['romaji'], "Show 3")
+            requests_made = srv.requests
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual(requests_made, 8)
+        # 8 requests of 100ms with 4 in flight: about 2 rounds, not 8
+        self.assertLess(elapsed, 0.6)
+
+    def test_resolve_share_links_and_images(self):
+        with seafile_stub() as srv:
+            client = SeafileClient(srv.url, "token", "repo")
+            links = resolve_share_links(self.engine, client, ["/a.mkv", "/b.mkv"])
+            self.assertEqual(client.get_share_link("/a.mkv"), links["/a.mkv"])
+            self.assertEqual(srv.requests, 2)
+
+        with anilist_stub() as srv:
+            images = fetch_images(self.engine, [f"{srv.url}/covers/1.jpg", f"{srv.url}/missing"])
+
+        self.assertEqual(images[f"{srv.url}/covers/1.jpg"], COVER_BYTES)
+        self.assertIsNone(images[f"{srv.url}/missing"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from seafile_client import SeafileClient
+from anilist_client import AniListClient
+from rclone_wrapper import RcloneWrapper
+from benchmarks.stubs import seafile_stub, anilist_stub
+from benchmarks.library_gen import generate_library, make_fake_rclone
+from benchmarks import run as bench
+
+class TestBenchmarkStandIns(unittest.TestCase):
+    def test_seafile_stub_create_then_exists(self):
+        with seafile_stub() as srv:
+            client = SeafileClient(srv.url, "token", "repo")
+            first = client.get_share_link("/Bangumi/a.mkv")
+            # A fresh client has no cached link and hits the "already exists" path
+            with self.assertLogs(level='WARNING'):
+                second = SeafileClient(srv.url, "token", "repo").get_share_link("/Bangumi/a.mkv")
+
+        self.assertTrue(first.startswith(srv.url))
+        self.assertEqual(first, second)
+
+    def test_anilist_stub_rate_limit(self):
+        with anilist_stub(rate_limit=1) as srv:
+            client = AniListClient(url=srv.url, request_delay=0)
+            self.assertEqual(client.search_anime("Frieren")['title']['romaji'], "Frieren")
+            with self.assertLogs(level='ERROR'):
+                self.assertIsNone(client.search_anime("Dungeon Meshi"))
+        self.assertEqual(srv.throttled, 1)
+
+    def test_fake_rclone_copy_and_list(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            videos = generate_library(tmp / "archive", 3, file_size=1024)
+            rclone = RcloneWrapper("Bench", "off", executable=make_fake_rclone(tmp / "bin"))
+
+            with patch.dict(os.environ, {'FAKE_RCLONE_ROOT': str(tmp / "remote")}):
+                self.assertTrue(rclone.upload(videos[0], "/Bangumi/Show"))
+                listing = rclone.list_remote("/Bangumi")
+
+        self.assertEqual(len(listing), 1)
+        self.assertEqual(listing[0]['Path'], f"Show/{videos[0].name}")
+        self.assertEqual(listing[0]['Size'], 1024)
+
+class TestBenchmarkRunner(unittest.TestCase):
+    def test_process_scenario_smoke(self):
+        opts = argparse.Namespace(files=3, file_size=1024, latency=0, rate_limit=0, bwlimit="off", anilist_delay=0)
+        # The scenario points the fake rclone at its workspace through the environment
+        with patch.dict(os.environ):
+            result = bench.run_scenario('process', opts)
+
+        self.assertEqual(result['items'], 3)
+        self.assertEqual(result['stages']['upload']['count'], 3)
+        self.assertEqual(result['stages']['share_link']['count'], 3)
+        self.assertGreater(result['peak_rss'], 0)
+
+    def test_compare_flags_regression(self):
+        stage = {'count': 1, 'total': 1.0, 'mean': 1.0, 'p50': 1.0, 'p95': 1.0}
+        baseline = {'scenarios': {'prune': {'items_per_sec': 100.0, 'stages': {'delete_mapping': stage}}}}
+        current = {'scenarios': {'prune': {'items_per_sec': 50.0, 'stages': {'delete_mapping': dict(stage, p95=2.0)}}}}
+
+        regressions = bench.compare(current, baseline, threshold=0.2)
+
+        self.assertEqual(len(regressions), 2)
+
+if __name__ == '__main__':
+    unittest.main()
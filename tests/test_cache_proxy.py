@@ -0,0 +1,132 @@
+import unittest
+import tempfile
+import threading
+import os
+import sys
+import requests
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database import VideoMappingDB
+from targets import Target, TargetRouter
+from resolver import LinkResolver
+from range_cache import RangeCache
+from cache_proxy import CachingProxy, OriginError, make_server, parse_range
+from benchmarks.stubs import origin_stub
+
+PAYLOAD = bytes(range(256)) * 14  # 3584 bytes: 3.5 blocks of 1 KiB
+
+class TestCacheProxy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=500-5000", 1000), (500, 999))
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        self.assertFalse(parse_range("bytes=1000-", 1000))
+
+    def test_lru_eviction(self):
+        cache = RangeCache(self.root / "cache", max_bytes=2048, block_size=1024)
+        cache.put_object("a", 2048)
+        cache.write_blocks("a", 0, b"a" * 2048)
+        cache.put_object("b", 1024)
+        cache.write_blocks("b", 0, b"b" * 1024)
+
+        self.assertIsNone(cache.get_object("a"))
+        self.assertEqual(cache.read("b", 0, 3), b"bbbb")
+        self.assertEqual(cache.usage(), 1024)
+
+    def test_partial_blocks_not_marked(self):
+        cache = RangeCache(self.root / "cache", max_bytes=10 ** 6, block_size=1024)
+        cache.put_object("a", 2500)
+        cache.write_blocks("a", 0, b"x" * 1500)
+        self.assertEqual(cache.missing_blocks("a", 0, 2), [1, 2])
+        cache.write_blocks("a", 1, b"y" * 1476)
+        self.assertEqual(cache.missing_blocks("a", 0, 2), [])
+
+    def test_proxy_serves_ranges_from_cache(self):
+        source = Path("/source/ep1.mkv")
+        with origin_stub() as origin:
+            origin.state['files'] = {'/f/abc/': PAYLOAD}
+            self.db.upsert_mapping(source, Path("/lib/ep1.strm"), f"{origin.url}/f/abc/")
+            mapping_id = self.db.get_mapping(source)['id']
+
+            router = TargetRouter([Target("default", MagicMock(), MagicMock(), "/Bangumi")], self.db)
+            cache = RangeCache(self.root / "cache", max_bytes=10 ** 6, block_size=1024)
+            proxy = CachingProxy(LinkResolver(self.db, router, Path("/source")), cache, fetch_blocks=2)
+            server = make_server(proxy, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = "http://%s:%s/m/%s" % (*server.server_address[:2], mapping_id)
+            try:
+                first = requests.get(url, headers={'Range': 'bytes=1000-2500'}, timeout=5)
+                fetched = origin.requests
+                again = requests.get(url, headers={'Range': 'bytes=1000-2500'}, timeout=5)
+                after_hit = origin.requests
+                tail = requests.get(url, headers={'Range': 'bytes=-100'}, timeout=5)
+                full = requests.get(url, timeout=5)
+                unsatisfiable = requests.get(url, headers={'Range': 'bytes=5000-'}, timeout=5)
+            finally:
+                server.shutdown()
+                server.server_close()
+                proxy.close()
+
+        self.assertEqual(first.status_code, 206)
+        self.assertEqual(first.headers['Content-Range'], f"bytes 1000-2500/{len(PAYLOAD)}")
+        self.assertEqual(first.content, PAYLOAD[1000:2501])
+        self.assertEqual(again.content, PAYLOAD[1000:2501])
+        self.assertEqual(after_hit, fetched)
+        self.assertEqual(tail.content, PAYLOAD[-100:])
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.content, PAYLOAD)
+        self.assertEqual(unsatisfiable.status_code, 416)
+
+    def test_origin_ignoring_range_is_skipped_in_chunks(self):
+        source = Path("/source/ep1.mkv")
+        with origin_stub() as origin:
+            origin.state['files'] = {'/f/abc/': PAYLOAD}
+            origin.state['ignore_range'] = True
+            self.db.upsert_mapping(source, Path("/lib/ep1.strm"), f"{origin.url}/f/abc/")
+            mapping_id = self.db.get_mapping(source)['id']
+
+            router = TargetRouter([Target("default", MagicMock(), MagicMock(), "/Bangumi")], self.db)
+            cache = RangeCache(self.root / "cache", max_bytes=10 ** 6, block_size=1024)
+            proxy = CachingProxy(LinkResolver(self.db, router, Path("/source")), cache)
+            reads = []
+
+            def tracking_get(*args, **kwargs):
+                resp = requests.Session.get(proxy.session, *args, **kwargs)
+                raw_read = resp.raw.read
+                def read(amt=None, **kw):
+                    reads.append(amt)
+                    return raw_read(amt, **kw)
+                resp.raw.read = read
+                return resp
+
+            try:
+                with patch('cache_proxy.SKIP_CHUNK', 500), patch.object(proxy.session, 'get', tracking_get):
+                    data, total, _ = proxy._fetch(mapping_id, "m1", 2048, 3071)
+                    self.assertEqual(data, PAYLOAD[2048:3072])
+                    self.assertEqual(total, len(PAYLOAD))
+                    # The 2048-byte head went through reads of at most 500 bytes
+                    self.assertEqual(reads[:-1], [500, 500, 500, 500, 48])
+
+                    with self.assertRaises(OriginError):
+                        proxy._fetch(mapping_id, "m1", 5000, 5100)
+            finally:
+                proxy.close()
+
+if __name__ == '__main__':
+    unittest.main()
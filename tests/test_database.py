@@ -3,6 +3,7 @@ import sqlite3
 import os
 import sys
 from pathlib import Path
+from datetime import datetime, timedelta
 
 # Add src to path
 sys.path.append(str(Path(__file__).resolve().parent.parent / "src"))
@@ -73,5 +74,116 @@ class TestDatabase(unittest.TestCase):
         for s, d in mappings.items():
             self.assertEqual(res_dict[str(Path(s).resolve())], str(Path(d).resolve()))
 
+    def test_remote_files_cache(self):
+        self.db.upsert_remote_file("/Bangumi/old.mkv", 1)
+        self.db.replace_remote_files([("/Bangumi/a.mkv", 10, "2024-01-01T00:00:00Z")])
+        self.db.upsert_remote_file("/Bangumi/b.mkv", 20)
+
+        self.assertIsNone(self.db.get_remote_file("/Bangumi/old.mkv"))
+        self.assertEqual(self.db.get_remote_file("/Bangumi/a.mkv")['size'], 10)
+        self.assertEqual(self.db.get_remote_file("/Bangumi/b.mkv")['size'], 20)
+
+    def test_remote_files_per_target(self):
+        self.db.replace_remote_files([("/Bangumi/a.mkv", 10, None)], target="main")
+        self.db.replace_remote_files([("/Bangumi/a.mkv", 30, None)], target="spare")
+        self.db.replace_remote_files([], target="spare")
+
+        self.assertEqual(self.db.get_remote_file("/Bangumi/a.mkv", "main")['size'], 10)
+        self.assertIsNone(self.db.get_remote_file("/Bangumi/a.mkv", "spare"))
+
+    def test_target_usage(self):
+        self.db.upsert_mapping(Path("/source/a.mkv"), Path("/lib/a.strm"), target="main", size=100)
+        self.db.upsert_mapping(Path("/source/b.mkv"), Path("/lib/b.strm"), target="main", size=50)
+        self.db.upsert_mapping(Path("/source/c.mkv"), Path("/lib/c.strm"), target="spare", size=10)
+        # Re-saving without target/size keeps the recorded placement
+        self.db.upsert_mapping(Path("/source/c.mkv"), Path("/lib/c.strm"), "http://link")
+
+        self.assertEqual(self.db.get_target_usage(), {"main": 150, "spare": 10})
+        self.assertEqual(self.db.get_mapping(Path("/source/c.mkv"))['target'], "spare")
+
+    def test_iter_mappings_allows_writes(self):
+        for i in range(250):
+            self.db.upsert_mapping(Path(f"/source/{i}.mkv"), Path(f"/lib/{i}.strm"))
+        seen = 0
+        for row in self.db.iter_mappings():
+            if seen == 50:
+                self.db.put_image("https://img/1.jpg", b"JPEG")
+            seen += 1
+        self.assertEqual(seen, 250)
+        self.assertEqual(self.db.get_image("https://img/1.jpg"), b"JPEG")
+
+    def test_mapping_id_survives_renumbered_rowids(self):
+        os.remove(self.db_path)
+        # A database from before link_id: .strm files carry the rowids
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE mappings (source_path TEXT PRIMARY KEY, strm_path TEXT NOT NULL, seafile_url TEXT, last_updated TIMESTAMP, metadata_status TEXT, metadata_info TEXT)")
+            for i in range(1, 6):
+                conn.execute("INSERT INTO mappings (source_path, strm_path, seafile_url) VALUES (?, ?, ?)", (f"/source/{i}.mkv", f"/lib/{i}.strm", f"http://l/{i}"))
+            conn.execute("DELETE FROM mappings WHERE source_path IN ('/source/1.mkv', '/source/3.mkv')")
+        db = VideoMappingDB(self.db_path)
+        self.assertEqual(db.get_mapping(Path("/source/4.mkv"))['id'], 4)
+
+        db.upsert_mapping(Path("/source/6.mkv"), Path("/lib/6.strm"), "http://l/6")
+        new_id = db.get_mapping(Path("/source/6.mkv"))['id']
+        self.assertEqual(new_id, 6)
+        # What VACUUM may do to the implicit rowids
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE mappings SET rowid = rowid + 100")
+
+        self.assertEqual(db.get_mapping(Path("/source/4.mkv"))['id'], 4)
+        self.assertEqual(db.get_mapping_by_id(4)['seafile_url'], "http://l/4")
+        self.assertEqual(db.get_mapping_by_id(new_id)['seafile_url'], "http://l/6")
+        self.assertEqual([row['id'] for row in db.iter_mappings(page_size=2)], [2, 4, 5, 6])
+
+    def test_job_journal_steps(self):
+        src = Path("/source/video.mkv")
+        job = self.db.start_job(src)
+        self.assertIsNone(job['step'])
+        self.assertEqual(job['status'], 'running')
+
+        self.db.record_step(src, 'uploaded')
+        self.db.record_step(src, 'linked', 'http://link')
+        job = self.db.get_job(src)
+        self.assertEqual(job['step'], 'linked')
+        self.assertEqual(job['link'], 'http://link')
+        self.assertEqual(self.db.get_resumable_jobs(), [str(src.resolve())])
+
+        self.db.record_step(src, 'artifacts')
+        self.assertEqual(self.db.get_job(src)['status'], 'done')
+        self.assertEqual(self.db.get_resumable_jobs(), [])
+
+        # A finished job starts over instead of resuming
+        job = self.db.start_job(src)
+        self.assertIsNone(job['step'])
+        self.assertIsNone(job['link'])
+
+    def test_job_retry_backoff(self):
+        src = Path("/source/video.mkv")
+        self.db.start_job(src)
+
+        self.db.record_failure(src, "upload failed", max_attempts=3, base_delay=60)
+        job = self.db.get_job(src)
+        self.assertEqual(job['status'], 'retry')
+        self.assertEqual(job['attempts'], 1)
+        first_retry = datetime.fromisoformat(job['next_retry_at'])
+
+        # Not due yet, due after the backoff
+        self.assertEqual(self.db.get_due_retries(), [])
+        self.assertEqual(self.db.get_due_retries(now=first_retry + timedelta(seconds=1)), [str(src.resolve())])
+
+        self.db.record_failure(src, "upload failed", max_attempts=3, base_delay=60)
+        second_retry = datetime.fromisoformat(self.db.get_job(src)['next_retry_at'])
+        self.assertGreater(second_retry - datetime.now(), timedelta(seconds=110))
+
+        self.db.record_failure(src, "upload failed", max_attempts=3, base_delay=60)
+        job = self.db.get_job(src)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIsNone(job['next_retry_at'])
+
+    def test_media_info_cache(self):
+        self.assertIsNone(self.db.get_media_info("100:abc"))
+        self.db.put_media_info("100:abc", {'duration': 12.5, 'video': [{'codec': 'h264'}]})
+        self.assertEqual(self.db.get_media_info("100:abc")['video'][0]['codec'], 'h264')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+import time
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import jellyfin_notifier
+from jellyfin_notifier import JellyfinNotifier, start_notifier, stop_notifier, notify_changed
+from benchmarks.stubs import jellyfin_stub
+
+class TestJellyfinNotifier(unittest.TestCase):
+    def test_collapse_nested_folders(self):
+        pending = {
+            "/lib/Anime/Show/Season 01": "Modified",
+            "/lib/Anime/Show": "Modified",
+            "/lib/Anime/Other/Season 02": "Modified",
+            "/lib/Anime/Show 2": "Modified",
+        }
+        self.assertEqual(sorted(JellyfinNotifier.collapse(pending)), [
+            "/lib/Anime/Other/Season 02", "/lib/Anime/Show", "/lib/Anime/Show 2",
+        ])
+
+    def test_flush_batches_and_maps_paths(self):
+        with jellyfin_stub() as srv:
+            notifier = JellyfinNotifier(srv.url, "key", batch_size=2, path_map={"D:\\Library": "/media"})
+            for i in range(3):
+                notifier.touch(f"D:\\Library\\Anime\\Show {i}\\Season 01")
+                notifier.touch(f"D:\\Library\\Anime\\Show {i}\\Season 01")
+
+            self.assertEqual(notifier.flush(), 3)
+            self.assertEqual(notifier.flush(), 0)
+            notifier.close()
+            updates = srv.state['updates']
+
+        self.assertEqual([len(batch) for batch in updates], [2, 1])
+        self.assertEqual(updates[0][0], {"Path": "/media/Anime/Show 0/Season 01", "UpdateType": "Modified"})
+
+    def test_debounced_flush_and_module_hooks(self):
+        with jellyfin_stub() as srv:
+            start_notifier({'jellyfin': {'url': srv.url, 'api_key': 'key', 'debounce': 0.1}})
+            try:
+                notify_changed("/lib/Anime/A")
+                notify_changed("/lib/Anime/B")
+                deadline = time.time() + 2
+                while not srv.state.get('updates') and time.time() < deadline:
+                    time.sleep(0.02)
+                self.assertEqual(len(srv.state['updates']), 1)
+                self.assertEqual(len(srv.state['updates'][0]), 2)
+            finally:
+                stop_notifier()
+        self.assertIsNone(jellyfin_notifier._notifier)
+        # Not configured: hooks are no-ops
+        self.assertIsNone(start_notifier({}))
+        notify_changed("/lib/Anime/C")
+
+if __name__ == '__main__':
+    unittest.main()
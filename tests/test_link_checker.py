@@ -0,0 +1,87 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import main as main_module
+from database import VideoMappingDB
+from seafile_client import SeafileClient
+from async_net import AsyncNetEngine
+from targets import Target, TargetRouter
+from link_checker import classify, LINK_OK, LINK_BROKEN, LINK_ERROR, LINK_RELINKED
+from benchmarks.stubs import seafile_stub
+
+class TestLinkChecker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local_root = self.root / "local"
+        self.library = self.root / "library"
+        self.local_root.mkdir()
+        self.library.mkdir()
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.engine = AsyncNetEngine(per_host_limit=4)
+        self.config = {
+            'local': {'root_path': str(self.local_root), 'library_path': str(self.library)},
+            'rclone': {'remote_root': '/Bangumi'},
+            'links': {'check_fraction': 1.0},
+        }
+
+    def tearDown(self):
+        self.engine.close()
+        self.tmp.cleanup()
+
+    def _mapped(self, client, name):
+        source = self.local_root / name
+        strm = self.library / f"{Path(name).stem}.strm"
+        link = client.get_share_link(f"/Bangumi/{name}")
+        strm.write_text(main_module.build_strm_content(link, strm.stem, ".mkv"), encoding='utf-8')
+        self.db.upsert_mapping(source, strm, link, target="default")
+        return source, strm, link
+
+    def test_classify(self):
+        self.assertEqual(classify(206), LINK_OK)
+        self.assertEqual(classify(404), LINK_BROKEN)
+        self.assertEqual(classify(503), LINK_ERROR)
+        self.assertEqual(classify(None), LINK_ERROR)
+
+    def test_check_links_relinks_broken(self):
+        with seafile_stub() as srv:
+            client = SeafileClient(srv.url, "token", "repo")
+            router = TargetRouter([Target("default", MagicMock(), client, "/Bangumi")], self.db)
+            _, _, good_link = self._mapped(client, "good.mkv")
+            source, strm, old_link = self._mapped(client, "revoked.mkv")
+            del srv.state['links']["/Bangumi/revoked.mkv"]
+
+            counts = main_module.check_links(self.config, self.db, router, self.engine)
+
+        self.assertEqual(counts, {LINK_OK: 1, LINK_RELINKED: 1})
+        new_link = self.db.get_mapping(source)['seafile_url']
+        self.assertNotEqual(new_link, old_link)
+        self.assertTrue(strm.read_text(encoding='utf-8').startswith(f"{new_link}?dl=1#"))
+
+    def test_check_links_samples_oldest_first(self):
+        with seafile_stub() as srv:
+            client = SeafileClient(srv.url, "token", "repo")
+            router = TargetRouter([Target("default", MagicMock(), client, "/Bangumi")], self.db)
+            for i in range(4):
+                self._mapped(client, f"ep{i}.mkv")
+            self.config['links']['check_fraction'] = 0.5
+
+            first = main_module.check_links(self.config, self.db, router, self.engine)
+            checked_first = {r['source_path'] for r in self.db.iter_mappings() if r['link_checked_at']}
+            second = main_module.check_links(self.config, self.db, router, self.engine)
+
+        self.assertEqual(first, {LINK_OK: 2})
+        self.assertEqual(second, {LINK_OK: 2})
+        self.assertEqual(len(checked_first), 2)
+        self.assertTrue(all(r['link_status'] == LINK_OK for r in self.db.iter_mappings()))
+
+if __name__ == '__main__':
+    unittest.main()
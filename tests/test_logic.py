@@ -3,11 +3,18 @@ from pathlib import Path
 from unittest.mock import MagicMock, patch
 import os
 import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
 
 # Ensure src is in path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 import main as main_module
+import trickplay
+from database import VideoMappingDB
 
 class TestPathLogic(unittest.TestCase):
     def setUp(self):
@@ -30,6 +37,8 @@ class TestPathLogic(unittest.TestCase):
         self.anilist_mock = MagicMock()
         self.anilist_mock.search_anime.return_value = None
         self.db_mock = MagicMock()
+        self.db_mock.get_remote_file.return_value = None
+        self.db_mock.start_job.return_value = {'step': None, 'link': None, 'attempts': 0}
 
     @patch('main.generate_thumbnail')
     @patch('main.parse_filename')
@@ -107,5 +116,206 @@ class TestPathLogic(unittest.TestCase):
         self.assertEqual(input_arg, file_path)
         self.assertEqual(output_arg, Path('/local/library/Anime/Movie/Season 01/Movie.jpg'))
 
+    @patch('main.generate_thumbnail')
+    @patch('main.parse_filename')
+    @patch('pathlib.Path.stat')
+    @patch('pathlib.Path.mkdir')
+    @patch('pathlib.Path.iterdir')
+    @patch('builtins.open', new_callable=unittest.mock.mock_open)
+    def test_cached_remote_skips_upload(self, mock_open, mock_iterdir, mock_mkdir, mock_stat, mock_parse, mock_gen_thumb):
+        file_path = Path('/local/root/Anime/Show/file.mkv')
+        mock_iterdir.return_value = []
+        mock_stat.return_value = MagicMock(st_size=1234)
+        mock_parse.return_value = {
+            'full_name': 'Show - S01E01',
+            'title': 'Show',
+            'season': '01',
+            'episode': '01',
+            'original_name': 'file.mkv'
+        }
+        self.db_mock.get_remote_file.return_value = {
+            'size': 1234, 'mod_time': None, 'checked_at': datetime.now()
+        }
+
+        main_module.process_file(file_path, self.config, self.seafile_mock, self.rclone_mock, self.anilist_mock, self.db_mock)
+
+        self.db_mock.get_remote_file.assert_called_once_with('RemoteVideos/Anime/Show/file.mkv', '')
+        self.rclone_mock.upload.assert_not_called()
+        self.seafile_mock.get_share_link.assert_called_once()
+
+    @patch('main.generate_thumbnail')
+    @patch('main.parse_filename')
+    @patch('pathlib.Path.stat')
+    @patch('pathlib.Path.mkdir')
+    @patch('pathlib.Path.iterdir')
+    @patch('builtins.open', new_callable=unittest.mock.mock_open)
+    def test_partial_remote_copy_is_replaced(self, mock_open, mock_iterdir, mock_mkdir, mock_stat, mock_parse, mock_gen_thumb):
+        file_path = Path('/local/root/Anime/Show/file.mkv')
+        mock_iterdir.return_value = []
+        mock_stat.return_value = MagicMock(st_size=1234, st_mtime=0)
+        mock_parse.return_value = {
+            'full_name': 'Show - S01E01', 'title': 'Show', 'season': '01', 'episode': '01', 'original_name': 'file.mkv'
+        }
+        self.db_mock.get_remote_file.return_value = {
+            'size': 100, 'mod_time': None, 'checked_at': datetime.now()
+        }
+
+        main_module.process_file(file_path, self.config, self.seafile_mock, self.rclone_mock, self.anilist_mock, self.db_mock)
+
+        self.rclone_mock.upload.assert_called_once_with(file_path, 'RemoteVideos/Anime/Show', replace=True)
+
+    def test_is_uploaded_stale_entry(self):
+        self.db_mock.get_remote_file.return_value = {
+            'size': 1234, 'mod_time': None, 'checked_at': datetime.now() - timedelta(hours=48)
+        }
+
+        self.assertFalse(main_module.is_uploaded(self.db_mock, self.config, 'RemoteVideos/x.mkv', Path('/local/root/x.mkv')))
+
+    @patch('main.generate_thumbnail')
+    @patch('main.parse_filename')
+    @patch('pathlib.Path.mkdir')
+    @patch('pathlib.Path.iterdir')
+    @patch('builtins.open', new_callable=unittest.mock.mock_open)
+    def test_upload_failure_is_journaled(self, mock_open, mock_iterdir, mock_mkdir, mock_parse, mock_gen_thumb):
+        file_path = Path('/local/root/Anime/Show/file.mkv')
+        mock_parse.return_value = {
+            'full_name': 'Show - S01E01', 'title': 'Show', 'season': '01', 'episode': '01', 'original_name': 'file.mkv'
+        }
+        self.rclone_mock.upload.return_value = False
+
+        main_module.process_file(file_path, self.config, self.seafile_mock, self.rclone_mock, self.anilist_mock, self.db_mock)
+
+        self.db_mock.record_failure.assert_called_once()
+        self.assertTrue(self.db_mock.record_failure.call_args[1]['transient'])
+        self.seafile_mock.get_share_link.assert_not_called()
+
+    @patch('main.generate_thumbnail')
+    @patch('main.parse_filename')
+    @patch('pathlib.Path.mkdir')
+    @patch('pathlib.Path.iterdir')
+    @patch('builtins.open', new_callable=unittest.mock.mock_open)
+    def test_resume_after_linked_step(self, mock_open, mock_iterdir, mock_mkdir, mock_parse, mock_gen_thumb):
+        file_path = Path('/local/root/Anime/Show/file.mkv')
+        mock_iterdir.return_value = []
+        mock_parse.return_value = {
+            'full_name': 'Show - S01E01', 'title': 'Show', 'season': '01', 'episode': '01', 'original_name': 'file.mkv'
+        }
+        self.db_mock.start_job.return_value = {'step': 'linked', 'link': 'http://seafile/old', 'attempts': 0}
+
+        main_module.process_file(file_path, self.config, self.seafile_mock, self.rclone_mock, self.anilist_mock, self.db_mock)
+
+        self.rclone_mock.upload.assert_not_called()
+        self.seafile_mock.get_share_link.assert_not_called()
+        args, _ = self.db_mock.upsert_mapping.call_args
+        self.assertEqual(args[2], 'http://seafile/old')
+        self.db_mock.record_step.assert_called_with(file_path, 'artifacts', None)
+
+class TestJournalWithDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local_root = self.root / "local"
+        self.config = {
+            'local': {'root_path': str(self.local_root), 'library_path': str(self.root / "library")},
+            'rclone': {'remote_root': '/Bangumi'},
+        }
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.rclone = MagicMock()
+        self.rclone.upload.return_value = True
+        self.seafile = MagicMock()
+        self.seafile.get_share_link.return_value = "http://seafile/link"
+        self.anilist = MagicMock()
+        self.anilist.search_anime.return_value = None
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch('main.media_info', return_value=None)
+    @patch('main.generate_thumbnail')
+    def test_finished_job_uploads_again_when_remote_copy_is_gone(self, mock_thumb, mock_media):
+        video = self.local_root / "Show" / "[Grp] Show - 01.mkv"
+        video.parent.mkdir(parents=True)
+        video.write_bytes(b"x" * 100)
+
+        main_module.process_file(video, self.config, self.seafile, self.rclone, self.anilist, self.db)
+        self.assertEqual(self.db.get_job(video)['status'], 'done')
+
+        # The remote copy was deleted; --sync re-processes the file without skip_upload
+        self.db.replace_remote_files([])
+        main_module.process_file(video, self.config, self.seafile, self.rclone, self.anilist, self.db)
+
+        self.assertEqual(self.rclone.upload.call_count, 2)
+        self.assertEqual(self.db.get_job(video)['status'], 'done')
+
+    @patch('main.media_info', return_value={'duration': 60, 'video': [{'codec': 'h264'}], 'audio': [], 'subtitle': []})
+    @patch('main.generate_thumbnail')
+    def test_delete_after_upload_waits_for_trickplay(self, mock_thumb, mock_media):
+        video = self.local_root / "Show" / "[Grp] Show - 01.mkv"
+        video.parent.mkdir(parents=True)
+        video.write_bytes(b"x" * 100)
+        self.config['local']['delete_after_upload'] = True
+        seen = []
+        release = threading.Event()
+
+        def generate(input_path, output_dir, on_done=None):
+            release.wait(5)
+            seen.append(input_path.exists())
+            return False
+
+        trickplay.start_trickplay({'trickplay': {'enabled': True}})
+        try:
+            with patch.object(trickplay.TrickplayGenerator, 'generate', side_effect=generate):
+                main_module.process_file(video, self.config, self.seafile, self.rclone, self.anilist, self.db)
+                self.assertTrue(video.exists())
+                release.set()
+                trickplay.stop_trickplay()
+        finally:
+            release.set()
+            trickplay.stop_trickplay()
+
+        self.assertEqual(seen, [True])
+        self.assertFalse(video.exists())
+
+    @patch('main.media_info', return_value={'duration': 1420, 'video': [], 'audio': [{'codec': 'aac', 'language': 'jpn', 'channels': 2}], 'subtitle': []})
+    @patch('main.generate_thumbnail')
+    def test_episode_nfo_without_anilist_match(self, mock_thumb, mock_media):
+        video = self.local_root / "Show" / "[Grp] Show - 01.mkv"
+        video.parent.mkdir(parents=True)
+        video.write_bytes(b"x" * 100)
+
+        main_module.process_file(video, self.config, self.seafile, self.rclone, self.anilist, self.db)
+
+        nfo = Path(self.db.get_mapping(video)['strm_path']).with_suffix('.nfo')
+        root = ET.parse(nfo).getroot()
+        self.assertEqual(root.findtext('showtitle'), 'Show')
+        self.assertEqual(root.findtext('runtime'), '24')
+        self.assertEqual(root.findtext('fileinfo/streamdetails/audio/codec'), 'aac')
+
+    def test_series_artwork_written_once_by_concurrent_workers(self):
+        series_dir = self.root / "library" / "Anime" / "Show"
+        series_dir.mkdir(parents=True)
+        url = "http://img/cover.jpg"
+        self.db.put_image(url, b"jpeg" * 1000)
+        anilist_meta = {'title': {'english': 'Show', 'romaji': 'Show'}, 'coverImage': {'large': url}}
+        written = []
+
+        def slow_nfo(meta, output_dir):
+            time.sleep(0.05)
+            written.append(output_dir)
+            (output_dir / "tvshow.nfo").write_text("<tvshow/>")
+
+        with patch('main.generate_tvshow_nfo', side_effect=slow_nfo), patch('main.write_cover', wraps=main_module.write_cover) as cover:
+            workers = [threading.Thread(target=main_module.series_artwork, args=(self.db, anilist_meta, series_dir))
+                       for _ in range(6)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        self.assertEqual(written, [series_dir])
+        self.assertEqual(cover.call_count, 1)
+        self.assertEqual((series_dir / "poster.jpg").read_bytes(), b"jpeg" * 1000)
+        self.assertEqual(list(series_dir.glob("*.tmp")) + list(series_dir.glob(".*.tmp")), [])
+
 if __name__ == '__main__':
     unittest.main()
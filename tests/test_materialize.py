@@ -0,0 +1,70 @@
+import unittest
+import tempfile
+import errno
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import materialize as materialize_module
+from materialize import materialize, materialize_mode, MODE_AUTO, MODE_HARDLINK, MODE_REFLINK, MODE_COPY
+
+class TestMaterialize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.src = self.root / "ep01.ass"
+        self.src.write_text("subtitle")
+        self.dest = self.root / "lib" / "Show - S01E01.ass"
+        self.dest.parent.mkdir()
+        materialize_module._unsupported.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hardlink_preferred_on_same_device(self):
+        self.assertEqual(materialize(self.src, self.dest), MODE_HARDLINK)
+        self.assertTrue(os.path.samefile(self.src, self.dest))
+        # Already linked: nothing to do
+        self.assertEqual(materialize(self.src, self.dest), MODE_HARDLINK)
+
+    def test_copy_mode_and_replace(self):
+        self.dest.write_text("stale")
+        self.assertEqual(materialize(self.src, self.dest, MODE_COPY), MODE_COPY)
+        self.assertFalse(os.path.samefile(self.src, self.dest))
+        self.assertEqual(self.dest.read_text(), "subtitle")
+
+    def test_cross_device_copies(self):
+        devices = {str(self.src): 1, str(self.dest.parent): 2}
+        with patch.object(materialize_module, '_device', side_effect=lambda p: devices.get(str(p))), \
+             patch('os.link', side_effect=AssertionError("link across devices")):
+            self.assertEqual(materialize(self.src, self.dest), MODE_COPY)
+        self.assertEqual(self.dest.read_text(), "subtitle")
+
+    def test_unsupported_link_falls_back_once(self):
+        link_error = OSError(errno.EPERM, "hardlinks not permitted")
+        with patch('os.link', side_effect=link_error) as mock_link, \
+             patch.object(materialize_module, '_reflink', side_effect=OSError(errno.EOPNOTSUPP, "no reflink")) as mock_reflink:
+            self.assertEqual(materialize(self.src, self.dest, MODE_AUTO), MODE_COPY)
+            other = self.root / "lib" / "other.ass"
+            self.assertEqual(materialize(self.src, other, MODE_AUTO), MODE_COPY)
+        # The device is remembered as unsupported
+        self.assertEqual(mock_link.call_count, 1)
+        self.assertEqual(mock_reflink.call_count, 1)
+
+    def test_real_errors_are_raised(self):
+        with patch('os.link', side_effect=OSError(errno.EIO, "I/O error")):
+            with self.assertRaises(OSError):
+                materialize(self.src, self.dest, MODE_HARDLINK)
+
+    def test_mode_from_config(self):
+        config = {'materialize': {'subtitles': MODE_REFLINK, 'artwork': 'bogus'}}
+        self.assertEqual(materialize_mode(config, 'subtitles'), MODE_REFLINK)
+        self.assertEqual(materialize_mode(config, 'artwork'), MODE_AUTO)
+        self.assertEqual(materialize_mode({}, 'migration'), MODE_AUTO)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(prefix="test")
+
+    def test_summary_percentiles(self):
+        for value in (0.1, 0.2, 0.3, 0.4, 1.0):
+            self.registry.observe('stage_seconds', value, stage='upload')
+        self.registry.inc('seafile_requests_total', method='POST')
+        self.registry.inc('seafile_requests_total', method='POST')
+
+        summary = self.registry.summary()
+        upload = summary['histograms']['stage_seconds'][0]
+
+        self.assertEqual(upload['labels'], {'stage': 'upload'})
+        self.assertEqual(upload['count'], 5)
+        self.assertAlmostEqual(upload['p50'], 0.3)
+        self.assertAlmostEqual(upload['p95'], 1.0)
+        self.assertEqual(summary['counters']['seafile_requests_total'][0]['value'], 2)
+
+    def test_timer_records_sample(self):
+        with self.registry.timer('stage_seconds', stage='parse'):
+            pass
+        self.assertEqual(self.registry.summary()['histograms']['stage_seconds'][0]['count'], 1)
+
+    def test_prometheus_textfile(self):
+        self.registry.observe('stage_seconds', 0.02, stage='link')
+        self.registry.inc('rclone_upload_bytes_total', 2048)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "njubox.prom")
+            self.registry.write_prometheus(path)
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            self.registry.write_json(os.path.join(tmp, "metrics.json"))
+            with open(os.path.join(tmp, "metrics.json"), encoding='utf-8') as f:
+                self.assertIn('histograms', json.load(f))
+
+        self.assertIn('# TYPE test_stage_seconds histogram', text)
+        self.assertIn('test_stage_seconds_bucket{stage="link",le="0.025"} 1', text)
+        self.assertIn('test_stage_seconds_bucket{stage="link",le="0.01"} 0', text)
+        self.assertIn('test_stage_seconds_count{stage="link"} 1', text)
+        self.assertIn('test_rclone_upload_bytes_total 2048', text)
+
+if __name__ == '__main__':
+    unittest.main()
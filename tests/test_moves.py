@@ -0,0 +1,104 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main as main_module
+from database import VideoMappingDB
+from moves import file_fingerprint, find_moved_source
+
+class TestMoves(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local_root = self.root / "local"
+        self.local_root.mkdir()
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _mapped(self, rel, content=b"video" * 1000, link="http://l/old"):
+        path = self.local_root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        self.db.upsert_mapping(path, self.root / f"{path.stem}.strm", link, target="default",
+                               size=len(content), fingerprint=file_fingerprint(path))
+        return path
+
+    def test_fingerprint_tracks_content_not_name(self):
+        a = self.root / "a.mkv"
+        b = self.root / "b.mkv"
+        a.write_bytes(b"1" * 300000)
+        b.write_bytes(b"1" * 300000)
+        self.assertEqual(file_fingerprint(a), file_fingerprint(b))
+        b.write_bytes(b"1" * 150000 + b"2" + b"1" * 149999)
+        self.assertNotEqual(file_fingerprint(a), file_fingerprint(b))
+        self.assertIsNone(file_fingerprint(self.root / "missing.mkv"))
+
+    def test_find_moved_source_requires_vanished_original(self):
+        old = self._mapped("Show/ep01.mkv")
+        new = self.local_root / "Show S1/ep01.mkv"
+        new.parent.mkdir()
+        new.write_bytes(old.read_bytes())
+        fingerprint = file_fingerprint(new)
+
+        # Original still there: a copy, not a move
+        self.assertIsNone(find_moved_source(self.db, new, fingerprint))
+
+        old.unlink()
+        moved = find_moved_source(self.db, new, fingerprint)
+        self.assertEqual(moved['source_path'], str(old.resolve()))
+
+        # An evicted original is missing on purpose
+        self.db.mark_evicted(str(old.resolve()))
+        self.assertIsNone(find_moved_source(self.db, new, fingerprint))
+
+    def test_follow_move_renames_remote_and_rekeys(self):
+        old = self._mapped("Show/ep01.mkv")
+        mapping_id = self.db.get_mapping(old)['id']
+        self.db.upsert_remote_file("/Bangumi/Show/ep01.mkv", old.stat().st_size, target="default")
+        new = self.local_root / "Show S1/ep01.mkv"
+        new.parent.mkdir()
+        old.rename(new)
+        moved = find_moved_source(self.db, new, file_fingerprint(new))
+
+        rclone = MagicMock()
+        rclone.moveto.return_value = True
+        followed, link = main_module.follow_move(self.db, rclone, moved, new, self.local_root, "/Bangumi",
+                                                 "/Bangumi/Show S1/ep01.mkv", "default")
+
+        self.assertTrue(followed)
+        # Share links are path-based: a moved remote needs a new one
+        self.assertIsNone(link)
+        rclone.moveto.assert_called_once_with("/Bangumi/Show/ep01.mkv", "/Bangumi/Show S1/ep01.mkv")
+        self.assertIsNone(self.db.get_mapping(old))
+        mapping = self.db.get_mapping(new)
+        self.assertEqual(mapping['id'], mapping_id)
+        self.assertEqual(mapping['target'], "default")
+        self.assertIsNone(mapping['seafile_url'])
+        self.assertIsNone(self.db.get_remote_file("/Bangumi/Show/ep01.mkv", "default"))
+        self.assertIsNotNone(self.db.get_remote_file("/Bangumi/Show S1/ep01.mkv", "default"))
+
+    def test_failed_remote_move_falls_back(self):
+        old = self._mapped("Show/ep01.mkv")
+        new = self.local_root / "Show/ep01 renamed.mkv"
+        old.rename(new)
+        moved = find_moved_source(self.db, new, file_fingerprint(new))
+        rclone = MagicMock()
+        rclone.moveto.return_value = False
+
+        followed, _ = main_module.follow_move(self.db, rclone, moved, new, self.local_root, "/Bangumi",
+                                              "/Bangumi/Show/ep01 renamed.mkv", "default")
+
+        self.assertFalse(followed)
+        self.assertIsNone(self.db.get_mapping(new))
+        self.assertIsNotNone(self.db.find_by_fingerprint(file_fingerprint(new)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import tempfile
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main as main_module
+from database import VideoMappingDB
+from moves import file_fingerprint
+from targets import Target, TargetRouter
+from planner import build_plan, estimate_seconds, format_duration, PLAN_UPLOAD, PLAN_RELINK, PLAN_ARTIFACTS, PLAN_SKIP
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local_root = self.root / "local"
+        self.local_root.mkdir()
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.router = TargetRouter([Target("default", MagicMock(), MagicMock(), "/Bangumi")], self.db)
+        self.config = {
+            'local': {'root_path': str(self.local_root), 'library_path': str(self.root / "lib")},
+            'rclone': {'remote_root': '/Bangumi', 'bwlimit': '1M'},
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _file(self, rel, content=b"x" * 100):
+        path = self.local_root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        return path
+
+    def _done(self, path, link="http://l", strm=True, cached=True):
+        strm_path = self.root / f"{path.stem}.strm"
+        if strm:
+            strm_path.write_text("x")
+        self.db.upsert_mapping(path, strm_path, link, target="default", size=path.stat().st_size, fingerprint=file_fingerprint(path))
+        self.db.start_job(path)
+        self.db.record_step(path, 'artifacts', link)
+        if cached:
+            rel = path.relative_to(self.local_root).as_posix()
+            self.db.upsert_remote_file(f"/Bangumi/{rel}", path.stat().st_size, target="default")
+
+    def test_classifies_from_database_and_remote_cache(self):
+        new = self._file("Show/[Grp] Show - 01.mkv")
+        cached = self._file("Show/[Grp] Show - 02.mkv")
+        self.db.upsert_remote_file("/Bangumi/Show/[Grp] Show - 02.mkv", 100, target="default")
+        stale_size = self._file("Show/[Grp] Show - 03.mkv")
+        self.db.upsert_remote_file("/Bangumi/Show/[Grp] Show - 03.mkv", 50, target="default")
+        no_strm = self._file("Show/[Grp] Show - 04.mkv")
+        self._done(no_strm, strm=False)
+        done = self._file("Other/[Grp] Other - 01.mkv")
+        self._done(done)
+
+        interrupted = self._file("Show/[Grp] Show - 05.mkv")
+        self.db.upsert_remote_file("/Bangumi/Show/[Grp] Show - 05.mkv", 100, target="default")
+        self.db.start_job(interrupted)
+        self.db.record_step(interrupted, 'linked', "http://l")
+
+        plan = build_plan([new, cached, stale_size, no_strm, interrupted, done], self.db, self.config, False, self.router)
+
+        kinds = {f.path.name: f.kind for f in plan.files}
+        self.assertEqual(kinds, {
+            new.name: PLAN_UPLOAD, cached.name: PLAN_RELINK, stale_size.name: PLAN_UPLOAD,
+            no_strm.name: PLAN_RELINK, interrupted.name: PLAN_ARTIFACTS, done.name: PLAN_RELINK,
+        })
+        self.assertEqual(plan.total_bytes(PLAN_UPLOAD), 200)
+        calls = plan.api_calls()
+        self.assertEqual(calls['rclone_uploads'], 2)
+        # A finished job's link is requested again, like on a real re-run
+        self.assertEqual(calls['seafile_share_links'], 5)
+        self.assertEqual(calls['anilist_searches'], 2)
+
+        lazy = build_plan([new, cached, no_strm, done], self.db, self.config, True, self.router)
+        self.assertEqual([f.kind for f in lazy.files], [PLAN_UPLOAD, PLAN_ARTIFACTS, PLAN_ARTIFACTS, PLAN_SKIP])
+        self.assertEqual(lazy.api_calls()['seafile_share_links'], 0)
+        # One search per distinct title among files with work left
+        self.assertEqual(lazy.api_calls()['anilist_searches'], 1)
+
+    def test_finished_job_follows_remote_cache(self):
+        gone = self._file("Show/[Grp] Show - 01.mkv")
+        self._done(gone, cached=False)
+        stale = self._file("Show/[Grp] Show - 02.mkv")
+        self._done(stale)
+        self.db.upsert_remote_file("/Bangumi/Show/[Grp] Show - 02.mkv", 40, target="default")
+
+        plan = build_plan([gone, stale], self.db, self.config, False, self.router)
+
+        self.assertEqual([f.kind for f in plan.files], [PLAN_UPLOAD, PLAN_UPLOAD])
+        self.assertEqual(plan.api_calls()['rclone_uploads'], 2)
+        self.assertEqual(plan.api_calls()['seafile_share_links'], 2)
+
+    def test_moved_file_needs_no_upload(self):
+        old = self._file("Show/ep01.mkv", b"video" * 1000)
+        self._done(old)
+        new = self._file("Show S1/ep01.mkv", old.read_bytes())
+        old.unlink()
+
+        plan = build_plan([new], self.db, self.config, False, self.router)
+
+        self.assertEqual(plan.files[0].kind, PLAN_RELINK)
+        self.assertTrue(plan.files[0].moved)
+        self.assertEqual(plan.api_calls()['rclone_moves'], 1)
+
+    def test_plan_writes_nothing(self):
+        self._file("Show/ep01.mkv")
+        before = sorted(p for p in self.root.rglob('*'))
+
+        plan = main_module.plan_paths(self.config, self.db, self.router, ('.mkv',), [])
+
+        self.assertEqual(len(plan.files), 1)
+        self.assertEqual(sorted(p for p in self.root.rglob('*')), before)
+        self.assertIsNone(self.db.get_job(self.local_root / "Show/ep01.mkv"))
+
+    def test_estimate_static_limit_and_history(self):
+        rclone_conf = {'bwlimit': '1M'}
+        self.assertEqual(estimate_seconds(10 * 2**20, rclone_conf), 10)
+        # Historical throughput below the limit is what bounds the transfer
+        self.assertEqual(estimate_seconds(10 * 2**20, rclone_conf, throughput=2**18, concurrency=2), 20)
+        self.assertEqual(estimate_seconds(10 * 2**20, {'bwlimit': 'off'}, throughput=2**20), 10)
+        self.assertIsNone(estimate_seconds(10, {'bwlimit': 'off'}))
+        self.assertEqual(estimate_seconds(0, {}), 0)
+
+    def test_estimate_follows_timetable(self):
+        rclone_conf = {'bwlimit_schedule': {'08:00': '1k', '23:00': '2k'}}
+        start = datetime(2024, 1, 1, 22, 0)
+        # 1h at 1k, then the rest at 2k
+        self.assertEqual(estimate_seconds(3600 * 1024 + 2048 * 10, rclone_conf, start=start), 3610)
+        # Before 08:00 the previous day's last entry applies
+        self.assertEqual(estimate_seconds(2048, rclone_conf, start=datetime(2024, 1, 1, 3, 0)), 1)
+        self.assertIsNone(estimate_seconds(10, {'bwlimit_schedule': {'08:00': 'off'}}, start=start))
+
+    def test_throughput_history(self):
+        self.assertIsNone(self.db.get_throughput())
+        self.db.record_transfer("default", 100, 2.0)
+        self.db.record_transfer("default", 300, 2.0)
+        self.assertEqual(self.db.get_throughput(), 100)
+        self.assertEqual(self.db.get_throughput(limit=1), 150)
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(3725), "01:02:05")
+        self.assertEqual(format_duration(90061), "1d 01:01:01")
+        self.assertEqual(format_duration(None), "unknown")
+
+if __name__ == '__main__':
+    unittest.main()
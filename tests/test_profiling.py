@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import profiling
+
+def busy_work():
+    deadline = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+class TestProfiling(unittest.TestCase):
+    def test_profile_run_writes_pstats_and_collapsed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertLogs(level='INFO'):
+                with profiling.profile_run(tmp, interval=0.001):
+                    busy_work()
+
+            files = sorted(os.listdir(tmp))
+            self.assertEqual(len(files), 2)
+            self.assertTrue(files[0].endswith('.collapsed'))
+            self.assertTrue(files[1].endswith('.pstats'))
+
+            with open(Path(tmp) / files[0], encoding='utf-8') as f:
+                collapsed = f.read()
+        self.assertIn('busy_work', collapsed)
+        # "frame;frame;frame count"
+        self.assertTrue(collapsed.splitlines()[0].rsplit(' ', 1)[1].isdigit())
+
+    def test_memory_checkpoints(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertLogs(level='INFO') as log:
+                profiling.start_memory_trace(tmp)
+                data = [bytes(1024) for _ in range(1000)]
+                profiling.memory_checkpoint("allocated")
+                profiling.stop_memory_trace()
+
+            reports = os.listdir(tmp)
+            self.assertEqual(len(reports), 1)
+        self.assertTrue(any("Memory [allocated]" in line for line in log.output))
+        self.assertEqual(len(data), 1000)
+
+    def test_checkpoint_noop_when_disabled(self):
+        profiling.memory_checkpoint("ignored")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -31,6 +31,11 @@ class TestRcloneWrapper(unittest.TestCase):
         self.assertIn("MyRemote:/remote/dir", args)
         self.assertIn("--bwlimit", args)
         self.assertIn("10M", args)
+        self.assertIn("--ignore-existing", args)
+
+        # A stale remote copy is overwritten
+        wrapper.upload("/path/to/file", "/remote/dir", replace=True)
+        self.assertNotIn("--ignore-existing", mock_run.call_args[0][0])
 
     @patch('subprocess.run')
     def test_upload_failure(self, mock_run):
@@ -47,3 +52,24 @@ class TestRcloneWrapper(unittest.TestCase):
 
         # Assert
         self.assertFalse(result)
+
+    @patch('subprocess.run')
+    def test_list_remote(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0, stdout='[{"Path": "A/ep1.mkv", "Size": 10, "IsDir": false}]')
+
+        wrapper = RcloneWrapper("MyRemote")
+        listing = wrapper.list_remote("/Bangumi", fast_list=True)
+
+        self.assertEqual(listing[0]['Path'], "A/ep1.mkv")
+        args = mock_run.call_args[0][0]
+        self.assertEqual(args[:3], ["rclone", "lsjson", "MyRemote:/Bangumi"])
+        self.assertIn("--recursive", args)
+        self.assertIn("--fast-list", args)
+
+    @patch('subprocess.run')
+    def test_list_remote_failure(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=3, stdout='', stderr='directory not found')
+
+        wrapper = RcloneWrapper("MyRemote")
+
+        self.assertIsNone(wrapper.list_remote("/Bangumi"))
@@ -0,0 +1,101 @@
+import unittest
+import tempfile
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main as main_module
+from database import VideoMappingDB
+
+ANILIST = {
+    'id': 42,
+    'title': {'english': 'Show Name EN', 'romaji': 'Show Name', 'native': None},
+    'coverImage': {'large': 'https://img/42.jpg'},
+}
+
+class TestRebuildLibrary(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local = self.root / "local"
+        self.library = self.root / "library"
+        self.local.mkdir()
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.config = {'local': {'root_path': str(self.local), 'library_path': str(self.library)}}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _map(self, name, link, anilist=None, strm_name=None, fingerprint=None, info=None, strm=None):
+        source = self.local / name
+        info = info or ({'id': anilist['id'], 'canonical': 'x'} if anilist else {'error': 'Not found'})
+        strm = strm or self.root / "old" / (strm_name or "x.strm")
+        self.db.upsert_mapping(source, strm, link, 'SUCCESS' if anilist else 'FAILED', json.dumps(info), fingerprint=fingerprint)
+        return source
+
+    @patch('requests.get', side_effect=AssertionError("network access"))
+    def test_rebuild_from_database_only(self, mock_get):
+        self.db.put_anilist_meta(ANILIST)
+        self.db.put_image(ANILIST['coverImage']['large'], b"JPEG")
+        self.db.put_media_info("1:abc", {'duration': 1440, 'video': [{'codec': 'h264', 'width': 1920, 'height': 1080}], 'audio': [], 'subtitle': []})
+        ep1 = self._map("[Group] Show Name - 01 [1080p].mkv", "https://box/f/1/", ANILIST, fingerprint="1:abc")
+        self._map("[Group] Show Name - 02 [1080p].mkv", None, ANILIST)
+        self._map("[Group] Other - 05 [1080p].mkv", "https://box/f/5/")
+
+        counts = main_module.rebuild_library(self.config, self.db, workers=4, chunk_size=2)
+
+        self.assertEqual(counts, {'written': 0, 'renamed': 2, 'no_link': 1, 'failed': 0})
+        series = self.library / "Anime" / "Show Name EN"
+        strm = series / "Season 01" / "Show Name - S01E01.strm"
+        self.assertTrue(strm.read_text().startswith("https://box/f/1/"))
+        self.assertEqual((series / "poster.jpg").read_bytes(), b"JPEG")
+        self.assertTrue((series / "tvshow.nfo").exists())
+        self.assertIn("<runtime>24</runtime>", (series / "Season 01" / "Show Name - S01E01.nfo").read_text())
+        self.assertTrue((self.library / "Anime" / "Other" / "Season 01" / "Other - S01E05.strm").exists())
+        # New paths are recorded, a second rebuild just rewrites in place
+        self.assertEqual(self.db.get_mapping(ep1)['strm_path'], strm.resolve())
+        again = main_module.rebuild_library(self.config, self.db)
+        self.assertEqual(again['written'], 2)
+
+    def test_mapping_without_cached_metadata_keeps_its_series(self):
+        # Mapped before the metadata cache existed: AniList matched, but nothing is cached
+        info = {'id': 7, 'title_en': 'Frieren Beyond Journeys End', 'canonical': 'Frieren Beyond Journeys End'}
+        season = self.library / "Anime" / "Frieren Beyond Journeys End" / "Season 01"
+        season.mkdir(parents=True)
+        kept = season / "Sousou no Frieren - S01E01.strm"
+        kept.write_text("old")
+        self._map("[Group] Sousou no Frieren - 01 [1080p].mkv", "https://box/f/1/", info=info, strm=kept)
+        missing = season / "Sousou no Frieren - S01E02.strm"
+        self._map("[Group] Sousou no Frieren - 02 [1080p].mkv", "https://box/f/2/", info=info, strm=missing)
+
+        counts = main_module.rebuild_library(self.config, self.db)
+
+        self.assertEqual(counts, {'written': 2, 'renamed': 0, 'no_link': 0, 'failed': 0})
+        self.assertTrue(kept.read_text().startswith("https://box/f/1/"))
+        self.assertTrue(missing.read_text().startswith("https://box/f/2/"))
+        self.assertFalse((self.library / "Anime" / "Sousou no Frieren").exists())
+
+    @patch('requests.get', side_effect=AssertionError("network access"))
+    def test_rebuild_run_stops_after_rebuild(self, mock_get):
+        self._map("[Grp] Show - 01.mkv", "https://sf/f/1/", strm=self.root / "old" / "a.strm")
+        args = SimpleNamespace(plan=False, prune=False, rebuild_library=True, resume=True, refresh_remote=True,
+                               sync=True, check_links=True, watch=True, tier=True, serve_resolver=False, serve_proxy=False,
+                               paths=[str(self.local)], torrent=[], infohash=[], save_path=None)
+
+        with patch('main.load_targets') as load_targets, patch('main.AniListClient') as anilist, \
+                patch('main.migrate_legacy_library') as migrate, patch('main.process_file') as process, \
+                patch('main.resume_jobs') as resume, patch('main.start_notifier') as notifier:
+            main_module.run(args, self.config, self.db, self.root)
+
+        self.assertTrue(any(self.library.rglob("*.strm")))
+        for mock in (load_targets, anilist, migrate, process, resume, notifier):
+            mock.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
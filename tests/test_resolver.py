@@ -0,0 +1,65 @@
+import unittest
+import tempfile
+import threading
+import os
+import sys
+import requests
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from database import VideoMappingDB
+from seafile_client import SeafileClient
+from targets import Target, TargetRouter
+from resolver import LinkResolver, make_server, resolver_url
+from benchmarks.stubs import seafile_stub
+
+class TestResolver(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local_root = self.root / "local"
+        self.local_root.mkdir()
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resolver_url(self):
+        self.assertEqual(resolver_url("http://nas:8765/", 7, "Show S01E01", ".mkv"), "http://nas:8765/m/7#Show S01E01.mkv")
+
+    def test_lazy_link_creation_and_redirect(self):
+        source = self.local_root / "Show" / "ep1.mkv"
+        self.db.upsert_mapping(source, self.root / "ep1.strm")
+        mapping_id = self.db.get_mapping(source)['id']
+
+        with seafile_stub() as srv:
+            client = SeafileClient(srv.url, "token", "repo")
+            router = TargetRouter([Target("default", MagicMock(), client, "/Bangumi")], self.db)
+            server = make_server(LinkResolver(self.db, router, self.local_root), port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            base = "http://%s:%s" % server.server_address[:2]
+            try:
+                first = requests.get(f"{base}/m/{mapping_id}", allow_redirects=False, timeout=5)
+                second = requests.head(f"{base}/m/{mapping_id}", allow_redirects=False, timeout=5)
+                missing = requests.get(f"{base}/m/999", allow_redirects=False, timeout=5)
+                api_requests = srv.requests
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        link = self.db.get_mapping(source)['seafile_url']
+        self.assertTrue(link.startswith(f"{srv.url}/f/"))
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(first.headers['Location'], f"{link}?dl=1")
+        self.assertEqual(second.headers['Location'], f"{link}?dl=1")
+        self.assertEqual(missing.status_code, 404)
+        # The second request is answered from the resolver cache
+        self.assertEqual(api_requests, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Ensure src and repository root are in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from seafile_uploader import SeafileUploader
+from benchmarks.stubs import seafile_stub
+
+PAYLOAD = bytes(range(256)) * 14  # 3584 bytes: 4 chunks of 1000
+
+class TestSeafileUploader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.stub = seafile_stub().start()
+        self.uploader = SeafileUploader(self.stub.url, "token", "repo", chunk_size=1000, retries=2, retry_delay=0)
+
+    def tearDown(self):
+        self.uploader.close()
+        self.stub.stop()
+        self.tmp.cleanup()
+
+    def _file(self, name, content=PAYLOAD):
+        path = self.root / name
+        path.write_bytes(content)
+        return path
+
+    def test_small_file_single_request(self):
+        path = self._file("ep01.mkv", b"small")
+        self.assertTrue(self.uploader.upload(path, "/Bangumi/Show"))
+        self.assertEqual(self.stub.state['uploads'], {"/Bangumi/Show/ep01.mkv": b"small"})
+        self.assertEqual(self.stub.state['chunks'], [("/Bangumi/Show/ep01.mkv", None)])
+
+    def test_chunked_upload(self):
+        path = self._file("ep01.mkv")
+        self.assertTrue(self.uploader.upload(path, "/Bangumi/Show"))
+        self.assertEqual(self.stub.state['uploads']["/Bangumi/Show/ep01.mkv"], PAYLOAD)
+        self.assertEqual([c for _, c in self.stub.state['chunks']], [
+            "bytes 0-999/3584", "bytes 1000-1999/3584", "bytes 2000-2999/3584", "bytes 3000-3583/3584",
+        ])
+
+    def test_failed_chunk_retried_with_new_link(self):
+        path = self._file("ep01.mkv")
+        self.stub.state['fail_uploads'] = [None, 500, 403]
+        self.assertTrue(self.uploader.upload(path, "/Bangumi/Show"))
+        self.assertEqual(self.stub.state['uploads']["/Bangumi/Show/ep01.mkv"], PAYLOAD)
+        # Only the second chunk went up again
+        self.assertEqual(len(self.stub.state['chunks']), 4)
+
+    def test_resumes_partial_upload_from_server_offset(self):
+        path = self._file("ep01.mkv")
+        self.stub.state['partial'] = {"/Bangumi/Show/ep01.mkv": bytearray(PAYLOAD[:2000])}
+        self.assertTrue(self.uploader.upload(path, "/Bangumi/Show"))
+        self.assertEqual(self.stub.state['uploads']["/Bangumi/Show/ep01.mkv"], PAYLOAD)
+        self.assertEqual([c for _, c in self.stub.state['chunks']], ["bytes 2000-2999/3584", "bytes 3000-3583/3584"])
+
+    def test_gives_up_after_retries(self):
+        path = self._file("ep01.mkv")
+        self.stub.state['fail_uploads'] = [500, 500, 500]
+        with self.assertLogs(level='ERROR'):
+            self.assertFalse(self.uploader.upload(path, "/Bangumi/Show"))
+        self.assertNotIn("/Bangumi/Show/ep01.mkv", self.stub.state.get('uploads', {}))
+
+    def test_existing_file_is_not_uploaded_again(self):
+        self.stub.state['uploads'] = {"/Bangumi/Show/ep01.mkv": PAYLOAD}
+        self.assertTrue(self.uploader.upload(self._file("ep01.mkv"), "/Bangumi/Show"))
+        self.assertNotIn('chunks', self.stub.state)
+
+    def test_replace_overwrites_partial_copy(self):
+        self.stub.state['uploads'] = {"/Bangumi/Show/ep01.mkv": PAYLOAD[:10]}
+        self.assertTrue(self.uploader.upload(self._file("ep01.mkv"), "/Bangumi/Show", replace=True))
+        self.assertEqual(self.stub.state['uploads']["/Bangumi/Show/ep01.mkv"], PAYLOAD)
+
+    def test_parallel_uploads_share_session(self):
+        self.stub.state['upload_delay'] = 0.05
+        uploader = SeafileUploader(self.stub.url, "token", "repo", chunk_size=1000, retry_delay=0, pool_size=4)
+        paths = [self._file(f"ep{i:02}.mkv") for i in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda p: uploader.upload(p, "/Bangumi/Show"), paths))
+        uploader.close()
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(len(self.stub.state['uploads']), 4)
+        self.assertGreater(self.stub.state['peak_inflight'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
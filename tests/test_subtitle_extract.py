@@ -0,0 +1,100 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main as main_module
+from database import VideoMappingDB
+from subtitle_extract import subtitle_targets, font_attachments, extract_embedded, KIND_SUBTITLE, KIND_FONT
+
+MEDIA = {
+    'subtitle': [
+        {'index': 2, 'codec': 'ass', 'language': 'chi'},
+        {'index': 3, 'codec': 'ass', 'language': 'chi'},
+        {'index': 4, 'codec': 'hdmv_pgs_subtitle', 'language': 'jpn'},
+        {'index': 5, 'codec': 'subrip', 'language': None},
+    ],
+    'attachments': [
+        {'index': 6, 'filename': 'FZLTH.ttf', 'mimetype': 'application/x-truetype-font'},
+        {'index': 7, 'filename': 'cover.jpg', 'mimetype': 'image/jpeg'},
+        {'index': 8, 'filename': 'Font.OTF', 'mimetype': 'application/octet-stream'},
+    ],
+}
+
+def fake_ffmpeg(calls):
+    """subprocess.run stand-in writing every output / dumped attachment ffmpeg would."""
+    def run(cmd, cwd=None, **kwargs):
+        calls.append(cmd)
+        for i, arg in enumerate(cmd):
+            if arg == 'copy' or arg.startswith('-dump_attachment'):
+                Path(cmd[i + 1]).write_text("data")
+        return MagicMock(returncode=0, stderr="")
+    return run
+
+class TestSubtitleExtract(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.season = self.root / "Show" / "Season 01"
+        self.season.mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sidecar_names_and_fonts(self):
+        targets = subtitle_targets(MEDIA, "Show - S01E01", self.season)
+        self.assertEqual([(i, p.name) for i, p in targets], [
+            (2, "Show - S01E01.chi.ass"),
+            (3, "Show - S01E01.2.chi.ass"),
+            (5, "Show - S01E01.und.srt"),
+        ])
+        self.assertEqual(font_attachments(MEDIA), [(6, 'FZLTH.ttf'), (8, 'Font.OTF')])
+
+    @patch('shutil.which', return_value='/usr/bin/ffmpeg')
+    def test_extract_once_and_share_fonts(self, mock_which):
+        calls = []
+        font_dir = self.season.parent / ".fonts"
+        with patch('subprocess.run', side_effect=fake_ffmpeg(calls)):
+            written = extract_embedded(Path("ep01.mkv"), MEDIA, "Show - S01E01", self.season, font_dir)
+            self.assertEqual(len(calls), 2) # One pass for subtitles, one for fonts
+            self.assertEqual(sorted(p.name for k, p, _ in written if k == KIND_FONT), ['FZLTH.ttf', 'Font.OTF'])
+            self.assertEqual(len([w for w in written if w[0] == KIND_SUBTITLE]), 3)
+
+            # Re-run: nothing left to extract
+            again = extract_embedded(Path("ep01.mkv"), MEDIA, "Show - S01E01", self.season, font_dir)
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(sorted(map(str, again)), sorted(map(str, written)))
+
+            # Next episode: the series fonts are already cached
+            extract_embedded(Path("ep02.mkv"), MEDIA, "Show - S01E02", self.season, font_dir)
+            self.assertEqual(len(calls), 3)
+            self.assertFalse(any(a.startswith('-dump_attachment') for a in calls[-1]))
+
+    def test_remove_mapping_deletes_subtitle_sidecars(self):
+        db = VideoMappingDB(str(self.root / "test.db"))
+        src = self.root / "ep01.mkv"
+        src.write_text("x")
+        strm = self.season / "Show - S01E01.strm"
+        strm.write_text("http://l")
+        sub = self.season / "Show - S01E01.chi.ass"
+        sub.write_text("sub")
+        font = self.season.parent / ".fonts" / "A.ttf"
+        font.parent.mkdir()
+        font.write_text("font")
+        db.upsert_mapping(src, strm, "http://l")
+        db.record_sidecars(src, [(KIND_SUBTITLE, sub, 2), (KIND_FONT, font, None)])
+        self.assertEqual(len(db.get_sidecars(src)), 2)
+
+        main_module.remove_mapping(db, str(src.resolve()), str(strm))
+
+        self.assertFalse(sub.exists())
+        self.assertTrue(font.exists()) # Shared by the series
+        self.assertEqual(db.get_sidecars(src), [])
+
+if __name__ == '__main__':
+    unittest.main()
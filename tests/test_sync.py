@@ -0,0 +1,84 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sync import scan_local, plan_sync, ACTION_UPLOAD, ACTION_LINK, ACTION_STRM, ACTION_PRUNE
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_local_sorted_and_filtered(self):
+        (self.root / "B").mkdir()
+        (self.root / "B" / "ep2.mkv").write_bytes(b"12")
+        (self.root / "A.mp4").write_bytes(b"1")
+        (self.root / "B" / "ep2.ass").write_bytes(b"sub")
+
+        entries = scan_local(self.root, ('.mkv', '.mp4'))
+
+        self.assertEqual(entries, [("A.mp4", 1), ("B/ep2.mkv", 2)])
+
+    def test_plan_sync(self):
+        strm_exists = self.root / "exists.strm"
+        strm_exists.write_text("x")
+        missing_strm = str(self.root / "missing.strm")
+
+        local = [("a.mkv", 1), ("b.mkv", 1), ("c.mkv", 1), ("d.mkv", 1)]
+        db_rows = [
+            ("c.mkv", {'source_path': 'c', 'strm_path': missing_strm, 'seafile_url': 'http://l/c'}),
+            ("d.mkv", {'source_path': 'd', 'strm_path': str(strm_exists), 'seafile_url': 'http://l/d'}),
+            ("e.mkv", {'source_path': 'e', 'strm_path': missing_strm, 'seafile_url': 'http://l/e'}),
+            ("f.mkv", {'source_path': 'f', 'strm_path': missing_strm, 'seafile_url': 'http://l/f'}),
+        ]
+        remote = [("b.mkv", 1), ("c.mkv", 1), ("d.mkv", 1), ("f.mkv", 1)]
+
+        actions = plan_sync(local, db_rows, remote, self.root)
+        kinds = {a.rel_path: a.kind for a in actions}
+
+        self.assertEqual(kinds, {
+            "a.mkv": ACTION_UPLOAD,   # local only
+            "b.mkv": ACTION_LINK,     # uploaded, never linked
+            "c.mkv": ACTION_STRM,     # strm lost
+            "e.mkv": ACTION_PRUNE,    # gone everywhere
+            "f.mkv": ACTION_STRM,     # offloaded but still remote
+        })
+        self.assertEqual(actions[0].local_path, self.root / "a.mkv")
+
+    def test_plan_sync_lazy_links(self):
+        strm_exists = self.root / "exists.strm"
+        strm_exists.write_text("x")
+        local = [("a.mkv", 1), ("b.mkv", 1)]
+        db_rows = [
+            ("a.mkv", {'source_path': 'a', 'strm_path': str(strm_exists), 'seafile_url': None}),
+            ("c.mkv", {'source_path': 'c', 'strm_path': str(self.root / "c.strm"), 'seafile_url': None}),
+        ]
+        remote = [("a.mkv", 1), ("b.mkv", 1), ("c.mkv", 1)]
+
+        kinds = {a.rel_path: a.kind for a in plan_sync(local, db_rows, remote, self.root, lazy_links=True)}
+
+        # A mapping without a link is complete in resolver mode; unmapped files still need processing
+        self.assertEqual(kinds, {"b.mkv": ACTION_LINK, "c.mkv": ACTION_STRM})
+
+    def test_plan_sync_size_mismatch_reuploads(self):
+        strm_exists = self.root / "exists.strm"
+        strm_exists.write_text("x")
+        local = [("a.mkv", 100), ("b.mkv", 100), ("c.mkv", 100)]
+        db_rows = [(rel, {'source_path': rel, 'strm_path': str(strm_exists), 'seafile_url': 'http://l'}) for rel, _ in local]
+        # a: partial upload, b: complete, c: size not reported by the remote
+        remote = [("a.mkv", 40), ("b.mkv", 100), ("c.mkv", -1)]
+
+        kinds = {a.rel_path: a.kind for a in plan_sync(local, db_rows, remote, self.root)}
+
+        self.assertEqual(kinds, {"a.mkv": ACTION_UPLOAD})
+
+if __name__ == '__main__':
+    unittest.main()
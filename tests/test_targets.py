@@ -0,0 +1,93 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from database import VideoMappingDB
+from targets import Target, TargetRouter, load_targets, POLICY_HASH, POLICY_LEAST_USED
+
+class TestTargets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.targets = [
+            Target("main", MagicMock(), MagicMock(), "/Bangumi"),
+            Target("spare", MagicMock(), MagicMock(), "/Backup"),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _file(self, name, size):
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        return path
+
+    def test_load_targets_legacy_config(self):
+        config = {
+            'rclone': {'remote_name': 'NJUbox', 'remote_root': '/Bangumi'},
+            'seafile': {'host': 'https://box', 'api_token': 't', 'repo_id': 'r'},
+        }
+        targets = load_targets(config, "5M")
+        self.assertEqual([t.name for t in targets], ['default'])
+        self.assertEqual(targets[0].rclone.remote_name, 'NJUbox')
+        self.assertEqual(targets[0].rclone.bwlimit, '5M')
+        self.assertIs(targets[0].uploader, targets[0].rclone)
+
+    def test_load_targets_seafile_backend(self):
+        config = {
+            'rclone': {'remote_name': 'NJUbox', 'remote_root': '/Bangumi'},
+            'seafile': {'host': 'https://box', 'api_token': 't', 'repo_id': 'r'},
+            'upload': {'backend': 'seafile', 'chunk_size_mb': 4, 'concurrency': 2},
+        }
+        uploader = load_targets(config, "5M")[0].uploader
+        self.assertEqual((uploader.repo_id, uploader.bwlimit, uploader.chunk_size), ('r', '5M', 4 * 2**20))
+
+    def test_hash_placement_is_stable_per_series(self):
+        router = TargetRouter(self.targets, self.db)
+        placed = {router.resolve(self.root / f"ep{i}.mkv", Path(f"Show/ep{i}.mkv"), "Show").name for i in range(5)}
+        self.assertEqual(len(placed), 1)
+        # Different series spread over both targets
+        names = {router.resolve(self.root / "x.mkv", Path("x.mkv"), f"Series {i}").name for i in range(50)}
+        self.assertEqual(names, {"main", "spare"})
+
+    def test_least_used_counts_tracked_bytes(self):
+        self.db.upsert_mapping(self.root / "old.mkv", self.root / "old.strm", target="main", size=1000)
+        router = TargetRouter(self.targets, self.db, POLICY_LEAST_USED)
+
+        first = router.resolve(self._file("a.mkv", 600), Path("a.mkv"), "A")
+        second = router.resolve(self._file("b.mkv", 600), Path("b.mkv"), "B")
+
+        self.assertEqual(first.name, "spare")
+        self.assertEqual(second.name, "spare")
+        self.assertEqual(router.resolve(self._file("c.mkv", 1), Path("c.mkv"), "C").name, "main")
+
+    def test_recorded_placement_wins(self):
+        router = TargetRouter(self.targets, self.db, POLICY_LEAST_USED)
+        video = self._file("a.mkv", 1)
+        self.db.upsert_mapping(video, self.root / "a.strm", target="main", size=10 ** 9)
+        self.assertEqual(router.resolve(video, Path("a.mkv"), "A").name, "main")
+
+        other = self._file("b.mkv", 1)
+        self.db.upsert_remote_file("/Backup/Show/b.mkv", 1, target="spare")
+        self.assertEqual(router.resolve(other, Path("Show/b.mkv"), "Show").name, "spare")
+
+    def test_legacy_mapping_stays_on_first_target(self):
+        video = self._file("a.mkv", 1)
+        # Stored before sharding: no target column value
+        self.db.upsert_mapping(video, self.root / "a.strm", size=1)
+        self.assertIsNone(self.db.get_mapping(video)['target'])
+
+        for policy in (POLICY_HASH, POLICY_LEAST_USED):
+            router = TargetRouter(self.targets, self.db, policy)
+            placed = {router.resolve(video, Path("a.mkv"), f"Series {i}").name for i in range(20)}
+            self.assertEqual(placed, {"main"})
+
+if __name__ == '__main__':
+    unittest.main()
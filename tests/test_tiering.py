@@ -0,0 +1,78 @@
+import unittest
+import tempfile
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main as main_module
+from database import VideoMappingDB
+from targets import Target, TargetRouter
+from tiering import collect_candidates, evict
+
+class TestTiering(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.local_root = self.root / "local"
+        self.local_root.mkdir()
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.router = TargetRouter([Target("default", MagicMock(), MagicMock(), "/Bangumi")], self.db)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _file(self, rel, size, uploaded=True, link="http://l", age=0):
+        path = self.local_root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        atime = time.time() - age
+        os.utime(path, (atime, atime))
+        self.db.upsert_mapping(path, self.root / f"{path.stem}.strm", link, target="default", size=size)
+        if uploaded:
+            self.db.upsert_remote_file(f"/Bangumi/{rel}", size, target="default")
+        return path
+
+    def test_candidates_require_confirmed_upload_and_link(self):
+        old = self._file("Show/old.mkv", 10, age=5000)
+        new = self._file("Show/new.mkv", 10, age=10)
+        self._file("Show/not_uploaded.mkv", 10, uploaded=False)
+        self._file("Show/no_link.mkv", 10, link=None)
+        broken = self._file("Show/broken.mkv", 10)
+        self.db.record_link_status(str(broken.resolve()), 'broken')
+        finished = self._file("Done/ep.mkv", 10, age=1)
+
+        candidates = collect_candidates(self.db, self.router, self.local_root, False, [(self.local_root / "Done").resolve()])
+
+        self.assertEqual([Path(c.source_path).name for c in candidates], ["ep.mkv", "old.mkv", "new.mkv"])
+        # Lazy link mode: a mapping without a link is still streamable
+        lazy = collect_candidates(self.db, self.router, self.local_root, True)
+        self.assertIn("no_link.mkv", [Path(c.source_path).name for c in lazy])
+
+    def test_evict_until_watermark_and_prune_keeps_mapping(self):
+        first = self._file("a.mkv", 100, age=300)
+        second = self._file("b.mkv", 100, age=200)
+        candidates = collect_candidates(self.db, self.router, self.local_root, False)
+
+        with patch('tiering.shutil.disk_usage') as usage:
+            usage.return_value = MagicMock(free=1000)
+            count, freed = evict(self.db, candidates, self.local_root, 1050)
+
+        self.assertEqual((count, freed), (1, 100))
+        self.assertFalse(first.exists())
+        self.assertTrue(second.exists())
+
+        main_module.prune_mappings(self.db)
+        self.assertIsNotNone(self.db.get_mapping(first))
+
+        # Re-processing a restored file clears the eviction mark
+        self.db.upsert_mapping(first, self.root / "a.strm")
+        rows = {r['source_path']: r for r in self.db.iter_mappings()}
+        self.assertIsNone(rows[str(first.resolve())]['evicted_at'])
+
+if __name__ == '__main__':
+    unittest.main()
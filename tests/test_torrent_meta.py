@@ -0,0 +1,157 @@
+import unittest
+import tempfile
+import hashlib
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main as main_module
+from database import VideoMappingDB
+from torrent_meta import parse_torrent, read_resume_data, content_files, load_torrent, bdecode_file
+
+def bencode(value) -> bytes:
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(bencode(v) for v in value) + b"e"
+    return b"d" + b"".join(bencode(k) + bencode(value[k]) for k in sorted(value, key=lambda k: k.encode() if isinstance(k, str) else k)) + b"e"
+
+MULTI_INFO = {
+    'name': "[Group] Show",
+    'piece length': 16384,
+    'pieces': b"\x01" * 20 * 50,
+    'files': [
+        {'length': 1000, 'path': ["Show - 01.mkv"]},
+        {'length': 15384, 'path': [".pad", "15384"], 'attr': "p"},
+        {'length': 2000, 'path': ["Show - 02.mkv"]},
+        {'length': 10, 'path': ["Subs", "Show - 01.ass"]},
+    ],
+}
+
+class TestTorrentMeta(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, value):
+        path = self.root / name
+        path.write_bytes(bencode(value))
+        return path
+
+    def test_multi_file_torrent(self):
+        path = self._write("a.torrent", {'announce': "http://t", 'info': MULTI_INFO})
+        info = parse_torrent(path)
+
+        self.assertEqual(info.infohash, hashlib.sha1(bencode(MULTI_INFO)).hexdigest())
+        # Padding files are skipped but keep their index
+        self.assertEqual([(f.index, f.path.as_posix(), f.size) for f in info.files], [
+            (0, "[Group] Show/Show - 01.mkv", 1000),
+            (2, "[Group] Show/Show - 02.mkv", 2000),
+            (3, "[Group] Show/Subs/Show - 01.ass", 10),
+        ])
+        # Piece hashes are streamed through, not kept
+        self.assertIsNone(bdecode_file(path)[b'info'][b'pieces'])
+
+    def test_single_file_and_v2_torrents(self):
+        single = {'name': "Movie.mkv", 'length': 42, 'piece length': 16384, 'pieces': b"\x00" * 20}
+        info = parse_torrent(self._write("s.torrent", {'info': single}))
+        self.assertEqual([(f.index, f.path.as_posix()) for f in info.files], [(0, "Movie.mkv")])
+
+        v2 = {'name': "Show", 'meta version': 2, 'piece length': 16384, 'file tree': {
+            "b.mkv": {"": {'length': 100, 'pieces root': b"\x02" * 32}},
+            "a.mkv": {"": {'length': 16384, 'pieces root': b"\x03" * 32}},
+        }}
+        info = parse_torrent(self._write("v2.torrent", {'info': v2}))
+        self.assertEqual(info.infohash, hashlib.sha256(bencode(v2)).hexdigest()[:40])
+        self.assertEqual([(f.index, f.path.as_posix()) for f in info.files], [(0, "Show/a.mkv"), (1, "Show/b.mkv")])
+
+    def test_rejects_malformed_and_unsafe(self):
+        truncated = self.root / "t.torrent"
+        truncated.write_bytes(bencode({'info': MULTI_INFO})[:-10])
+        with self.assertRaises(ValueError):
+            parse_torrent(truncated)
+        evil = dict(MULTI_INFO, files=[{'length': 1, 'path': ["..", "evil.mkv"]}])
+        with self.assertRaises(ValueError):
+            parse_torrent(self._write("e.torrent", {'info': evil}))
+
+    def test_resume_data_renames_and_deselects(self):
+        torrent = self._write("abc.torrent", {'info': MULTI_INFO})
+        self._write("abc.fastresume", {
+            'save_path': str(self.root / "dl"),
+            'mapped_files': ["", "", "[Group] Show/Renamed 02.mkv", ""],
+            'file_priority': [1, 0, 1, 0],
+        })
+        info, save_path, resume = load_torrent(torrent)
+
+        self.assertEqual(save_path, self.root / "dl")
+        files = content_files(info, save_path, resume, ('.mkv', '.ass'))
+        self.assertEqual([(f.index, p) for f, p in files], [
+            (0, self.root / "dl" / "[Group] Show" / "Show - 01.mkv"),
+            (2, self.root / "dl" / "[Group] Show" / "Renamed 02.mkv"),
+        ])
+        # Without resume data the save path must be given
+        bare = self._write("bare.torrent", {'info': MULTI_INFO})
+        with self.assertRaises(ValueError):
+            load_torrent(bare)
+
+class TestTorrentIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.db = VideoMappingDB(str(self.root / "test.db"))
+        self.torrent = self.root / "a.torrent"
+        self.torrent.write_bytes(bencode({'info': MULTI_INFO}))
+        self.infohash = hashlib.sha1(bencode(MULTI_INFO)).hexdigest()
+        show = self.root / "dl" / "[Group] Show"
+        show.mkdir(parents=True)
+        self.ep1 = show / "Show - 01.mkv"
+        self.ep2 = show / "Show - 02.mkv"
+        self.ep1.write_bytes(b"1" * 1000)
+        self.ep2.write_bytes(b"2" * 500) # Still downloading
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _ingest(self):
+        processed = []
+        def fake_batch(files, config, seafile, rclone, anilist_client, db, **kwargs):
+            for f in files:
+                processed.append(f)
+                db.upsert_mapping(f, self.root / f"{f.stem}.strm", "http://l", size=f.stat().st_size)
+        with patch.object(main_module, 'process_batch', side_effect=fake_batch):
+            main_module.ingest_torrent({}, MagicMock(), MagicMock(), MagicMock(), ('.mkv',), self.db,
+                                       torrent_path=self.torrent, save_path=self.root / "dl")
+        return processed
+
+    def test_identity_recorded_and_rerun_skipped(self):
+        self.assertEqual(self._ingest(), [self.ep1])
+        mapping = self.db.find_by_torrent(self.infohash, 0)
+        self.assertEqual([m['source_path'] for m in mapping], [str(self.ep1.resolve())])
+
+        # Re-run: the finished file is skipped, the completed one is picked up
+        self.ep2.write_bytes(b"2" * 2000)
+        self.assertEqual(self._ingest(), [self.ep2])
+        self.assertEqual(len(self.db.find_by_torrent(self.infohash, 2)), 1)
+        self.assertEqual(self._ingest(), [])
+
+    def test_duplicate_at_other_path_is_skipped(self):
+        other = self.root / "elsewhere.mkv"
+        other.write_bytes(b"1" * 1000)
+        self.db.upsert_mapping(other, self.root / "x.strm", "http://l", size=1000)
+        self.db.set_torrent_identity(other, self.infohash, 0)
+
+        self.assertEqual(self._ingest(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import tempfile
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import trickplay
+from trickplay import TrickplayGenerator, build_command, trickplay_dir, queue_trickplay
+
+def fake_ffmpeg(calls, returncode=0):
+    def run(cmd, **kwargs):
+        calls.append((cmd, kwargs))
+        if returncode == 0:
+            out = Path(cmd[-1]).parent
+            (out / "0.jpg").write_bytes(b"jpg")
+            (out / "1.jpg").write_bytes(b"jpg")
+        return MagicMock(returncode=returncode, stderr="boom")
+    return run
+
+class TestTrickplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.season = Path(self.tmp.name) / "Show" / "Season 01"
+        self.season.mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_single_pass_command_and_layout(self):
+        cmd = build_command('ffmpeg', 'in.mkv', Path('out'), interval=10, width=320, cols=10, rows=10)
+        # Keyframe-only decode before the input, one filter chain, numbered from 0
+        self.assertLess(cmd.index('-skip_frame'), cmd.index('-i'))
+        self.assertIn("fps=1/10,scale=320:-2,tile=10x10", cmd)
+        self.assertEqual(cmd[cmd.index('-start_number') + 1], '0')
+        self.assertEqual(trickplay_dir(self.season, "Show - S01E01", 320, 10, 10),
+                         self.season / "Show - S01E01.trickplay" / "320 - 10x10")
+
+    @patch('shutil.which', return_value='/usr/bin/ffmpeg')
+    def test_generate_into_place_once(self, mock_which):
+        calls, done = [], []
+        generator = TrickplayGenerator(workers=2, priority=trickplay.PRIORITY_NORMAL)
+        with patch('subprocess.run', side_effect=fake_ffmpeg(calls)):
+            generator.submit(Path("ep01.mkv"), self.season, "Show - S01E01", done.append)
+            generator.close()
+
+        out = self.season / "Show - S01E01.trickplay" / "320 - 10x10"
+        self.assertEqual(sorted(p.name for p in out.iterdir()), ["0.jpg", "1.jpg"])
+        self.assertEqual(done, [out])
+        self.assertEqual([p.name for p in out.parent.iterdir()], ["320 - 10x10"]) # No .tmp left
+        # Present sheets are not generated again
+        self.assertIsNone(TrickplayGenerator().submit(Path("ep01.mkv"), self.season, "Show - S01E01"))
+
+    @patch('shutil.which', return_value='/usr/bin/ffmpeg')
+    def test_failure_leaves_nothing(self, mock_which):
+        calls = []
+        generator = TrickplayGenerator(priority=trickplay.PRIORITY_NORMAL)
+        with patch('subprocess.run', side_effect=fake_ffmpeg(calls, returncode=1)):
+            self.assertFalse(generator.generate(Path("ep01.mkv"), trickplay_dir(self.season, "x", 320, 10, 10)))
+        self.assertEqual(list((self.season / "x.trickplay").iterdir()), [])
+
+    @unittest.skipIf(sys.platform == 'win32', "POSIX niceness")
+    def test_low_priority_is_niced(self):
+        with patch('shutil.which', side_effect=lambda cmd: f"/usr/bin/{cmd}"):
+            self.assertEqual(trickplay.priority_options(trickplay.PRIORITY_LOW), (['/usr/bin/nice', '-n', '10'], {}))
+            prefix, kwargs = trickplay.priority_options(trickplay.PRIORITY_IDLE)
+        self.assertEqual(prefix, ['/usr/bin/nice', '-n', '19', '/usr/bin/ionice', '-c', '3'])
+        self.assertEqual(kwargs, {})
+        self.assertEqual(trickplay.priority_options(trickplay.PRIORITY_NORMAL), ([], {}))
+
+    def test_disabled_is_noop(self):
+        self.assertIsNone(trickplay.start_trickplay({}))
+        self.assertIsNone(queue_trickplay(Path("ep01.mkv"), self.season, "x"))
+
+if __name__ == '__main__':
+    unittest.main()
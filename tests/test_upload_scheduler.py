@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import threading
+import time
+import os
+import sys
+from pathlib import Path
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from datetime import datetime
+from upload_scheduler import order_files, run_ordered, build_bwlimit, split_bwlimit, parse_rate, current_rate
+
+class TestUploadScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _file(self, name, size):
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        return path
+
+    def test_order_shortest(self):
+        big = self._file("[Group] Show - 01 [1080p].mkv", 30)
+        small = self._file("[Group] Show - 02 [1080p].mkv", 3)
+        self.assertEqual(order_files([big, small], 'shortest'), [small, big])
+
+    def test_order_episode_interleaves_series(self):
+        a2 = self._file("[Group] Alpha - 02 [1080p].mkv", 1)
+        a1 = self._file("[Group] Alpha - 01 [1080p].mkv", 50)
+        b1 = self._file("[Group] Beta - 01 [1080p].mkv", 1)
+        ordered = order_files([a2, a1, b1], 'episode')
+        self.assertEqual(ordered[-1], a2)
+        self.assertEqual(set(ordered[:2]), {a1, b1})
+
+    def test_order_walk_keeps_input(self):
+        files = [self._file("b.mkv", 5), self._file("a.mkv", 1)]
+        self.assertEqual(order_files(files, 'walk'), files)
+
+    def test_build_bwlimit_schedule(self):
+        self.assertEqual(build_bwlimit({'bwlimit': '5M'}), '5M')
+        conf = {'bwlimit': '5M', 'bwlimit_schedule': {'23:00': 'off', '08:00': '1M'}}
+        self.assertEqual(build_bwlimit(conf), '08:00,1M 23:00,off')
+
+    def test_split_bwlimit(self):
+        self.assertEqual(split_bwlimit('5M', 1), '5M')
+        self.assertEqual(split_bwlimit('4M', 2), '2048k')
+        self.assertEqual(split_bwlimit('08:00,1M 23:00,off', 2), '08:00,512k 23:00,off')
+        self.assertEqual(split_bwlimit('10M:2M', 2), '5120k:1024k')
+        with self.assertRaises(ValueError):
+            parse_rate('fast')
+
+    def test_current_rate(self):
+        self.assertEqual(current_rate('1M'), 2**20)
+        self.assertIsNone(current_rate('off'))
+        self.assertEqual(current_rate('2M:1M'), 2 * 2**20)
+        timetable = '08:00,1M 23:00,off'
+        self.assertEqual(current_rate(timetable, datetime(2024, 1, 1, 12, 0)), 2**20)
+        self.assertIsNone(current_rate(timetable, datetime(2024, 1, 1, 23, 30)))
+        # Before the first switch the previous day's last entry applies
+        self.assertIsNone(current_rate(timetable, datetime(2024, 1, 1, 3, 0)))
+
+    def test_run_ordered_bounded_concurrency(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+        started = []
+
+        def worker(item):
+            with lock:
+                started.append(item)
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            if item == 3:
+                raise RuntimeError("boom")
+
+        done = []
+        run_ordered(range(8), worker, concurrency=2, on_done=done.append)
+
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual(started[:2], [0, 1])
+        self.assertEqual(done, list(range(1, 9)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,12 @@ from unittest.mock import patch, MagicMock
 import shutil
 import os
 import sys
+import io
+import json
+import logging
+import logging.handlers
+import tempfile
+from contextlib import redirect_stdout
 
 # Ensure src is in path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -38,5 +44,107 @@ class TestUtils(unittest.TestCase):
         self.assertIn('00:00:10', cmd)
         self.assertIn('output.jpg', cmd)
 
+    @patch('shutil.which')
+    @patch('subprocess.run')
+    def test_probe_media_summary(self, mock_run, mock_which):
+        mock_which.return_value = '/usr/bin/ffprobe'
+        mock_run.return_value = MagicMock(returncode=0, stdout=json.dumps({
+            'format': {'duration': '1420.5'},
+            'streams': [
+                {'codec_type': 'video', 'codec_name': 'hevc', 'width': 1920, 'height': 1080},
+                {'codec_type': 'video', 'codec_name': 'mjpeg', 'disposition': {'attached_pic': 1}},
+                {'codec_type': 'audio', 'codec_name': 'flac', 'channels': 2, 'tags': {'language': 'jpn'}},
+                {'codec_type': 'subtitle', 'codec_name': 'ass', 'index': 3, 'tags': {'language': 'chi'}},
+                {'codec_type': 'attachment', 'index': 4, 'tags': {'filename': 'A.ttf', 'mimetype': 'font/ttf'}},
+            ]
+        }))
+
+        media = utils.probe_media('input.mkv')
+
+        self.assertIn('-show_streams', mock_run.call_args[0][0])
+        self.assertEqual(media['duration'], 1420.5)
+        # Cover art attachments are not video streams
+        self.assertEqual(media['video'], [{'codec': 'hevc', 'width': 1920, 'height': 1080, 'aspect': 1.78, 'duration': 1420.5}])
+        self.assertEqual(media['audio'], [{'codec': 'flac', 'language': 'jpn', 'channels': 2}])
+        self.assertEqual(media['subtitle'], [{'index': 3, 'codec': 'ass', 'language': 'chi'}])
+        self.assertEqual(media['attachments'], [{'index': 4, 'filename': 'A.ttf', 'mimetype': 'font/ttf'}])
+
+        mock_which.return_value = None
+        self.assertIsNone(utils.probe_media('input.mkv'))
+
+    def test_thumbnail_offset_short_clip(self):
+        self.assertEqual(utils.thumbnail_offset(None), '00:00:10')
+        self.assertEqual(utils.thumbnail_offset(1420), '00:00:10')
+        self.assertEqual(utils.thumbnail_offset(9), '00:00:04.500')
+
+    def test_episode_nfo_streamdetails(self):
+        metadata = {'title': {'english': 'Show', 'romaji': 'Show'}}
+        media = {'duration': 1420.5, 'video': [{'codec': 'hevc', 'width': 1920, 'height': 1080, 'aspect': 1.78, 'duration': 1420.5}],
+                 'audio': [{'codec': 'flac', 'language': 'jpn', 'channels': 2}], 'subtitle': [{'codec': 'ass', 'language': None}]}
+        with tempfile.TemporaryDirectory() as tmp:
+            nfo = os.path.join(tmp, 'ep.nfo')
+            utils.generate_episode_nfo(metadata, '01', '01', nfo, media)
+            root = utils.ET.parse(nfo).getroot()
+
+        self.assertEqual(root.findtext('runtime'), '24')
+        video = root.find('fileinfo/streamdetails/video')
+        self.assertEqual(video.findtext('codec'), 'hevc')
+        self.assertEqual(video.findtext('durationinseconds'), '1420')
+        self.assertEqual(root.findtext('fileinfo/streamdetails/audio/language'), 'jpn')
+        self.assertIsNotNone(root.find('fileinfo/streamdetails/subtitle'))
+
+    def test_episode_nfo_without_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            nfo = os.path.join(tmp, 'ep.nfo')
+            utils.generate_episode_nfo(None, '03', '01', nfo, {'duration': 600, 'video': [{'codec': 'h264'}]}, show_title='Show')
+            root = utils.ET.parse(nfo).getroot()
+            utils.generate_episode_nfo(None, '03', '01', nfo, {'duration': 600})
+            untitled = utils.ET.parse(nfo).getroot()
+
+        self.assertEqual(root.findtext('showtitle'), 'Show')
+        self.assertEqual(root.findtext('episode'), '03')
+        self.assertEqual(root.findtext('fileinfo/streamdetails/video/codec'), 'h264')
+        self.assertIsNone(untitled.find('showtitle'))
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.level = logging.getLogger().level
+
+    def tearDown(self):
+        utils.stop_logging()
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        for handler in list(root.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+
+    def test_parse_filename_thread_safe(self):
+        from concurrent.futures import ThreadPoolExecutor
+        names = [f"[Group] Show {i} - {i:02} [1080p].mkv" for i in range(1, 41)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            parsed = list(pool.map(utils.parse_filename, names * 5))
+        self.assertEqual([p['full_name'] for p in parsed], [f"Show {i} - S01E{i:02}" for i in range(1, 41)] * 5)
+
+    def test_json_log_with_context(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with redirect_stdout(io.StringIO()):
+                listener = utils.setup_logging(tmp, log_level="INFO", log_format="json")
+                self.assertIsInstance(listener, logging.handlers.QueueListener)
+
+                with utils.log_context(cid="abc123", file="ep1.mkv"):
+                    with utils.log_context(stage="upload"):
+                        logging.info("Uploading %s", "ep1.mkv")
+                logging.debug("filtered out %s", "x")
+                utils.stop_logging()
+
+            with open(os.path.join(tmp, "app.log"), encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['message'], "Uploading ep1.mkv")
+        self.assertEqual(lines[0]['cid'], "abc123")
+        self.assertEqual(lines[0]['stage'], "upload")
+        self.assertEqual(lines[0]['level'], "INFO")
+
 if __name__ == '__main__':
     unittest.main()
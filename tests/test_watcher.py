@@ -0,0 +1,143 @@
+import unittest
+import tempfile
+import threading
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Ensure src is in path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import watcher
+from watcher import StabilityTracker, LibraryWatcher, is_open_for_writing
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.season = self.root / "Show"
+        self.season.mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _file(self, name, data=b"x"):
+        path = self.season / name
+        path.write_bytes(data)
+        return path
+
+    def test_released_after_settling_per_directory(self):
+        busy = set()
+        tracker = StabilityTracker(settle=30, max_hold=600, is_busy=lambda p: p in busy)
+        ep1, ep2 = self._file("01.mkv"), self._file("02.mkv")
+        tracker.touch(ep1)
+        tracker.touch(ep2)
+
+        self.assertEqual(tracker.ready_batches(now=0), {})
+        ep2.write_bytes(b"xx") # Still growing
+        busy.add(ep1)
+        self.assertEqual(tracker.ready_batches(now=31), {})
+        # ep1 closed, but ep2 in the same directory is still settling: held back
+        busy.clear()
+        self.assertEqual(tracker.ready_batches(now=40), {})
+        self.assertEqual(tracker.ready_batches(now=62), {self.season: [ep1, ep2]})
+        self.assertEqual(len(tracker), 0)
+
+    def test_max_hold_and_vanished_files(self):
+        tracker = StabilityTracker(settle=1, max_hold=10, is_busy=lambda p: False)
+        ep1, ep2 = self._file("01.mkv"), self._file("02.mkv")
+        gone = self._file("03.mkv")
+        for path in (ep1, ep2, gone):
+            tracker.touch(path)
+        tracker.ready_batches(now=0)
+        gone.unlink()
+        self.assertEqual(tracker.ready_batches(now=2), {self.season: [ep1, ep2]})
+
+        ep3, ep4 = self._file("04.mkv"), self._file("05.mkv")
+        tracker.touch(ep3)
+        tracker.touch(ep4)
+        tracker.ready_batches(now=0)
+        for t in range(1, 20):
+            ep4.write_bytes(b"x" * t) # Never settles
+            batches = tracker.ready_batches(now=t)
+            if batches:
+                break
+        self.assertEqual(batches, {self.season: [ep3]})
+        self.assertGreaterEqual(t, 11)
+
+    def test_stable_file_that_always_looks_busy(self):
+        # e.g. Windows, where a player or seeding client holds the file open
+        tracker = StabilityTracker(settle=30, max_hold=600, is_busy=lambda p: True)
+        ep1 = self._file("01.mkv")
+        tracker.touch(ep1)
+
+        tracker.ready_batches(now=0)
+        self.assertEqual(tracker.ready_batches(now=300), {})
+        self.assertEqual(tracker.ready_batches(now=599), {})
+        self.assertEqual(tracker.ready_batches(now=600), {self.season: [ep1]})
+        self.assertEqual(len(tracker), 0)
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), "needs /proc")
+    def test_open_for_writing(self):
+        path = self.season / "01.mkv"
+        with open(path, 'wb') as f:
+            f.write(b"x")
+            self.assertTrue(is_open_for_writing(path))
+        with open(path, 'rb'):
+            self.assertFalse(is_open_for_writing(path))
+
+    def test_event_handler_tracks_writes_only(self):
+        tracker = StabilityTracker()
+        handler = watcher._EventHandler(tracker, ('.mkv',))
+        ep1, ep2, ep3 = self._file("01.mkv"), self._file("02.mkv"), self._file("03.mkv")
+        event = lambda kind, path, dest='', is_dir=False: SimpleNamespace(event_type=kind, src_path=str(path), dest_path=str(dest) if dest else '', is_directory=is_dir)
+
+        # Readers (seeding, ffprobe, fingerprinting) must not re-track files
+        for kind in ('opened', 'closed_no_write', 'deleted'):
+            handler.on_any_event(event(kind, ep1))
+        handler.on_any_event(event('created', self.season / "01.ass"))
+        self.assertEqual(len(tracker), 0)
+
+        handler.on_any_event(event('closed', ep1))
+        handler.on_any_event(event('moved', self.root / "tmp.part", ep2))
+        handler.on_any_event(event('modified', ep3))
+        self.assertEqual(set(tracker._pending), {ep1, ep2, ep3})
+
+        # A directory moved in brings its files along
+        moved_in = self.root / "Other"
+        moved_in.mkdir()
+        (moved_in / "01.mkv").write_bytes(b"x")
+        handler.on_any_event(event('moved', self.root / "incoming", moved_in, is_dir=True))
+        self.assertIn(moved_in / "01.mkv", tracker._pending)
+
+    def test_polling_fallback_feeds_batches(self):
+        self._file("old.mkv")
+        batches = []
+        done = threading.Event()
+
+        def on_batch(files):
+            batches.append(files)
+            done.set()
+
+        with patch.object(watcher, 'Observer', None):
+            w = LibraryWatcher(self.root, ('.mkv',), on_batch, settle=0, poll_interval=0.05, tick=0.02)
+            w.tracker.is_busy = lambda p: False
+            thread = threading.Thread(target=w.run)
+            thread.start()
+            try:
+                while w._snapshot is None:
+                    done.wait(0.01)
+                new = self._file("new.mkv")
+                self._file("notes.txt")
+                self.assertTrue(done.wait(5))
+            finally:
+                w.stop()
+                thread.join()
+
+        # Files present at startup are left to --sync
+        self.assertEqual(batches, [[new]])
+
+if __name__ == '__main__':
+    unittest.main()